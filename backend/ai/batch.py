@@ -0,0 +1,324 @@
+"""Run a JSONL file of questions through NLPEngine and GeminiAI
+
+    python -m ai.batch questions.jsonl results.jsonl --concurrency 8 --rate 4
+
+Each input line is {"question": "..."} (or "text"), optionally with an "id".
+Results are appended to the output file as they complete, one JSON line per
+question, and progress is checkpointed next to it (<output>.checkpoint.json).
+Running the same command again after an interruption resumes where it left
+off; --restart discards the previous output and checkpoint. Lines that end in
+a Gemini error, timeout or unavailable answer are not finished: a rerun asks
+them again and appends the new result, so the last line for an id wins. The
+run refuses to start when Gemini is not configured.
+
+Questions whose intent is an automation action (open_application, ...) are
+recorded as "skipped" rather than executed; --all-intents sends them to
+Gemini too. UPSTREAM_MODE=replay runs a batch against a recorded cassette.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from core.pipeline import AI_INTENTS
+from core.scheduler import TokenBucket
+from core.telemetry import UsageTelemetry
+
+logger = logging.getLogger(__name__)
+
+# Outcomes retried by the next run instead of being checkpointed as finished
+RETRY_STATUSES = ("error", "timeout", "unavailable", "failed")
+
+
+def read_questions(path: str, start_after: int = 0) -> Iterator[Tuple[int, Optional[Dict[str, Any]], str]]:
+    """Yield (line number, parsed record or None, raw line) lazily, skipping up to start_after"""
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            if number > start_after:
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except json.JSONDecodeError:
+                    record = {"invalid": True}
+                yield number, record, line
+
+
+class Checkpoint:
+    """Progress as a watermark (every line up to it is finished) plus the few
+    lines finished beyond it, so it stays small however large the input is
+
+    Lines whose latest result has a retry status still move the watermark
+    (they are not in progress any more) but are kept in `failed`, rebuilt from
+    the output file on load, and are not done until a later run answers them.
+    """
+
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.watermark = 0
+        self.done_after: Set[int] = set()
+        self.failed: Set[int] = set()
+        self.saved_at = 0.0
+
+    def load(self, output_path: str) -> "Checkpoint":
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            if state["input"] != self.input_path:
+                raise SystemExit(f"{self.path} belongs to {state['input']}; use --restart to start over")
+            self.watermark = state["watermark"]
+            self.done_after = set(state["done_after"])
+        # Results written after the last checkpoint still count as finished;
+        # the last result for a line decides whether it needs another attempt
+        if os.path.exists(output_path):
+            with open(output_path) as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                        number = result["line"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+                    if number > self.watermark:
+                        self.done_after.add(number)
+                    if result.get("status") in RETRY_STATUSES:
+                        self.failed.add(number)
+                    else:
+                        self.failed.discard(number)
+        self._advance()
+        return self
+
+    def is_done(self, number: int) -> bool:
+        return (number <= self.watermark or number in self.done_after) and number not in self.failed
+
+    def resume_after(self) -> int:
+        """Line to start reading after: the watermark, or before the first failed line"""
+        return min(self.watermark, min(self.failed) - 1) if self.failed else self.watermark
+
+    def mark(self, number: int, failed: bool = False):
+        if failed:
+            self.failed.add(number)
+        else:
+            self.failed.discard(number)
+        if number > self.watermark:
+            self.done_after.add(number)
+            self._advance()
+
+    def _advance(self):
+        while self.watermark + 1 in self.done_after:
+            self.watermark += 1
+            self.done_after.discard(self.watermark)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"input": self.input_path, "watermark": self.watermark,
+                       "done_after": sorted(self.done_after),
+                       "updated": datetime.now().isoformat(timespec="seconds")}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.saved_at = time.monotonic()
+
+
+class BatchJob:
+    """Bounded-concurrency, rate-limited run of a question file
+
+    A fixed set of workers pulls from a small queue fed lazily from the input,
+    and reading stops while more than `window` lines past the watermark are
+    in progress or done (one slow question cannot make the finished-line set
+    grow without bound), so memory does not grow with the file. Each result is appended and flushed
+    as soon as it completes; the checkpoint is rewritten (atomically) every
+    checkpoint_interval seconds and at the end.
+    """
+
+    def __init__(self, input_path: str, output_path: str, nlp_engine: Any, gemini_ai: Any,
+                 concurrency: int = 4, rate: float = 2.0, burst: Optional[float] = None,
+                 retries: int = 2, all_intents: bool = False, checkpoint_interval: float = 5.0,
+                 window: int = 10000):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.nlp_engine = nlp_engine
+        self.gemini_ai = gemini_ai
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst or max(1.0, rate)) if rate > 0 else None
+        self.retries = retries
+        self.all_intents = all_intents
+        self.checkpoint_interval = checkpoint_interval
+        self.window = max(window, concurrency)
+        self._advanced = asyncio.Event()
+        self.checkpoint = Checkpoint(output_path + ".checkpoint.json", input_path)
+        self.pricing = UsageTelemetry()
+
+        self.started = 0.0
+        self.completed = 0
+        self.resumed_from = 0
+        self.in_flight = 0
+        self.by_status: Dict[str, int] = {}
+        self.total_tokens = 0
+        self.cost_usd = 0.0
+
+    async def _acquire(self):
+        if self.bucket is None:
+            return
+        while not self.bucket.try_acquire():
+            await asyncio.sleep(self.bucket.retry_after())
+
+    async def _answer(self, number: int, record: Dict[str, Any]) -> Dict[str, Any]:
+        question = record.get("question") or record.get("text") or ""
+        result: Dict[str, Any] = {"id": record.get("id", number), "line": number, "question": question}
+        if record.get("invalid") or not question:
+            return dict(result, status="invalid")
+
+        started = time.perf_counter()
+        intent_data = await self.nlp_engine.process_command(question)
+        result.update(intent=intent_data["intent"], confidence=intent_data["confidence"],
+                      triage=intent_data.get("triage", {}).get("level"))
+        if intent_data["intent"] not in AI_INTENTS and not self.all_intents:
+            return dict(result, status="skipped", latency_ms=round((time.perf_counter() - started) * 1000, 1))
+
+        for attempt in range(self.retries + 1):
+            await self._acquire()
+            response, usage = await asyncio.to_thread(self.gemini_ai.chat_with_usage, question, None, False)
+            if usage.get("status", "ok") not in ("error", "timeout"):
+                break
+            if attempt < self.retries:
+                await asyncio.sleep(2 ** attempt)
+        self.total_tokens += usage.get("total_tokens", 0)
+        self.cost_usd += self.pricing.cost(usage)
+        return dict(result, status=usage.get("status", "ok"), response=response, usage=usage, attempts=attempt + 1,
+                    latency_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    async def _worker(self, queue: asyncio.Queue, output):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            number, record = item
+            self.in_flight += 1
+            try:
+                result = await self._answer(number, record)
+            except Exception as e:
+                logger.error(f"Line {number} failed: {e}")
+                result = {"id": record.get("id", number), "line": number, "status": "failed", "error": str(e)}
+            finally:
+                self.in_flight -= 1
+            result["completed_at"] = datetime.now().isoformat(timespec="seconds")
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            self.checkpoint.mark(number, failed=result["status"] in RETRY_STATUSES)
+            self._advanced.set()
+            self.completed += 1
+            self.by_status[result["status"]] = self.by_status.get(result["status"], 0) + 1
+            if time.monotonic() - self.checkpoint.saved_at >= self.checkpoint_interval:
+                self.checkpoint.save()
+
+    async def run(self, progress_interval: float = 10.0) -> Dict[str, Any]:
+        if not self.gemini_ai.is_available():
+            # Every question would get the canned fallback answer
+            raise SystemExit("Gemini is not configured (set GEMINI_API_KEY or UPSTREAM_MODE=replay)")
+        self.checkpoint.load(self.output_path)
+        self.resumed_from = self.checkpoint.watermark
+        if self.resumed_from or self.checkpoint.done_after or self.checkpoint.failed:
+            logger.info(f"Resuming after line {self.resumed_from} "
+                        f"({len(self.checkpoint.done_after)} later lines already done, "
+                        f"{len(self.checkpoint.failed)} failed lines to retry)")
+        self.started = time.monotonic()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        reporter = asyncio.create_task(self._report(progress_interval)) if progress_interval > 0 else None
+
+        with open(self.output_path, "a") as output:
+            workers = [asyncio.create_task(self._worker(queue, output)) for _ in range(self.concurrency)]
+            try:
+                for number, record, _ in read_questions(self.input_path, self.checkpoint.resume_after()):
+                    if self.checkpoint.is_done(number):
+                        continue
+                    while number - self.checkpoint.watermark > self.window:
+                        self._advanced.clear()
+                        await self._advanced.wait()
+                    if record is None:
+                        # Blank lines are finished as soon as they are read
+                        self.checkpoint.mark(number)
+                        continue
+                    await queue.put((number, record))
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                if reporter:
+                    reporter.cancel()
+                self.checkpoint.save()
+        return self.progress()
+
+    async def _report(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            p = self.progress()
+            logger.info(f"{p['completed']} done ({p['per_second']}/s), {p['in_flight']} in flight, "
+                        f"through line {p['watermark']}, {p['total_tokens']} tokens, ${p['cost_usd']}")
+
+    def progress(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return {
+            "completed": self.completed,
+            "resumed_from_line": self.resumed_from,
+            "watermark": self.checkpoint.watermark,
+            "failed_lines": len(self.checkpoint.failed),
+            "in_flight": self.in_flight,
+            "by_status": dict(self.by_status),
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "elapsed_s": round(elapsed, 1),
+            "per_second": round(self.completed / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions in flight at once")
+    parser.add_argument("--rate", type=float, default=2.0, help="Gemini requests per second (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=None, help="Requests allowed back to back (default: rate)")
+    parser.add_argument("--retries", type=int, default=2, help="Retries for Gemini errors and timeouts")
+    parser.add_argument("--all-intents", action="store_true", help="Send automation intents to Gemini as well")
+    parser.add_argument("--checkpoint-interval", type=float, default=5.0)
+    parser.add_argument("--window", type=int, default=10000, help="Max lines read ahead of the oldest unfinished one")
+    parser.add_argument("--progress-interval", type=float, default=10.0)
+    parser.add_argument("--restart", action="store_true", help="Discard previous output and checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if args.restart:
+        for path in (args.output, args.output + ".checkpoint.json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    from ai.gemini_ai import GeminiAI
+    from ai.nlp_engine import NLPEngine
+    from automation.workflows import load_workflows, workflow_triggers
+    from core.upstream import upstream_gemini
+
+    job = BatchJob(args.input, args.output,
+                   NLPEngine(workflow_triggers=workflow_triggers(load_workflows())), upstream_gemini(GeminiAI),
+                   concurrency=args.concurrency, rate=args.rate, burst=args.burst, retries=args.retries,
+                   all_intents=args.all_intents, checkpoint_interval=args.checkpoint_interval, window=args.window)
+    try:
+        summary = asyncio.run(job.run(args.progress_interval))
+    except KeyboardInterrupt:
+        summary = job.progress()
+        print(f"Interrupted; rerun the same command to resume after line {summary['watermark']}")
+    print(json.dumps(summary, indent=2))
+    if summary["failed_lines"]:
+        print(f"{summary['failed_lines']} lines failed; rerun the same command to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _format_turn(turn: Dict[str, Any]) -> str:
+    return f"User: {turn['user']}\nJAR-VET: {turn['assistant']}"
+
+
+class ConversationMemory:
+    """Conversation history managed against a token budget
+
+    The most recent turns are kept verbatim. Once the verbatim history grows past
+    the budget, the oldest turns are folded into a rolling summary. Folding runs on
+    a background thread so it never sits on the request path; until it finishes,
+    the prompt simply carries fewer verbatim turns.
+    """
+
+    def __init__(self, summarizer: Optional[Callable[[str, List[Dict[str, Any]]], str]] = None,
+                 token_budget: Optional[int] = None, min_recent_turns: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+        self.min_recent_turns = min_recent_turns if min_recent_turns is not None else int(os.getenv("HISTORY_RECENT_TURNS", "2"))
+        self.summary_budget = max(32, self.token_budget // 4)
+        self.summarizer = summarizer or self._extractive_summary
+
+        self.turns: List[Dict[str, Any]] = []
+        self.summary = ""
+        self.summarized_turns = 0
+        # Bumped by clear(), so a compaction started before it is discarded
+        self._generation = 0
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summarizer")
+        self._compacting = False
+
+    def add_turn(self, user: str, assistant: str, grounded: bool = False):
+        turn = {
+            "user": user,
+            "assistant": assistant,
+            "grounded": grounded,
+            "tokens": estimate_tokens(user) + estimate_tokens(assistant) + 4,
+        }
+        with self._lock:
+            self.turns.append(turn)
+        self.schedule_compaction()
+
+    def render(self) -> Tuple[str, int]:
+        """Return the history block for the prompt and its estimated token count"""
+        with self._lock:
+            summary = self.summary
+            turns = list(self.turns)
+
+        used = estimate_tokens(summary)
+        selected: List[Dict[str, Any]] = []
+        for turn in reversed(turns):
+            if selected and used + turn["tokens"] > self.token_budget:
+                break
+            selected.append(turn)
+            used += turn["tokens"]
+        selected.reverse()
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of earlier conversation:\n{summary}")
+        if selected:
+            sections.append("Recent conversation:\n" + "\n".join(_format_turn(t) for t in selected))
+
+        text = "\n\n".join(sections)
+        return text, estimate_tokens(text)
+
+    def schedule_compaction(self):
+        with self._lock:
+            if self._compacting or not self._over_budget():
+                return
+            self._compacting = True
+        self._executor.submit(self._compact)
+
+    def _over_budget(self) -> bool:
+        if len(self.turns) <= self.min_recent_turns:
+            return False
+        verbatim = sum(t["tokens"] for t in self.turns)
+        return verbatim + estimate_tokens(self.summary) > self.token_budget
+
+    def _compact(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._over_budget():
+                        return
+                    keep_budget = self.token_budget - self.summary_budget
+                    kept = 0
+                    split = len(self.turns)
+                    for i in range(len(self.turns) - 1, -1, -1):
+                        if len(self.turns) - i > self.min_recent_turns and kept + self.turns[i]["tokens"] > keep_budget:
+                            break
+                        kept += self.turns[i]["tokens"]
+                        split = i
+                    split = min(split, len(self.turns) - self.min_recent_turns)
+                    if split <= 0:
+                        return
+                    folded = self.turns[:split]
+                    previous_summary = self.summary
+                    generation = self._generation
+
+                try:
+                    new_summary = self.summarizer(previous_summary, folded)
+                except Exception as e:
+                    logger.error(f"History summarization failed: {e}")
+                    new_summary = self._extractive_summary(previous_summary, folded)
+
+                new_summary = self._truncate(new_summary.strip(), self.summary_budget)
+
+                with self._lock:
+                    if self._generation != generation:
+                        # Cleared while summarizing; the turns left are newer than the fold
+                        continue
+                    # Turns are only appended between clears, so the folded ones are still at the head
+                    self.turns = self.turns[len(folded):]
+                    self.summary = new_summary
+                    self.summarized_turns += len(folded)
+                logger.info(f"Folded {len(folded)} turns into history summary ({estimate_tokens(new_summary)} tokens)")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _extractive_summary(self, previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+        """Fallback summary used when no model-backed summarizer is available"""
+        lines = [previous_summary] if previous_summary else []
+        for turn in turns:
+            answer = turn["assistant"].split(". ")[0]
+            lines.append(f"- User asked: {turn['user'][:120]} / JAR-VET: {answer[:160]}")
+        return "\n".join(lines)
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        # Keep the newest part of the summary; older context is the first to go
+        return "..." + text[-(max_chars - 3):]
+
+    def clear(self):
+        with self._lock:
+            self.turns = []
+            self.summary = ""
+            self.summarized_turns = 0
+            self._generation += 1
+
+    def get_turns(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(t) for t in self.turns]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "verbatim_turns": len(self.turns),
+                "verbatim_tokens": sum(t["tokens"] for t in self.turns),
+                "summary_tokens": estimate_tokens(self.summary),
+                "summarized_turns": self.summarized_turns,
+                "token_budget": self.token_budget,
+            }
@@ -0,0 +1,222 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that sit between a trigger and its target ("open the youtube app")
+FILLER_WORDS = frozenset(["the", "a", "an", "my", "up", "me", "website", "site", "app", "application", "please"])
+
+# Trigger phrases per intent; the target vocabulary each intent accepts is given
+# by the matcher's vocabularies
+TRIGGERS = {
+    "open": ("open_website", "open_application"),
+    "go to": ("open_website",),
+    "navigate to": ("open_website",),
+    "visit": ("open_website",),
+    "show me": ("open_website",),
+    "take me to": ("open_website",),
+    "launch": ("open_application",),
+    "start": ("open_application",),
+    "run": ("open_application",),
+    "close": ("close_application",),
+    "quit": ("close_application",),
+    "exit": ("close_application",),
+    "kill": ("close_application",),
+}
+
+# Trigger words that must be heard exactly: a near miss in ordinary speech
+# ("my dog is quite terminal") must never close anything
+EXACT_TRIGGER_WORDS = frozenset(["close", "quit", "exit", "kill"])
+
+MAX_JOINED_TOKENS = 3
+
+
+def trigrams(term: str) -> List[str]:
+    padded = f"${term}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance, or limit + 1 once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+
+    previous_previous: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous_previous is not None and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Character-trigram inverted index with bounded edit-distance verification"""
+
+    def __init__(self, terms: Iterable[str], min_dice: float = 0.3, max_candidates: int = 3):
+        self.terms = list(dict.fromkeys(terms))
+        self.min_dice = min_dice
+        self.max_candidates = max_candidates
+        self.term_sizes = []
+        self.postings: Dict[str, List[int]] = {}
+        self.exact = {term: i for i, term in enumerate(self.terms)}
+
+        for term_id, term in enumerate(self.terms):
+            grams = set(trigrams(term))
+            self.term_sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(term_id)
+
+    @staticmethod
+    def max_distance(length: int) -> int:
+        if length <= 3:
+            return 0
+        if length <= 8:
+            return 1
+        return 2
+
+    def lookup(self, query: str) -> Optional[Tuple[str, int]]:
+        """Return (term, edit distance) of the closest term within the distance bound"""
+        term_id = self.exact.get(query)
+        if term_id is not None:
+            return self.terms[term_id], 0
+
+        limit = self.max_distance(len(query))
+        if limit == 0:
+            return None
+
+        grams = set(trigrams(query))
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self.postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        if not shared:
+            return None
+
+        size = len(grams)
+        scored = []
+        for term_id, count in shared.items():
+            dice = 2.0 * count / (size + self.term_sizes[term_id])
+            if dice >= self.min_dice:
+                scored.append((dice, term_id))
+        scored.sort(reverse=True)
+
+        best = None
+        for _, term_id in scored[:self.max_candidates]:
+            term = self.terms[term_id]
+            distance = bounded_edit_distance(query, term, limit)
+            if distance <= limit and (best is None or distance < best[1]):
+                best = (term, distance)
+                limit = distance
+        return best
+
+
+class FuzzyIntentMatcher:
+    """ASR-tolerant matcher for "open/launch/close <site or app>" commands
+
+    Speech recognition tends to split or slightly misspell names ("open you tube",
+    "launch fire fox", "go to git hub"). Targets are rebuilt by joining up to three
+    tokens after a trigger phrase and looked up in a trigram index, with a bounded
+    edit distance check. The confidence reflects how much correction was needed.
+    Opening triggers tolerate a typo ("opne youtube"); closing triggers do not.
+    """
+
+    def __init__(self, websites: Iterable[str], apps: Iterable[str], min_confidence: float = 0.7):
+        self.websites = set(websites)
+        self.apps = set(apps)
+        self.min_confidence = min_confidence
+        self.targets = TrigramIndex(list(self.websites) + list(self.apps))
+
+        self.trigger_words: Dict[str, List[Tuple[List[str], str]]] = {}
+        for phrase in TRIGGERS:
+            words = phrase.split()
+            self.trigger_words.setdefault(words[0], []).append((words[1:], phrase))
+        # Trigger words are short, so a single typo removes most of their trigrams
+        self.trigger_index = TrigramIndex([w for w in self.trigger_words if w not in EXACT_TRIGGER_WORDS],
+                                          min_dice=0.2)
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        tokens = TOKEN_RE.findall(text.lower())
+        best = None
+
+        for position, token in enumerate(tokens):
+            found = (token, 0) if token in self.trigger_words else self.trigger_index.lookup(token)
+            if not found:
+                continue
+            first_word, trigger_distance = found
+            for rest, phrase in self.trigger_words[first_word]:
+                end = position + 1 + len(rest)
+                if tokens[position + 1:end] != rest:
+                    continue
+                candidate = self._match_target(tokens, end, phrase, trigger_distance)
+                if candidate and (best is None or candidate["confidence"] > best["confidence"]):
+                    best = candidate
+
+        if best and best["confidence"] >= self.min_confidence:
+            return best
+        return None
+
+    def _match_target(self, tokens: List[str], start: int, phrase: str, trigger_distance: int) -> Optional[Dict[str, Any]]:
+        while start < len(tokens) and tokens[start] in FILLER_WORDS:
+            start += 1
+
+        best = None
+        joined = ""
+        for count in range(1, min(MAX_JOINED_TOKENS, len(tokens) - start) + 1):
+            joined += tokens[start + count - 1]
+            found = self.targets.lookup(joined)
+            if not found:
+                continue
+            target, distance = found
+
+            intent = self._intent_for(phrase, target)
+            if not intent:
+                continue
+
+            confidence = self.calibrate(joined, target, distance, count, trigger_distance)
+            if best is None or confidence > best["confidence"]:
+                best = {
+                    "intent": intent,
+                    "target": target,
+                    "confidence": confidence,
+                    "distance": distance,
+                    "joined_tokens": count,
+                }
+        return best
+
+    def _intent_for(self, phrase: str, target: str) -> Optional[str]:
+        for intent in TRIGGERS[phrase]:
+            if intent == "open_website" and target in self.websites:
+                return intent
+            if intent in ("open_application", "close_application") and target in self.apps:
+                return intent
+        return None
+
+    @staticmethod
+    def calibrate(heard: str, target: str, distance: int, joined_tokens: int, trigger_distance: int) -> float:
+        """Map the amount of correction applied onto a confidence in [0, 0.98]
+
+        Tuned against benchmarks/data/noisy_transcripts.jsonl so that the reported
+        confidence tracks observed precision. benchmarks.fuzzy_intent prints the
+        reliability table for the held-out noisy_transcripts_holdout.jsonl, which
+        is not used for tuning.
+        """
+        similarity = 1.0 - distance / max(len(heard), len(target))
+        confidence = 0.5 + 0.48 * similarity * similarity
+        confidence *= 0.98 ** (joined_tokens - 1)
+        if trigger_distance:
+            confidence *= 0.93
+        return round(confidence, 3)
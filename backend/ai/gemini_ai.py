@@ -1,10 +1,13 @@
 import logging
 import os
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 import requests
 import json
 from dotenv import load_dotenv
 
+from ai.conversation_memory import ConversationMemory, estimate_tokens
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -22,7 +25,7 @@ class GeminiAI:
         self.model = "gemini-2.5-flash"
         self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent"
         self.available = False
-        self.conversation_history = []
+        self.memory = ConversationMemory(summarizer=self._summarize_history)
         self.use_search_grounding = os.getenv("USE_SEARCH_GROUNDING", "true").lower() == "true"
         
         if self.api_key:
@@ -33,9 +36,25 @@ class GeminiAI:
     
     def chat(self, user_message: str, context: Optional[str] = None) -> str:
         """Send message to Gemini and get response"""
+        return self.chat_with_usage(user_message, context)[0]
+    
+    def chat_with_usage(self, user_message: str, context: Optional[str] = None,
+                        record_history: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """Send message to Gemini and return the response with token usage
+        
+        usage carries the prompt/candidate/thinking/total token counts from the
+        response's usageMetadata, the upstream latency and the request outcome
+        (ok, error, timeout or unavailable). With record_history=False the
+        exchange is not added to the conversation history (used for speculative
+        requests that may be discarded).
+        """
+        usage = {"prompt_tokens": 0, "estimated_prompt_tokens": 0, "history_tokens": 0,
+                 "candidate_tokens": 0, "thoughts_tokens": 0, "total_tokens": 0,
+                 "grounded": False, "search_grounding": self.use_search_grounding,
+                 "upstream_ms": None, "status": "unavailable"}
         
         if not self.available:
-            return self._fallback_response(user_message)
+            return self._fallback_response(user_message), usage
         
         try:
             if self.use_search_grounding:
@@ -112,16 +131,16 @@ Remember: You're JAR-VET - knowledgeable, caring, always prioritizing animal wel
             if context:
                 system_instruction += f"\n\nAdditional Context: {context}"
             
-            if len(self.conversation_history) > 0:
-                recent_history = self.conversation_history[-3:]
-                history_text = "\n".join([
-                    f"User: {h['user']}\nJARVIS: {h['assistant']}"
-                    for h in recent_history
-                ])
-                prompt = f"{system_instruction}\n\nRecent conversation:\n{history_text}\n\nUser: {user_message}\nJAR-VET:"
+            history_text, history_tokens = self.memory.render()
+            if history_text:
+                prompt = f"{system_instruction}\n\n{history_text}\n\nUser: {user_message}\nJAR-VET:"
             else:
                 prompt = f"{system_instruction}\n\nUser: {user_message}\nJAR-VET:"
             
+            usage["history_tokens"] = history_tokens
+            usage["estimated_prompt_tokens"] = estimate_tokens(prompt)
+            usage["prompt_tokens"] = usage["estimated_prompt_tokens"]
+            
             headers = {
                 "Content-Type": "application/json"
             }
@@ -145,16 +164,30 @@ Remember: You're JAR-VET - knowledgeable, caring, always prioritizing animal wel
                     "googleSearch": {}
                 }]
             
-            response = requests.post(
-                f"{self.api_url}?key={self.api_key}",
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
+            usage["status"] = "error"
+            started = time.perf_counter()
+            try:
+                response = requests.post(
+                    f"{self.api_url}?key={self.api_key}",
+                    headers=headers,
+                    json=payload,
+                    timeout=10
+                )
+            finally:
+                usage["upstream_ms"] = round((time.perf_counter() - started) * 1000, 1)
             
             if response.status_code == 200:
                 result = response.json()
                 
+                usage_metadata = result.get("usageMetadata", {})
+                if "promptTokenCount" in usage_metadata:
+                    usage["prompt_tokens"] = usage_metadata["promptTokenCount"]
+                usage["candidate_tokens"] = usage_metadata.get("candidatesTokenCount", 0)
+                usage["thoughts_tokens"] = usage_metadata.get("thoughtsTokenCount", 0)
+                usage["total_tokens"] = usage_metadata.get(
+                    "totalTokenCount", usage["prompt_tokens"] + usage["candidate_tokens"] + usage["thoughts_tokens"]
+                )
+                
                 if "candidates" in result and len(result["candidates"]) > 0:
                     candidate = result["candidates"][0]
                     
@@ -176,26 +209,59 @@ Remember: You're JAR-VET - knowledgeable, caring, always prioritizing animal wel
                     if ai_response.startswith("JAR-VET:"):
                         ai_response = ai_response[8:].strip()
                     
-                    self.conversation_history.append({
-                        "user": user_message,
-                        "assistant": ai_response,
-                        "grounded": grounding_metadata is not None
-                    })
+                    usage["grounded"] = grounding_metadata is not None
+                    usage["status"] = "ok"
+                    if record_history:
+                        self.memory.add_turn(user_message, ai_response, grounded=usage["grounded"])
                     
-                    return ai_response
+                    logger.info(f"Gemini tokens: prompt {usage['prompt_tokens']} (history {usage['history_tokens']}), "
+                                f"candidates {usage['candidate_tokens']}, total {usage['total_tokens']} "
+                                f"in {usage['upstream_ms']} ms")
+                    return ai_response, usage
                 else:
                     logger.error(f"Unexpected Gemini response format: {result}")
-                    return self._fallback_response(user_message)
+                    return self._fallback_response(user_message), usage
             else:
                 logger.error(f"Gemini API error {response.status_code}: {response.text}")
-                return self._fallback_response(user_message)
+                return self._fallback_response(user_message), usage
                 
         except requests.exceptions.Timeout:
             logger.error("Gemini API timeout")
-            return "I'm having trouble connecting right now. Please try again."
+            usage["status"] = "timeout"
+            return "I'm having trouble connecting right now. Please try again.", usage
         except Exception as e:
             logger.error(f"Gemini AI error: {e}")
-            return self._fallback_response(user_message)
+            return self._fallback_response(user_message), usage
+    
+    def _summarize_history(self, previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+        """Fold older turns into the rolling summary (runs on the memory's background thread)"""
+        transcript = "\n".join(f"User: {t['user']}\nJAR-VET: {t['assistant']}" for t in turns)
+        prompt = (
+            "Condense this veterinary assistant conversation into a few short bullet points. "
+            "Keep the animal species, symptoms, medications and any advice already given.\n\n"
+        )
+        if previous_summary:
+            prompt += f"Existing summary:\n{previous_summary}\n\n"
+        prompt += f"New conversation:\n{transcript}\n\nUpdated summary:"
+        
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": 0.2,
+                "maxOutputTokens": self.memory.summary_budget
+            }
+        }
+        
+        response = requests.post(
+            f"{self.api_url}?key={self.api_key}",
+            headers={"Content-Type": "application/json"},
+            json=payload,
+            timeout=10
+        )
+        response.raise_for_status()
+        
+        parts = response.json()["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts)
     
     def _fallback_response(self, message: str) -> str:
         """Fallback responses when Gemini is not available"""
@@ -226,13 +292,21 @@ Remember: You're JAR-VET - knowledgeable, caring, always prioritizing animal wel
         
         return "I'm here to help with veterinary concerns. What would you like to know about animal health?"
     
+    def record_turn(self, user_message: str, ai_response: str, grounded: bool = False):
+        """Add an exchange produced with record_history=False to the history"""
+        self.memory.add_turn(user_message, ai_response, grounded=grounded)
+    
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.memory.clear()
     
     def get_history(self) -> List[Dict[str, str]]:
-        """Get conversation history"""
-        return self.conversation_history
+        """Get the verbatim (not yet summarized) conversation history"""
+        return self.memory.get_turns()
+    
+    def get_history_stats(self) -> Dict[str, Any]:
+        """Get token accounting for the managed conversation history"""
+        return self.memory.stats()
     
     def is_available(self) -> bool:
         """Check if Gemini is available"""
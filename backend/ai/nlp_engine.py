@@ -2,15 +2,39 @@ import os
 import json
 import re
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from ai.fuzzy_matcher import FuzzyIntentMatcher
+
 load_dotenv()
 
 class NLPEngine:
-    def __init__(self):
+    def __init__(self, workflow_triggers: Optional[Dict[str, str]] = None):
         logging.info("NLP Engine initialized with pattern matching")
         
+        # Longest phrases first so "start my day" wins over shorter overlaps. A trigger
+        # must be the whole command ("please run clinic research"), not a phrase inside
+        # a question ("is there any clinic research on feline diabetes")
+        self.workflow_triggers = [
+            (re.compile(rf"^(?:(?:can|could|would) you\s+)?(?:please\s+)?(?:(?:start|run|begin)\s+)?(?:the\s+)?"
+                        rf"{re.escape(phrase)}(?:\s+(?:please|now|for me))*[.!]*$"), workflow)
+            for phrase, workflow in sorted((workflow_triggers or {}).items(), key=lambda t: -len(t[0]))
+        ]
+        
+        self.websites = ["youtube", "gmail", "github", "reddit", "twitter", "facebook", 
+                         "linkedin", "instagram", "netflix", "amazon", "google", "wikipedia",
+                         "stackoverflow", "medium", "twitch", "discord", "spotify"]
+        
+        self.apps = ["chrome", "firefox", "edge", "vscode", "terminal", "notepad", "calculator"]
+        
+        self.fuzzy_matcher = None
+        if os.getenv("NLP_FUZZY_MATCHING", "true").lower() == "true":
+            self.fuzzy_matcher = FuzzyIntentMatcher(
+                self.websites, self.apps,
+                min_confidence=float(os.getenv("NLP_FUZZY_MIN_CONFIDENCE", "0.7"))
+            )
+        
         self.intent_patterns = {
             "open_application": [
                 r"(?:open|launch|start)\s+(\w+)",
@@ -22,16 +46,16 @@ class NLPEngine:
                 r"(?:can you |please )?(?:close|quit|exit)\s+(\w+)"
             ],
             "web_search": [
-                r"(?:search|google|look up|find)\s+(?:for\s+)?(.+)",
-                r"(?:can you |please )?(?:search|google)\s+(?:for\s+)?(.+)",
-                r"i (?:want to |need to )?(?:search|google)\s+(?:for\s+)?(.+)"
+                r"\b(?:search|google|look up|find)\s+(?:for\s+)?(.+)",
+                r"(?:can you |please )?\b(?:search|google)\s+(?:for\s+)?(.+)",
+                r"i (?:want to |need to )?\b(?:search|google)\s+(?:for\s+)?(.+)"
             ],
             "open_website": [
                 r"(?:open|new)\s+(?:a\s+)?(?:new\s+)?tab",
-                r"(?:go to|open|navigate to|visit)\s+(?:website\s+)?(.+)",
-                r"(?:can you |please )?(?:go to|open)\s+(?:website\s+)?(.+)",
-                r"show me\s+(.+)",
-                r"take me to\s+(.+)"
+                r"(?:go to|open|navigate to|visit)\s+(?:the\s+)?(?:website\s+)?(.+)",
+                r"(?:can you |please )?(?:go to|open)\s+(?:the\s+)?(?:website\s+)?(.+)",
+                r"show me\s+(?:the\s+)?(.+)",
+                r"take me to\s+(?:the\s+)?(.+)"
             ],
             "file_operation": [
                 r"(?:create|make)\s+(?:a\s+)?file\s+(?:called\s+)?(.+)",
@@ -63,33 +87,83 @@ class NLPEngine:
             ]
         }
     
+        
+        self.triage_patterns = {
+            "emergency": [
+                r"\b(?:ate|eaten|eating|swallowed|ingested|chewed|licked|got into)\b.*\b(?:poison|rat bait|rodenticide|antifreeze|xylitol|chocolate|grapes?|raisins?|ibuprofen|acetaminophen|tylenol|advil|lil(?:y|ies)|bleach|slug bait|insecticide)",
+                r"\b(?:rat|mouse|snail|slug)\s+(?:poison|bait)",
+                r"\b(?:not|isn'?t|stopped|can'?t|cannot|trouble|difficulty|struggling)\s+(?:breathing|breathe)",
+                r"\b(?:seizures?|seizing|convulsing|convulsions?)\b",
+                r"\b(?:hit by a (?:car|truck|vehicle)|run over)\b",
+                r"\b(?:unconscious|unresponsive|collapsed|passed out)\b",
+                r"\b(?:bleeding (?:heavily|a lot|badly|won'?t stop)|won'?t stop bleeding)\b",
+                r"\b(?:bloat(?:ed)?|swollen (?:belly|abdomen|stomach)).*\b(?:retching|dry heaving|trying to vomit)",
+                r"\b(?:heat ?stroke|snake ?bite|bitten by a snake)\b",
+                r"\bemergency\b"
+            ],
+            "urgent": [
+                r"\bvomiting (?:blood|repeatedly)\b",
+                r"\bblood(?:y)? (?:in|stool|urine|diarrh)",
+                r"\b(?:can'?t|unable to|straining to)\s+(?:pee|urinate)",
+                r"\b(?:not eating|won'?t eat|stopped eating)\b.*\b(?:days?|since)",
+                r"\b(?:limping|lame)\b.*\b(?:won'?t|can'?t|not)\s+(?:put|bear|use)",
+                r"\b(?:eye injury|swollen face|hives)\b"
+            ]
+        }
+    
     def is_ready(self) -> bool:
         return True
     
     async def process_command(self, text: str) -> Dict[str, Any]:
         text_lower = text.lower().strip()
         
-        action_intent = self._match_action_intent(text_lower)
+        triage = self.assess_urgency(text_lower)
+        
+        action_intent = self._match_action_intent(text_lower, triage)
         
         if action_intent:
+            action_intent["triage"] = triage
             return action_intent
         
         return {
             "intent": "conversation",
             "entities": {"query": text},
             "confidence": 0.9,
-            "original_text": text
+            "original_text": text,
+            "triage": triage
         }
     
-    def _match_action_intent(self, text: str) -> Dict[str, Any]:
-        websites = ["youtube", "gmail", "github", "reddit", "twitter", "facebook", 
-                   "linkedin", "instagram", "netflix", "amazon", "google", "wikipedia",
-                   "stackoverflow", "medium", "twitch", "discord", "spotify"]
+    def assess_urgency(self, text: str) -> Dict[str, Any]:
+        """Flag utterances that describe a veterinary emergency or an urgent problem"""
+        for level in ("emergency", "urgent"):
+            for pattern in self.triage_patterns[level]:
+                match = re.search(pattern, text, re.IGNORECASE)
+                if match:
+                    return {
+                        "level": level,
+                        "urgent": True,
+                        "signal": match.group(0)
+                    }
         
-        apps = ["chrome", "firefox", "edge", "vscode", "terminal", "notepad", "calculator"]
+        return {"level": "routine", "urgent": False, "signal": None}
+    
+    def _match_action_intent(self, text: str, triage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        websites = self.websites
+        apps = self.apps
         
         text_lower = text.lower()
         
+        # An emergency or urgent utterance is never turned into a browser routine
+        urgent = triage is not None and triage["urgent"]
+        for pattern, workflow in ([] if urgent else self.workflow_triggers):
+            if pattern.match(text_lower):
+                return {
+                    "intent": "run_workflow",
+                    "entities": {"workflow": workflow},
+                    "confidence": 0.97,
+                    "original_text": text
+                }
+        
         if "new tab" in text_lower or "open tab" in text_lower or "blank tab" in text_lower:
             return {
                 "intent": "open_website",
@@ -98,6 +172,18 @@ class NLPEngine:
                 "original_text": text
             }
         
+        if self.fuzzy_matcher:
+            # Handles exact names too, so the substring checks below only matter
+            # when fuzzy matching is disabled
+            fuzzy = self.fuzzy_matcher.match(text_lower)
+            if fuzzy:
+                return {
+                    "intent": fuzzy["intent"],
+                    "entities": {"target": fuzzy["target"]},
+                    "confidence": fuzzy["confidence"],
+                    "original_text": text
+                }
+        
         for site in websites:
             if f"open {site}" in text_lower or f"go to {site}" in text_lower or f"show me {site}" in text_lower or f"visit {site}" in text_lower:
                 return {
@@ -0,0 +1,169 @@
+import asyncio
+import difflib
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AI_INTENTS = ("conversation", "information")
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize_transcript(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def transcript_similarity(a: str, b: str) -> float:
+    """Word-level similarity between two normalized transcripts"""
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+
+
+class SpeculationStats:
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.superseded = 0
+        self.abandoned = 0
+        self.saved_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        resolved = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "superseded": self.superseded,
+            "abandoned": self.abandoned,
+            "hit_rate": round(self.hits / resolved, 3) if resolved else None,
+            "latency_saved_ms_total": round(self.saved_seconds * 1000, 1),
+            "latency_saved_ms_avg": round(self.saved_seconds * 1000 / self.hits, 1) if self.hits else None,
+        }
+
+
+class _Speculation:
+    def __init__(self, text: str, task: "asyncio.Task"):
+        self.text = text
+        self.task = task
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        task.add_done_callback(self._mark_finished)
+
+    def _mark_finished(self, task: "asyncio.Task"):
+        self.finished = time.monotonic()
+        if not task.cancelled():
+            # Retrieve the exception so discarded speculations do not log warnings
+            task.exception()
+
+
+class SpeculativeDispatcher:
+    """Starts the Gemini request from a stable interim transcript
+
+    Each interim transcript restarts a short debounce timer; if no newer interim
+    arrives before it fires, the transcript is considered stable and, when it
+    classifies as conversation/information, the Gemini call is started early.
+    When the final transcript arrives, resolve() keeps the speculative answer if
+    the texts are close enough and cancels it otherwise, so the caller re-issues
+    the request with the final text. One dispatcher exists per connection, with
+    at most one speculative upstream call in flight.
+    """
+
+    def __init__(self, classify: Callable[[str], Awaitable[Dict[str, Any]]],
+                 generate: Callable[[str, Dict[str, Any]], Awaitable[Tuple[str, Dict[str, Any]]]],
+                 stats: SpeculationStats):
+        self.classify = classify
+        self.generate = generate
+        self.stats = stats
+        self.stable_after = float(os.getenv("SPECULATION_STABLE_MS", "350")) / 1000
+        self.min_words = int(os.getenv("SPECULATION_MIN_WORDS", "3"))
+        self.match_threshold = float(os.getenv("SPECULATION_MATCH_THRESHOLD", "0.9"))
+
+        self.current: Optional[_Speculation] = None
+        self._cancelled: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    def on_interim(self, text: str, stable: bool = False):
+        """Feed an interim transcript; `stable` lets the client skip the debounce"""
+        normalized = normalize_transcript(text)
+        if len(normalized.split()) < self.min_words:
+            return
+        if self.current and self.current.text == normalized:
+            return
+
+        if self._timer:
+            self._timer.cancel()
+        delay = 0.0 if stable else self.stable_after
+        self._timer = asyncio.create_task(self._speculate_after(text, normalized, delay))
+
+    async def _speculate_after(self, text: str, normalized: str, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+
+        intent_data = await self.classify(text)
+        if intent_data["intent"] not in AI_INTENTS:
+            return
+
+        if self.current:
+            self._cancel_current()
+            self.stats.superseded += 1
+        if self._cancelled and not self._cancelled.done():
+            # A cancelled speculation runs until Gemini answers; waiting for it keeps
+            # each connection to one speculative upstream call at a time
+            await asyncio.wait({self._cancelled})
+
+        self.current = _Speculation(normalized, asyncio.create_task(self.generate(text, intent_data)))
+        self.stats.started += 1
+        logger.info(f"Speculatively dispatched Gemini request for: {text}")
+
+    async def resolve(self, final_text: str) -> Optional[Tuple[str, Dict[str, Any], float]]:
+        """Return (response, usage, seconds saved) if the speculation matches the final text"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        speculation, self.current = self.current, None
+        if speculation is None:
+            return None
+
+        final_arrived = time.monotonic()
+        similarity = transcript_similarity(normalize_transcript(final_text), speculation.text)
+        if similarity < self.match_threshold:
+            self._cancelled = speculation.task
+            speculation.task.cancel()
+            self.stats.misses += 1
+            logger.info(f"Speculation miss ({similarity:.2f}): '{speculation.text}' vs '{final_text}'")
+            return None
+
+        try:
+            response, usage = await speculation.task
+        except Exception as e:
+            # Shed by the scheduler or failed upstream; fall back to a normal request
+            logger.info(f"Speculative request failed, re-issuing: {e}")
+            self.stats.misses += 1
+            return None
+
+        # Without speculation the call would have started now and taken as long
+        duration = (speculation.finished or time.monotonic()) - speculation.started
+        saved = min(duration, final_arrived - speculation.started)
+        self.stats.hits += 1
+        self.stats.saved_seconds += saved
+        return response, usage, saved
+
+    def discard(self):
+        """Drop any speculation, e.g. when the final transcript is not a question"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self.current:
+            self._cancel_current()
+            self.stats.abandoned += 1
+
+    def _cancel_current(self):
+        self._cancelled, self.current = self.current.task, None
+        self._cancelled.cancel()
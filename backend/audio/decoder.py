@@ -0,0 +1,132 @@
+import asyncio
+import importlib.util
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+
+# PyAV bundles the FFmpeg libraries, so compressed uploads decode in-process
+# without spawning ffmpeg; it is optional and only imported on first use.
+AV_AVAILABLE = importlib.util.find_spec("av") is not None
+
+logger = logging.getLogger(__name__)
+
+# Formats speech_recognition.AudioFile reads without any decoding
+NATIVE_FORMATS = ("wav", "aiff", "flac")
+
+
+def sniff_format(data: bytes) -> str:
+    """Identify an audio container from its magic bytes"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"FORM" and data[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return "unknown"
+
+
+class AudioDecoder:
+    """Decodes compressed uploads (WebM/Ogg Opus, MP4/AAC, MP3) to 16-bit mono PCM
+
+    Decoding runs on a small dedicated thread pool. Each worker thread keeps
+    its resamplers, keyed by input sample format, layout and rate, so repeat
+    uploads from the same kind of client skip building a new filter graph. A
+    reused resampler holds back a few samples of filter delay; every request
+    is padded with silence so only silence carries over into the next one.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.max_seconds = float(os.getenv("AUDIO_MAX_SECONDS", "60"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("AUDIO_DECODE_WORKERS", "2")),
+            thread_name_prefix="audio-decode"
+        )
+        self._local = threading.local()
+        self.decoded = 0
+        self.resamplers_created = 0
+
+    def _resampler(self, frame: Any) -> Any:
+        import av
+
+        cache: Dict[Tuple[str, str, int], Any] = getattr(self._local, "resamplers", None)
+        if cache is None:
+            cache = self._local.resamplers = {}
+        key = (frame.format.name, frame.layout.name, frame.sample_rate)
+        resampler = cache.get(key)
+        if resampler is None:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=self.sample_rate)
+            cache[key] = resampler
+            self.resamplers_created += 1
+        return resampler
+
+    @staticmethod
+    def _silence_like(frame: Any, seconds: float) -> Any:
+        import av
+
+        silence = av.AudioFrame(format=frame.format.name, layout=frame.layout.name,
+                                samples=max(1, int(frame.sample_rate * seconds)))
+        for plane in silence.planes:
+            plane.update(bytes(plane.buffer_size))
+        silence.sample_rate = frame.sample_rate
+        return silence
+
+    def decode(self, data: bytes) -> bytes:
+        """Decode a whole upload to 16-bit little-endian mono PCM at sample_rate"""
+        if not AV_AVAILABLE:
+            raise Exception("Compressed audio needs PyAV (pip install av)")
+        import av
+
+        max_samples = int(self.max_seconds * self.sample_rate)
+        chunks = []
+        produced = 0
+        last_frame = None
+        resampler = None
+
+        try:
+            with av.open(io.BytesIO(data)) as container:
+                for frame in container.decode(audio=0):
+                    frame.pts = None
+                    resampler = self._resampler(frame)
+                    last_frame = frame
+                    for out in resampler.resample(frame):
+                        chunk = bytes(out.planes[0])[:out.samples * 2]
+                        chunks.append(chunk)
+                        produced += out.samples
+                    if produced >= max_samples:
+                        logger.warning(f"Audio upload longer than {self.max_seconds:.0f}s; truncating")
+                        break
+        except av.FFmpegError as e:
+            raise Exception(f"Could not decode audio: {e}")
+
+        if last_frame is None:
+            raise Exception("Audio upload contains no audio frames")
+
+        # Push the real audio out of the resampler's delay line and leave only silence behind
+        for out in resampler.resample(self._silence_like(last_frame, 0.02)):
+            chunks.append(bytes(out.planes[0])[:out.samples * 2])
+
+        self.decoded += 1
+        return b"".join(chunks)[:max_samples * 2]
+
+    async def decode_async(self, data: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.decode, data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": AV_AVAILABLE,
+            "decoded": self.decoded,
+            "resamplers_created": self.resamplers_created,
+        }
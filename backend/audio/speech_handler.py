@@ -1,64 +1,116 @@
 import base64
+import importlib.util
 import io
+import os
+import threading
 from typing import Optional
 import logging
 
-try:
-    import speech_recognition as sr
-    SR_AVAILABLE = True
-except ImportError:
-    SR_AVAILABLE = False
+from audio.decoder import NATIVE_FORMATS, AudioDecoder, sniff_format
+from audio.transcription_pool import TranscriptionPool
+from core.scheduler import to_thread_in_slot
 
-try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
+# The speech libraries are heavy (and pyttsx3.init() talks to the OS audio stack),
+# so only check that they are installed here and import them on first use.
+SR_AVAILABLE = importlib.util.find_spec("speech_recognition") is not None
+TTS_AVAILABLE = importlib.util.find_spec("pyttsx3") is not None
 
 logger = logging.getLogger(__name__)
 
 class SpeechHandler:
     def __init__(self):
-        self.recognizer = sr.Recognizer() if SR_AVAILABLE else None
-        self.tts_engine = None
+        self._recognizer = None
+        self._tts_engine = None
+        self._tts_failed = False
+        self._lock = threading.Lock()
+        self.decoder = AudioDecoder()
+        self.recognizer_method = os.getenv("SPEECH_RECOGNIZER", "google")
         
-        if TTS_AVAILABLE:
-            try:
-                self.tts_engine = pyttsx3.init()
-                self.tts_engine.setProperty('rate', 175)
-                self.tts_engine.setProperty('volume', 0.9)
-            except Exception as e:
-                logger.error(f"TTS initialization failed: {e}")
-        else:
+        # With TRANSCRIPTION_WORKERS > 0 recognition runs in worker processes
+        workers = int(os.getenv("TRANSCRIPTION_WORKERS", "0"))
+        self.pool = TranscriptionPool(workers) if workers > 0 else None
+        
+        if not TTS_AVAILABLE:
             logger.warning("pyttsx3 not available - text-to-speech disabled")
     
+    @property
+    def recognizer(self):
+        if self._recognizer is None and SR_AVAILABLE:
+            import speech_recognition as sr
+            self._recognizer = sr.Recognizer()
+        return self._recognizer
+    
+    @property
+    def tts_engine(self):
+        if self._tts_engine is None and TTS_AVAILABLE and not self._tts_failed:
+            with self._lock:
+                if self._tts_engine is None and not self._tts_failed:
+                    try:
+                        import pyttsx3
+                        engine = pyttsx3.init()
+                        engine.setProperty('rate', 175)
+                        engine.setProperty('volume', 0.9)
+                        self._tts_engine = engine
+                    except Exception as e:
+                        self._tts_failed = True
+                        logger.error(f"TTS initialization failed: {e}")
+        return self._tts_engine
+    
     def is_ready(self) -> bool:
-        return self.tts_engine is not None
+        """Whether TTS is usable; does not initialize the engine"""
+        if self._tts_engine is not None:
+            return True
+        return TTS_AVAILABLE and not self._tts_failed
+    
+    def start_workers(self):
+        """Start the transcription worker processes ahead of the first upload"""
+        if self.pool:
+            self.pool.start()
+    
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
     
     async def transcribe_audio(self, audio_data: str) -> str:
-        if not SR_AVAILABLE:
+        if self.pool is None and not SR_AVAILABLE:
             raise Exception("Speech recognition not available (install speech_recognition)")
         
         try:
             audio_bytes = base64.b64decode(audio_data)
             
-            audio_file = io.BytesIO(audio_bytes)
-            
-            with sr.AudioFile(audio_file) as source:
-                audio = self.recognizer.record(source)
+            if self.pool:
+                return await self.pool.transcribe(audio_bytes)
             
-            text = self.recognizer.recognize_google(audio)
+            pcm = None
+            if sniff_format(audio_bytes) not in NATIVE_FORMATS:
+                # Opus/WebM and friends straight from MediaRecorder
+                pcm = await self.decoder.decode_async(audio_bytes)
             
-            return text
+            # Reading the file and recognizing (a network call for most backends)
+            # block, so they run in a thread that keeps the caller's stage slot
+            return await to_thread_in_slot(self._recognize, audio_bytes, pcm)
             
         except Exception as e:
-            if 'UnknownValueError' in str(type(e)):
+            # Errors from worker processes carry the original exception name in `kind`
+            error_type = getattr(e, "kind", None) or str(type(e))
+            if 'UnknownValueError' in error_type:
                 raise Exception("Could not understand audio")
-            elif 'RequestError' in str(type(e)):
+            elif 'RequestError' in error_type:
                 raise Exception(f"Speech recognition service error: {e}")
             else:
                 raise Exception(f"Transcription error: {e}")
     
+    def _recognize(self, audio_bytes: bytes, pcm: Optional[bytes]) -> str:
+        import speech_recognition as sr
+        
+        if pcm is None:
+            with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+                audio = self.recognizer.record(source)
+        else:
+            audio = sr.AudioData(pcm, self.decoder.sample_rate, 2)
+        
+        return getattr(self.recognizer, f"recognize_{self.recognizer_method}")(audio)
+    
     def speak(self, text: str) -> bool:
         if not self.tts_engine:
             logger.warning("TTS engine not available")
@@ -77,6 +129,8 @@ class SpeechHandler:
             logger.error("Speech recognition not available")
             return None
         
+        import speech_recognition as sr
+        
         try:
             with sr.Microphone() as source:
                 logger.info("Listening...")
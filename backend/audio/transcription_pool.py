@@ -0,0 +1,306 @@
+import asyncio
+import importlib
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional
+
+from audio.decoder import NATIVE_FORMATS, AudioDecoder, sniff_format
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = "audio.transcription_pool:RecognizerEngine"
+
+# Recognizers that run a model locally and benefit from loading it at worker start
+LOCAL_RECOGNIZERS = ("sphinx", "vosk", "whisper", "faster_whisper")
+
+
+class TranscriptionError(Exception):
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+class RecognizerEngine:
+    """Default worker engine: speech_recognition with the SPEECH_RECOGNIZER backend"""
+
+    def __init__(self):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.method = os.getenv("SPEECH_RECOGNIZER", "google")
+        self.recognize = getattr(self.recognizer, f"recognize_{self.method}")
+        self.decoder = AudioDecoder()
+
+        if self.method in LOCAL_RECOGNIZERS:
+            # Load the model now rather than on the first real request
+            try:
+                self.recognize(sr.AudioData(bytes(3200), 16000, 2))
+            except sr.UnknownValueError:
+                pass
+
+    def transcribe(self, audio_bytes: memoryview) -> str:
+        if sniff_format(bytes(audio_bytes[:12])) in NATIVE_FORMATS:
+            with self.sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+                audio = self.recognizer.record(source)
+        else:
+            audio = self.sr.AudioData(self.decoder.decode(bytes(audio_bytes)), self.decoder.sample_rate, 2)
+        return self.recognize(audio)
+
+
+def _load_engine(spec: str):
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+def _worker_main(engine_spec: str, shm_name: str, conn):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Spawned workers share the parent's resource tracker, which unlinks the
+    # segment only if the parent dies without cleaning up
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        engine = _load_engine(engine_spec)
+    except Exception as e:
+        conn.send({"ready": False, "error": f"{type(e).__name__}: {e}"})
+        return
+    conn.send({"ready": True, "pid": os.getpid()})
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message["op"] == "stop":
+            break
+        if message["op"] == "ping":
+            conn.send({"pong": True})
+            continue
+
+        audio = message["data"] if "data" in message else shm.buf[:message["size"]]
+        try:
+            conn.send({"text": engine.transcribe(audio)})
+        except Exception as e:
+            conn.send({"error": str(e), "kind": type(e).__name__})
+        finally:
+            if isinstance(audio, memoryview):
+                audio.release()
+
+    shm.close()
+
+
+class _Worker:
+    def __init__(self, index: int, ctx: Any, engine_spec: str, shm_bytes: int):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=max(shm_bytes, 1))
+        self.shm_bytes = shm_bytes
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(engine_spec, self.shm.name, child_conn),
+                                   name=f"transcriber-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.started = time.monotonic()
+        self.jobs = 0
+
+    def wait_ready(self, timeout: float):
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"worker {self.index} not ready after {timeout:.0f}s")
+        reply = self.conn.recv()
+        if not reply["ready"]:
+            raise RuntimeError(f"worker {self.index} could not load its engine: {reply['error']}")
+
+    def run(self, audio: bytes, timeout: float) -> Dict[str, Any]:
+        if len(audio) <= self.shm_bytes:
+            self.shm.buf[:len(audio)] = audio
+            self.conn.send({"op": "transcribe", "size": len(audio)})
+        else:
+            # Larger than the segment: fall back to sending the bytes through the pipe
+            self.conn.send({"op": "transcribe", "data": audio})
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"no result after {timeout:.0f}s")
+        self.jobs += 1
+        return self.conn.recv()
+
+    def ping(self, timeout: float) -> bool:
+        try:
+            self.conn.send({"op": "ping"})
+            return self.conn.poll(timeout) and self.conn.recv().get("pong", False)
+        except (EOFError, OSError):
+            return False
+
+    def stop(self, timeout: float = 2.0):
+        try:
+            self.conn.send({"op": "stop"})
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class TranscriptionPool:
+    """Pool of transcription worker processes with shared-memory audio handoff
+
+    Each worker process loads its engine (and model) once at start-up and owns
+    a shared memory segment: the parent copies an upload into the segment and
+    sends only its size over the worker's pipe, so audio is never pickled.
+    Jobs go to whichever worker is idle. A worker that dies, hangs past the job
+    timeout or fails a periodic health ping is killed and replaced.
+    """
+
+    def __init__(self, size: Optional[int] = None, engine: Optional[str] = None):
+        self.size = size or int(os.getenv("TRANSCRIPTION_WORKERS", "0")) or os.cpu_count() or 1
+        self.engine = engine or os.getenv("TRANSCRIPTION_ENGINE", DEFAULT_ENGINE)
+        self.job_timeout = float(os.getenv("TRANSCRIPTION_JOB_TIMEOUT", "60"))
+        self.startup_timeout = float(os.getenv("TRANSCRIPTION_STARTUP_TIMEOUT", "120"))
+        self.health_interval = float(os.getenv("TRANSCRIPTION_HEALTH_INTERVAL", "10"))
+        self.shm_bytes = int(os.getenv("TRANSCRIPTION_SHM_BYTES", str(8 * 1024 * 1024)))
+        self._ctx = multiprocessing.get_context(os.getenv("TRANSCRIPTION_START_METHOD", "spawn"))
+
+        self.workers: Dict[int, _Worker] = {}
+        self._starting = set()
+        self._idle: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=2 * self.size + 1, thread_name_prefix="transcription-io")
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.completed = 0
+        self.failed = 0
+        self.crashed = 0
+        self.restarts = 0
+
+    def start(self):
+        """Spawn the workers in the background; jobs wait until one is ready"""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for index in range(self.size):
+            asyncio.create_task(self._spawn(index))
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _spawn(self, index: int):
+        if index in self.workers:
+            return
+        loop = asyncio.get_running_loop()
+        worker = None
+        self._starting.add(index)
+        try:
+            worker = await loop.run_in_executor(
+                self._executor, _Worker, index, self._ctx, self.engine, self.shm_bytes
+            )
+            await loop.run_in_executor(self._executor, worker.wait_ready, self.startup_timeout)
+        except Exception as e:
+            logger.error(f"Transcription worker {index} failed to start: {e}")
+            if worker:
+                await loop.run_in_executor(self._executor, worker.stop)
+            return
+        finally:
+            self._starting.discard(index)
+        if self._closed or index in self.workers:
+            await loop.run_in_executor(self._executor, worker.stop)
+            return
+        self.workers[index] = worker
+        self._idle.put_nowait(worker)
+        logger.info(f"Transcription worker {index} ready (pid {worker.process.pid})")
+
+    async def _restart(self, worker: _Worker, reason: str):
+        logger.warning(f"Restarting transcription worker {worker.index}: {reason}")
+        self.workers.pop(worker.index, None)
+        # Keep the slot claimed while the old worker stops, or the health loop
+        # would see it empty and spawn a second worker for it
+        self._starting.add(worker.index)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, worker.stop, 0.5)
+        finally:
+            self._starting.discard(worker.index)
+        if not self._closed:
+            self.restarts += 1
+            await self._spawn(worker.index)
+
+    def _settle(self, worker: _Worker, future: "asyncio.Future"):
+        # Runs when the job finishes, even if the caller stopped waiting for it
+        if future.cancelled() or future.exception() is not None:
+            self.crashed += 1
+            reason = "cancelled" if future.cancelled() else repr(future.exception())
+            asyncio.ensure_future(self._restart(worker, reason))
+        else:
+            self._idle.put_nowait(worker)
+
+    async def transcribe(self, audio: bytes) -> str:
+        self.start()
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), self.job_timeout)
+        except asyncio.TimeoutError:
+            raise TranscriptionError("Unavailable", "No transcription worker available")
+
+        future = asyncio.get_running_loop().run_in_executor(self._executor, worker.run, audio, self.job_timeout)
+        future.add_done_callback(lambda f: self._settle(worker, f))
+        try:
+            result = await asyncio.shield(future)
+        except (EOFError, OSError, TimeoutError) as e:
+            self.failed += 1
+            raise TranscriptionError("WorkerFailed", f"Transcription worker {worker.index} failed: {e!r}")
+
+        if "error" in result:
+            self.failed += 1
+            raise TranscriptionError(result["kind"], result["error"])
+        self.completed += 1
+        return result["text"]
+
+    async def _health_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.health_interval)
+            # Only idle workers are pinged; busy ones are covered by the job timeout
+            idle = []
+            while not self._idle.empty():
+                idle.append(self._idle.get_nowait())
+            checks = await asyncio.gather(*(
+                loop.run_in_executor(self._executor, worker.ping, 5.0) for worker in idle
+            ))
+            for worker, healthy in zip(idle, checks):
+                if healthy:
+                    self._idle.put_nowait(worker)
+                else:
+                    asyncio.ensure_future(self._restart(worker, "failed health check"))
+            for index in range(self.size):
+                if index not in self.workers and index not in self._starting:
+                    # Slot whose worker never came up; try again
+                    asyncio.ensure_future(self._spawn(index))
+
+    async def close(self):
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+        loop = asyncio.get_running_loop()
+        workers, self.workers = list(self.workers.values()), {}
+        await asyncio.gather(*(loop.run_in_executor(self._executor, worker.stop) for worker in workers))
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "size": self.size,
+            "engine": self.engine,
+            "ready": len(self.workers),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "crashed": self.crashed,
+            "restarts": self.restarts,
+            "workers": [
+                {"index": w.index, "pid": w.process.pid, "alive": w.process.is_alive(),
+                 "jobs": w.jobs, "uptime_s": round(now - w.started, 1)}
+                for w in sorted(self.workers.values(), key=lambda w: w.index)
+            ],
+        }
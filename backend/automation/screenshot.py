@@ -0,0 +1,113 @@
+import asyncio
+import importlib.util
+import io
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# format name -> (Pillow format, MIME type)
+FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+class ScreenshotEncoder:
+    """Captures and encodes screenshots on a worker thread
+
+    Grabbing the screen and encoding it take tens to hundreds of milliseconds
+    at full resolution, so both run on a small executor of their own. Pillow
+    releases the GIL while resizing and encoding, so the event loop keeps
+    serving other connections meanwhile. Images wider than max_width are
+    downscaled before encoding.
+    """
+
+    def __init__(self):
+        self.format = os.getenv("SCREENSHOT_FORMAT", "jpeg").lower()
+        self.quality = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+        self.max_width = int(os.getenv("SCREENSHOT_MAX_WIDTH", "1920"))
+        self.png_compress_level = int(os.getenv("SCREENSHOT_PNG_COMPRESS_LEVEL", "3"))
+        self.webp_method = int(os.getenv("SCREENSHOT_WEBP_METHOD", "4"))
+        if self.format not in FORMATS:
+            logger.warning(f"Unknown SCREENSHOT_FORMAT '{self.format}', using 'jpeg'")
+            self.format = "jpeg"
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv("SCREENSHOT_WORKERS", "1")),
+                                            thread_name_prefix="screenshot")
+        self.captured = 0
+        self.bytes_encoded = 0
+
+    def encode(self, image: Any, fmt: Optional[str] = None, quality: Optional[int] = None,
+               max_width: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+        from PIL import Image
+
+        fmt = fmt or self.format
+        quality = quality or self.quality
+        max_width = self.max_width if max_width is None else max_width
+        pil_format, mime = FORMATS[fmt]
+
+        started = time.perf_counter()
+        source_size = image.size
+        if max_width and image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        if image.mode not in ("RGB", "L") and fmt != "png":
+            image = image.convert("RGB")
+        resized = time.perf_counter()
+
+        options: Dict[str, Any] = {}
+        if fmt == "png":
+            options["compress_level"] = self.png_compress_level
+        elif fmt == "jpeg":
+            options.update(quality=quality, optimize=False)
+        else:
+            options.update(quality=quality, method=self.webp_method)
+        buf = io.BytesIO()
+        image.save(buf, pil_format, **options)
+        data = buf.getvalue()
+
+        return data, {
+            "format": fmt,
+            "mime": mime,
+            "width": image.width,
+            "height": image.height,
+            "source_width": source_size[0],
+            "source_height": source_size[1],
+            "quality": None if fmt == "png" else quality,
+            "bytes": len(data),
+            "resize_ms": round((resized - started) * 1000, 1),
+            "encode_ms": round((time.perf_counter() - resized) * 1000, 1),
+        }
+
+    def capture(self, fmt: Optional[str] = None, quality: Optional[int] = None,
+                max_width: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+        import pyautogui
+
+        started = time.perf_counter()
+        image = pyautogui.screenshot()
+        capture_ms = round((time.perf_counter() - started) * 1000, 1)
+        data, meta = self.encode(image, fmt, quality, max_width)
+        meta["capture_ms"] = capture_ms
+        self.captured += 1
+        self.bytes_encoded += len(data)
+        return data, meta
+
+    async def capture_async(self, fmt: Optional[str] = None, quality: Optional[int] = None,
+                            max_width: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.capture, fmt, quality, max_width)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "quality": self.quality,
+            "max_width": self.max_width,
+            "captured": self.captured,
+            "bytes_encoded": self.bytes_encoded,
+        }
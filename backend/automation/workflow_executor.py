@@ -1,18 +1,22 @@
+import asyncio
 import subprocess
+import time
 import webbrowser
-import psutil
 import platform
 import os
+import importlib.util
 from typing import Dict, Any, List
 from datetime import datetime
 import logging
 import urllib.parse
 
-try:
-    import pyautogui
-    PYAUTOGUI_AVAILABLE = True
-except ImportError:
-    PYAUTOGUI_AVAILABLE = False
+from automation.screenshot import FORMATS as SCREENSHOT_FORMATS, PIL_AVAILABLE, ScreenshotEncoder
+from automation.workflows import load_workflows
+
+# psutil and pyautogui are only needed by a few desktop-automation commands;
+# they are imported on first use to keep them out of process start-up.
+PYAUTOGUI_AVAILABLE = importlib.util.find_spec("pyautogui") is not None
+if not PYAUTOGUI_AVAILABLE:
     logging.warning("pyautogui not available - screenshot functionality disabled")
 
 logger = logging.getLogger(__name__)
@@ -32,6 +36,9 @@ class WorkflowExecutor:
             "notepad": self._get_app_command("notepad"),
             "calculator": self._get_app_command("calc"),
         }
+        
+        self.workflows = load_workflows()
+        self.screenshots = ScreenshotEncoder()
     
     def _open_url_wsl(self, url: str) -> bool:
         try:
@@ -101,6 +108,7 @@ class WorkflowExecutor:
             "time_date": self._time_date,
             "information": self._information,
             "conversation": self._conversation,
+            "run_workflow": self._run_workflow,
         }
         
         handler = handlers.get(intent, self._unknown_intent)
@@ -178,6 +186,8 @@ class WorkflowExecutor:
             return {"success": False, "message": "No application specified"}
         
         try:
+            import psutil
+            
             for proc in psutil.process_iter(['name']):
                 if app_name in proc.info['name'].lower():
                     proc.terminate()
@@ -350,21 +360,25 @@ class WorkflowExecutor:
         command = intent_data.get("original_text", "").lower()
         
         if "screenshot" in command:
-            if not PYAUTOGUI_AVAILABLE:
+            if not PYAUTOGUI_AVAILABLE or not PIL_AVAILABLE:
                 return {
                     "success": False,
-                    "message": "Screenshot functionality requires pyautogui (pip install pyautogui)"
+                    "message": "Screenshot functionality requires pyautogui and Pillow (pip install pyautogui pillow)"
                 }
+            # "take a screenshot as png" picks the format; otherwise SCREENSHOT_FORMAT
+            fmt = next((f for f in SCREENSHOT_FORMATS if f in command), "jpeg" if "jpg" in command else None)
             try:
-                screenshot = pyautogui.screenshot()
-                filename = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                screenshot.save(filename)
-                return {
-                    "success": True,
-                    "message": f"Screenshot saved as {filename}"
-                }
+                data, meta = await self.screenshots.capture_async(fmt)
             except Exception as e:
                 return {"success": False, "message": str(e)}
+            meta["captured_at"] = datetime.now().isoformat(timespec="seconds")
+            return {
+                "success": True,
+                "message": f"Screenshot captured ({meta['width']}x{meta['height']} {meta['format'].upper()}, {len(data) // 1024} KB)",
+                "data": {"screenshot": meta},
+                # Sent to WebSocket clients as a binary frame rather than inside the JSON result
+                "attachment": ("screenshot", meta, data)
+            }
         
         elif "volume" in command:
             action = entities.get("target", "")
@@ -446,6 +460,94 @@ class WorkflowExecutor:
             "data": {"needs_ai": True}
         }
     
+    async def _run_workflow(self, entities: Dict, intent_data: Dict) -> Dict[str, Any]:
+        name = entities.get("workflow", "")
+        workflow = self.workflows.get(name)
+        
+        if not workflow:
+            return {"success": False, "message": f"I don't know a routine called {name.replace('_', ' ')}"}
+        
+        return await self.execute_workflow(workflow)
+    
+    async def execute_workflow(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a workflow's steps as a DAG: independent steps run concurrently up to
+        the workflow's concurrency cap, and a step whose dependency did not succeed
+        is skipped. Returns one aggregated result with per-step status and timing."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, workflow["max_concurrency"]))
+        succeeded = {step["id"]: loop.create_future() for step in workflow["steps"]}
+        reports = {}
+        started = time.perf_counter()
+        
+        async def run_step(step: Dict[str, Any]):
+            try:
+                dependencies = [succeeded[d] for d in step["depends_on"]]
+                if dependencies and not all(await asyncio.gather(*dependencies)):
+                    reports[step["id"]] = {
+                        "id": step["id"], "intent": step["intent"], "status": "skipped",
+                        "message": "Skipped because a step it depends on did not succeed"
+                    }
+                    return
+                
+                async with semaphore:
+                    step_started = time.perf_counter()
+                    label = f"{workflow['name']}:{step['id']}"
+                    self.active_tasks.append(label)
+                    intent_data = {"intent": step["intent"], "entities": step["entities"], "original_text": step["text"]}
+                    try:
+                        result = await asyncio.wait_for(
+                            asyncio.to_thread(self._execute_blocking, intent_data), step["timeout"]
+                        )
+                        status = "succeeded" if result["success"] else "failed"
+                        message = result["message"]
+                    except asyncio.TimeoutError:
+                        status = "timed_out"
+                        message = f"Timed out after {step['timeout']:.0f}s"
+                    except Exception as e:
+                        logger.error(f"Workflow step {label} failed: {e}")
+                        status = "failed"
+                        message = f"Failed: {e}"
+                    finally:
+                        self.active_tasks.remove(label)
+                
+                reports[step["id"]] = {
+                    "id": step["id"],
+                    "intent": step["intent"],
+                    "status": status,
+                    "message": message,
+                    "started_ms": round((step_started - started) * 1000, 1),
+                    "duration_ms": round((time.perf_counter() - step_started) * 1000, 1),
+                }
+            finally:
+                # Dependents wait on this future, so it is resolved however the step ends
+                report = reports.get(step["id"])
+                if not succeeded[step["id"]].done():
+                    succeeded[step["id"]].set_result(report is not None and report["status"] == "succeeded")
+        
+        await asyncio.gather(*(run_step(step) for step in workflow["steps"]))
+        
+        steps = [reports[step["id"]] for step in workflow["steps"]]
+        completed = sum(1 for step in steps if step["status"] == "succeeded")
+        message = f"{workflow['description']}: {completed} of {len(steps)} steps done"
+        problems = [step["id"] for step in steps if step["status"] != "succeeded"]
+        if problems:
+            message += f" ({', '.join(problems)} did not complete)"
+        
+        return {
+            "success": completed == len(steps),
+            "message": message,
+            "data": {
+                "workflow": workflow["name"],
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "steps": steps,
+            }
+        }
+    
+    def _execute_blocking(self, intent_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Step handlers do blocking work (launching processes and browsers), so each
+        # step runs on a worker thread with its own event loop
+        return asyncio.run(self.execute(intent_data))
+    
     async def _unknown_intent(self, entities: Dict, intent_data: Dict) -> Dict[str, Any]:
         original = intent_data.get("original_text", "")
         return {
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKFLOWS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workflows.json")
+
+
+class WorkflowError(ValueError):
+    pass
+
+
+def _validate(name: str, definition: Dict[str, Any]) -> Dict[str, Any]:
+    steps = definition.get("steps")
+    if not steps:
+        raise WorkflowError(f"workflow '{name}' has no steps")
+
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for index, step in enumerate(steps):
+        step_id = step.get("id") or f"step{index + 1}"
+        if step_id in by_id:
+            raise WorkflowError(f"workflow '{name}' has duplicate step id '{step_id}'")
+        if not step.get("intent"):
+            raise WorkflowError(f"step '{step_id}' in workflow '{name}' has no intent")
+        if step["intent"] == "run_workflow":
+            raise WorkflowError(f"step '{step_id}' in workflow '{name}' cannot start another workflow")
+        by_id[step_id] = {
+            "id": step_id,
+            "intent": step["intent"],
+            "entities": step.get("entities", {}),
+            "text": step.get("text", ""),
+            "depends_on": list(step.get("depends_on", [])),
+            "timeout": float(step.get("timeout", definition.get("step_timeout", 30))),
+        }
+
+    for step in by_id.values():
+        for dependency in step["depends_on"]:
+            if dependency not in by_id:
+                raise WorkflowError(f"step '{step['id']}' in workflow '{name}' depends on unknown step '{dependency}'")
+
+    # Kahn's algorithm; anything left over sits on a cycle
+    remaining = {step_id: set(step["depends_on"]) for step_id, step in by_id.items()}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise WorkflowError(f"workflow '{name}' has a dependency cycle between {sorted(remaining)}")
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    return {
+        "name": name,
+        "description": definition.get("description", name.replace("_", " ")),
+        "triggers": [t.lower() for t in definition.get("triggers", [])],
+        "max_concurrency": int(definition.get("max_concurrency", os.getenv("WORKFLOW_MAX_CONCURRENCY", "4"))),
+        "steps": list(by_id.values()),
+    }
+
+
+def load_workflows(path: str = None) -> Dict[str, Dict[str, Any]]:
+    """Load and validate workflow definitions; invalid workflows are skipped"""
+    path = path or os.getenv("WORKFLOWS_FILE", DEFAULT_WORKFLOWS_FILE)
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path) as f:
+            raw = json.load(f).get("workflows", {})
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read workflows from {path}: {e}")
+        return {}
+
+    workflows = {}
+    for name, definition in raw.items():
+        try:
+            workflows[name] = _validate(name, definition)
+        except WorkflowError as e:
+            logger.error(f"Skipping invalid workflow: {e}")
+    return workflows
+
+
+def workflow_triggers(workflows: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """Map trigger phrases (plus 'run <name>') to workflow names"""
+    triggers = {}
+    for name, workflow in workflows.items():
+        spoken_name = name.replace("_", " ")
+        triggers[f"run {spoken_name}"] = name
+        triggers[f"start {spoken_name}"] = name
+        for phrase in workflow["triggers"]:
+            triggers[phrase] = name
+    return triggers
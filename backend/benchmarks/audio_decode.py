@@ -0,0 +1,133 @@
+"""Upload size and decode cost of compressed audio versus WAV
+
+    python -m benchmarks.audio_decode --seconds 1 5 15 --runs 20
+
+Synthesizes speech-like audio, encodes it the way browsers upload it (16-bit
+WAV, and Opus in WebM/Ogg as produced by MediaRecorder) and reports upload
+size per second of audio plus the time AudioDecoder needs to turn each upload
+into 16 kHz mono PCM, with warm (reused) and cold resamplers. Requires PyAV.
+"""
+import argparse
+import base64
+import io
+import math
+import random
+import struct
+import sys
+import time
+import wave
+from typing import Any, Dict, List
+
+from audio.decoder import AV_AVAILABLE, AudioDecoder
+from benchmarks.common import summarize_latencies, write_results
+
+SOURCE_RATE = 48000
+
+
+def synthesize(seconds: float, rate: int = SOURCE_RATE) -> List[int]:
+    """Voiced harmonics under a syllable-rate envelope, plus a little noise"""
+    random.seed(7)
+    samples = []
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        pitch = 140 + 30 * math.sin(2 * math.pi * 0.7 * t)
+        envelope = max(0.0, math.sin(2 * math.pi * 3.5 * t)) ** 2
+        voiced = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in range(1, 6))
+        samples.append(int(max(-1.0, min(1.0, 0.35 * envelope * voiced + random.gauss(0, 0.01))) * 32767))
+    return samples
+
+
+def encode_wav(samples: List[int], rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buf.getvalue()
+
+
+def encode_opus(samples: List[int], container: str, bitrate: int) -> bytes:
+    import av
+
+    buf = io.BytesIO()
+    with av.open(buf, "w", format=container) as output:
+        stream = output.add_stream("libopus", rate=SOURCE_RATE)
+        stream.layout = "mono"
+        stream.bit_rate = bitrate
+        frame_size = 960
+        for start in range(0, len(samples), frame_size):
+            chunk = samples[start:start + frame_size]
+            frame = av.AudioFrame(format="s16", layout="mono", samples=len(chunk))
+            frame.planes[0].update(struct.pack(f"<{len(chunk)}h", *chunk))
+            frame.sample_rate = SOURCE_RATE
+            frame.pts = start
+            for packet in stream.encode(frame):
+                output.mux(packet)
+        for packet in stream.encode(None):
+            output.mux(packet)
+    return buf.getvalue()
+
+
+def time_decode(data: bytes, runs: int, reuse: bool) -> Dict[str, float]:
+    decoder = AudioDecoder()
+    decoder.decode(data)
+    samples = []
+    for _ in range(runs):
+        if not reuse:
+            decoder = AudioDecoder()
+        started = time.perf_counter()
+        decoder.decode(data)
+        samples.append(time.perf_counter() - started)
+    return summarize_latencies(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1, 5, 15])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--bitrate", type=int, default=32000, help="Opus bitrate in bits/s")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    if not AV_AVAILABLE:
+        sys.exit("PyAV is not installed (pip install av)")
+
+    results: Dict[str, Any] = {"config": {"runs": args.runs, "bitrate": args.bitrate}, "cases": []}
+    for seconds in args.seconds:
+        samples = synthesize(seconds)
+        uploads = {
+            "wav_48k": encode_wav(samples, SOURCE_RATE),
+            "wav_16k": encode_wav(samples[::3], 16000),
+            "webm_opus": encode_opus(samples, "webm", args.bitrate),
+            "ogg_opus": encode_opus(samples, "ogg", args.bitrate),
+        }
+        wav_size = len(uploads["wav_48k"])
+        for name, data in uploads.items():
+            case = {
+                "format": name,
+                "seconds": seconds,
+                "bytes": len(data),
+                "base64_bytes": len(base64.b64encode(data)),
+                "bytes_per_second": round(len(data) / seconds),
+                "size_vs_wav_48k": round(len(data) / wav_size, 3),
+            }
+            if not name.startswith("wav"):
+                warm = time_decode(data, args.runs, reuse=True)
+                cold = time_decode(data, args.runs, reuse=False)
+                case["decode_warm"] = warm
+                case["decode_cold"] = cold
+                case["decode_ms_per_audio_second"] = round(warm["p50_ms"] / seconds, 3)
+            results["cases"].append(case)
+
+            line = f"{seconds:>5.1f}s {name:<10} {len(data):>9} B  {case['bytes_per_second']:>7} B/s  x{case['size_vs_wav_48k']:<6}"
+            if "decode_warm" in case:
+                line += (f" decode p50 {case['decode_warm']['p50_ms']} ms warm / {case['decode_cold']['p50_ms']} ms cold"
+                         f" ({case['decode_ms_per_audio_second']} ms per audio second)")
+            print(line)
+
+    print(f"\nResults written to {write_results('audio_decode', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Fan-out benchmark for the topic broadcaster
+
+    python -m benchmarks.broadcast --clients 1000 10000 --rounds 20 --stuck 0.01
+
+Publishes a message to simulated WebSocket clients whose sends take a small
+random time, a fraction of which never complete (nor does closing them, as
+with a real socket whose peer stopped reading). Reports end-to-end publish
+latency, CPU time per publish and how many stuck clients were evicted, and
+compares against a naive loop that encodes the payload per client and awaits
+each send in turn (run only for fast clients, since a stuck client would block
+it forever).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import summarize_latencies, write_results
+
+MESSAGE = {
+    "event": "alert",
+    "severity": "high",
+    "message": "Clinic schedule change: all afternoon appointments move to room 2",
+    "data": {"room": 2, "starts_at": "13:00", "tags": ["schedule", "clinic", "rooms"]},
+}
+
+
+class FakeClient:
+    def __init__(self, latency: float, stuck: bool):
+        self.latency = latency
+        self.stuck = stuck
+        self.received = 0
+        self.closed = False
+
+    async def send_text(self, payload: str):
+        if self.stuck:
+            await asyncio.Event().wait()
+        await asyncio.sleep(random.expovariate(1 / self.latency) if self.latency else 0)
+        self.received += 1
+
+    async def close(self):
+        self.closed = True
+        if self.stuck:
+            await asyncio.Event().wait()
+
+
+def make_clients(count: int, latency: float, stuck_fraction: float) -> List[FakeClient]:
+    stuck = set(random.sample(range(count), int(count * stuck_fraction)))
+    return [FakeClient(latency, i in stuck) for i in range(count)]
+
+
+async def run_fanout(count: int, rounds: int, latency: float, stuck_fraction: float) -> Dict[str, Any]:
+    from core.broadcast import Broadcaster
+
+    broadcaster = Broadcaster()
+    clients = make_clients(count, latency, stuck_fraction)
+    for index, client in enumerate(clients):
+        broadcaster.subscribe(index, client.send_text, ["alerts"], on_evict=client.close)
+
+    wall, cpu = [], []
+    for _ in range(rounds):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        await broadcaster.publish("alerts", MESSAGE)
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - cpu_started)
+
+    healthy = [c for c in clients if not c.stuck]
+    return {
+        "clients": count,
+        "stuck_clients": count - len(healthy),
+        "publish": summarize_latencies(wall),
+        "cpu_per_publish": summarize_latencies(cpu),
+        "delivery_rate": round(sum(c.received for c in healthy) / (len(healthy) * rounds), 4) if healthy else None,
+        "evicted": broadcaster.evicted,
+        "stuck_closed": sum(1 for c in clients if c.stuck and c.closed),
+    }
+
+
+async def run_naive(count: int, rounds: int, latency: float) -> Dict[str, Any]:
+    clients = make_clients(count, latency, 0.0)
+
+    wall, cpu = [], []
+    for _ in range(rounds):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        for client in clients:
+            await client.send_text(json.dumps(dict(MESSAGE, type="broadcast", topic="alerts")))
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - cpu_started)
+
+    return {"clients": count, "publish": summarize_latencies(wall), "cpu_per_publish": summarize_latencies(cpu)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Mean simulated send time per client")
+    parser.add_argument("--stuck", type=float, default=0.01, help="Fraction of clients whose sends never complete")
+    parser.add_argument("--send-timeout", type=float, default=0.25)
+    parser.add_argument("--naive-rounds", type=int, default=3, help="Rounds for the sequential baseline (0 to skip)")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    os.environ["BROADCAST_SEND_TIMEOUT"] = str(args.send_timeout)
+    latency = args.latency_ms / 1000
+
+    results = {
+        "config": {"rounds": args.rounds, "latency_ms": args.latency_ms, "stuck": args.stuck,
+                   "send_timeout": args.send_timeout},
+        "fanout": [],
+        "naive": [],
+    }
+    for count in args.clients:
+        fanout = asyncio.run(run_fanout(count, args.rounds, latency, args.stuck))
+        results["fanout"].append(fanout)
+        print(f"fan-out  {count:>6} clients: p50 {fanout['publish']['p50_ms']} ms, "
+              f"p99 {fanout['publish']['p99_ms']} ms, cpu p50 {fanout['cpu_per_publish']['p50_ms']} ms, "
+              f"delivered {fanout['delivery_rate']:.1%}, evicted {fanout['evicted']}/{fanout['stuck_clients']} stuck")
+
+        if args.naive_rounds:
+            naive = asyncio.run(run_naive(count, args.naive_rounds, latency))
+            results["naive"].append(naive)
+            print(f"naive    {count:>6} clients: p50 {naive['publish']['p50_ms']} ms, "
+                  f"cpu p50 {naive['cpu_per_publish']['p50_ms']} ms (no stuck clients)")
+
+    print(f"\nResults written to {write_results('broadcast', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub_server(port: int, extra_args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None,
+                      timeout: float = 20.0) -> subprocess.Popen:
+    """Start benchmarks.stub_server in a subprocess and wait until it accepts connections"""
+    process_env = dict(os.environ)
+    process_env.update(env or {})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port)] + (extra_args or []),
+        cwd=BACKEND_DIR,
+        env=process_env,
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Stub server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.05)
+
+    process.terminate()
+    raise RuntimeError("Stub server did not start in time")
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(name: str, results: Dict[str, Any], output: Optional[str] = None) -> str:
+    """Write a benchmark result document as JSON and return its path"""
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+
+    document = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+    }
+    document.update(results)
+
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    return output
@@ -0,0 +1,50 @@
+"""Compare two benchmark result files
+
+    python -m benchmarks.compare baseline.json candidate.json
+
+Prints every numeric metric found in both files with its relative change.
+"""
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+
+def flatten(document: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(document, dict):
+        for key, value in document.items():
+            if key in ("config", "environment"):
+                continue
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(document, (int, float)) and not isinstance(document, bool):
+        yield prefix, float(document)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Iterator[Tuple[str, float, float, float]]:
+    before = dict(flatten(baseline))
+    for key, after in flatten(candidate):
+        if key not in before:
+            continue
+        old = before[key]
+        change = (after - old) / old * 100 if old else 0.0
+        yield key, old, after, change
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--min-change", type=float, default=0.0, help="Only show metrics that moved this many percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    for key, old, new, change in compare(baseline, candidate):
+        if abs(change) >= args.min_change:
+            print(f"{key:<48} {old:>12.3f} -> {new:>12.3f}  ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
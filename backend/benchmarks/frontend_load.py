@@ -0,0 +1,133 @@
+"""First-load and repeat-load cost of the frontend served by the backend
+
+    python -m benchmarks.frontend_load --dist ../frontend/dist --runs 20
+
+Starts the stub server with FRONTEND_DIST pointing at a built frontend
+(npm run build:single), then loads index.html and every same-origin script and
+stylesheet it references the way a browser would:
+
+- first load: empty cache, one GET per file
+- repeat load: index.html revalidated with If-None-Match (304); hashed assets
+  are immutable and not requested at all
+- revalidate all: every file revalidated, which is what a browser does when
+  assets carry no long-lived Cache-Control
+
+Each is run with Accept-Encoding identity, gzip and br, and reports requests,
+bytes on the wire (headers plus body) and wall time over one keep-alive
+connection.
+"""
+import argparse
+import http.client
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.common import BACKEND_DIR, free_port, start_stub_server, stop_process, summarize_latencies, write_results
+
+ACCEPT_ENCODINGS = {"identity": "identity", "gzip": "gzip, deflate", "br": "gzip, deflate, br"}
+
+LOCAL_REFERENCE = re.compile(r'(?:src|href)="(/[^/"][^"]*)"')
+
+
+class Client:
+    def __init__(self, port: int, accept_encoding: str):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port)
+        self.accept_encoding = accept_encoding
+
+    def get(self, path: str, etag: Optional[str] = None, accept: str = "*/*") -> Tuple[int, bytes, Dict[str, str], int]:
+        headers = {"Accept-Encoding": self.accept_encoding, "Accept": accept}
+        if etag:
+            headers["If-None-Match"] = etag
+        self.conn.request("GET", path, headers=headers)
+        response = self.conn.getresponse()
+        body = response.read()
+        header_bytes = sum(len(k) + len(v) + 4 for k, v in response.getheaders()) + 17
+        return response.status, body, dict(response.getheaders()), header_bytes + len(body)
+
+    def close(self):
+        self.conn.close()
+
+
+def discover(port: int) -> List[str]:
+    import gzip
+
+    client = Client(port, "gzip")
+    _, body, headers, _ = client.get("/", accept="text/html")
+    client.close()
+    if headers.get("content-encoding") == "gzip":
+        body = gzip.decompress(body)
+    return sorted(set(LOCAL_REFERENCE.findall(body.decode())))
+
+
+def load(port: int, accept_encoding: str, assets: List[str], cache: Optional[Dict[str, Any]] = None,
+         revalidate_immutable: bool = False) -> Dict[str, Any]:
+    client = Client(port, accept_encoding)
+    requests = 0
+    wire_bytes = 0
+    not_modified = 0
+    seen: Dict[str, Any] = {}
+    started = time.perf_counter()
+    for path in ["/"] + assets:
+        cached = (cache or {}).get(path)
+        if cached and "immutable" in cached["cache_control"] and not revalidate_immutable:
+            seen[path] = cached
+            continue
+        status, _, headers, size = client.get(path, cached["etag"] if cached else None,
+                                              "text/html" if path == "/" else "*/*")
+        requests += 1
+        wire_bytes += size
+        not_modified += status == 304
+        seen[path] = {"etag": headers.get("etag"), "cache_control": headers.get("cache-control", "")}
+    elapsed = time.perf_counter() - started
+    client.close()
+    return {"requests": requests, "bytes": wire_bytes, "not_modified": not_modified, "seconds": elapsed, "cache": seen}
+
+
+def run_scenarios(port: int, assets: List[str], runs: int) -> Dict[str, Any]:
+    results = {}
+    for name, accept_encoding in ACCEPT_ENCODINGS.items():
+        scenarios: Dict[str, List[Dict[str, Any]]] = {"first_load": [], "repeat_load": [], "revalidate_all": []}
+        for _ in range(runs):
+            first = load(port, accept_encoding, assets)
+            scenarios["first_load"].append(first)
+            scenarios["repeat_load"].append(load(port, accept_encoding, assets, first["cache"]))
+            scenarios["revalidate_all"].append(load(port, accept_encoding, assets, first["cache"], True))
+        results[name] = {
+            scenario: {
+                "requests": samples[-1]["requests"],
+                "not_modified": samples[-1]["not_modified"],
+                "bytes": samples[-1]["bytes"],
+                "latency": summarize_latencies([s["seconds"] for s in samples]),
+            }
+            for scenario, samples in scenarios.items()
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dist", default=os.path.join(BACKEND_DIR, "..", "frontend", "dist"))
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_stub_server(port, env={"FRONTEND_DIST": os.path.abspath(args.dist)})
+    try:
+        assets = discover(port)
+        results: Dict[str, Any] = {"config": {"dist": os.path.abspath(args.dist), "runs": args.runs, "assets": assets},
+                                   "encodings": run_scenarios(port, assets, args.runs)}
+    finally:
+        stop_process(server)
+
+    print(f"{len(assets)} assets referenced by index.html\n")
+    for encoding, scenarios in results["encodings"].items():
+        for scenario, r in scenarios.items():
+            print(f"{encoding:<9} {scenario:<15} {r['requests']:>3} requests ({r['not_modified']:>2} x 304) "
+                  f"{r['bytes']:>9} B  p50 {r['latency']['p50_ms']:>7} ms")
+    print(f"\nResults written to {write_results('frontend_load', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Accuracy and latency benchmark for ASR-tolerant intent matching
+
+    python -m benchmarks.fuzzy_intent --iterations 200 --max-relative-cost 25
+
+Classifies a corpus of noisy transcripts with and without the fuzzy matching
+stage and reports accuracy and per-utterance latency of the fuzzy matcher.
+The confidence curve was tuned on noisy_transcripts.jsonl, so accuracy and the
+confidence reliability table are also reported on a held-out set
+(noisy_transcripts_holdout.jsonl) that must never be used for tuning.
+
+Exits non-zero if the slowest utterance's median match time exceeds
+--max-relative-cost times the median time of a fixed calibration workload run
+on the same utterance, interleaved in the same process. Medians ignore
+preemption spikes and the ratio follows code changes rather than the machine,
+so the gate does not flake the way an absolute p99 budget does.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import statistics
+import time
+from typing import Any, Dict, List
+
+from ai.nlp_engine import NLPEngine
+from benchmarks.common import summarize_latencies, write_results
+from benchmarks.nlp_regression import calibration_pass
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_CORPUS = os.path.join(DATA_DIR, "noisy_transcripts.jsonl")
+DEFAULT_HOLDOUT = os.path.join(DATA_DIR, "noisy_transcripts_holdout.jsonl")
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_correct(case: Dict[str, Any], result: Dict[str, Any]) -> bool:
+    if result["intent"] != case["intent"]:
+        return False
+    return case["target"] is None or result["entities"].get("target") == case["target"]
+
+
+def evaluate(engine: NLPEngine, corpus: List[Dict[str, Any]]) -> Dict[str, Any]:
+    correct = 0
+    failures = []
+    for case in corpus:
+        result = asyncio.run(engine.process_command(case["text"]))
+        if is_correct(case, result):
+            correct += 1
+        else:
+            failures.append({"text": case["text"], "expected": case["intent"], "expected_target": case["target"],
+                             "got": result["intent"], "got_target": result["entities"].get("target")})
+    return {"accuracy": round(correct / len(corpus), 4), "correct": correct, "total": len(corpus), "failures": failures}
+
+
+def reliability(engine: NLPEngine, corpus: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Observed precision of fuzzy matches per confidence bin"""
+    bins = {}
+    for case in corpus:
+        match = engine.fuzzy_matcher.match(case["text"])
+        if not match:
+            continue
+        low = min(0.9, int(match["confidence"] * 10) / 10)
+        hit = match["intent"] == case["intent"] and match["target"] == case["target"]
+        total, hits = bins.get(low, (0, 0))
+        bins[low] = (total + 1, hits + int(hit))
+    return [
+        {"confidence": f"{low:.1f}-{low + 0.1:.1f}", "matches": total, "precision": round(hits / total, 3)}
+        for low, (total, hits) in sorted(bins.items())
+    ]
+
+
+def measure_latency(engine: NLPEngine, corpus: List[Dict[str, Any]], iterations: int) -> Dict[str, Any]:
+    texts = [case["text"].lower() for case in corpus]
+    matcher = engine.fuzzy_matcher
+
+    fuzzy = {text: [] for text in texts}
+    calibration = {text: [] for text in texts}
+    full = []
+    for _ in range(iterations):
+        for text in texts:
+            started = time.perf_counter()
+            matcher.match(text)
+            fuzzy[text].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            calibration_pass([text])
+            calibration[text].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            engine._match_action_intent(text)
+            full.append(time.perf_counter() - started)
+
+    def to_us(stats: Dict[str, float]) -> Dict[str, float]:
+        return {k.replace("_ms", "_us"): (round(v * 1000, 2) if k.endswith("_ms") else v) for k, v in stats.items()}
+
+    slowest_text, slowest = max(((text, statistics.median(samples)) for text, samples in fuzzy.items()),
+                                key=lambda item: item[1])
+    calibration_median = statistics.median(statistics.median(samples) for samples in calibration.values())
+    return {
+        "fuzzy_match": to_us(summarize_latencies([t for samples in fuzzy.values() for t in samples])),
+        "action_intent": to_us(summarize_latencies(full)),
+        "slowest_utterance": {"text": slowest_text, "median_us": round(slowest * 1e6, 2)},
+        "calibration_median_us": round(calibration_median * 1e6, 2),
+        "relative_cost": round(slowest / calibration_median, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus the confidence curve was tuned on")
+    parser.add_argument("--holdout", default=DEFAULT_HOLDOUT, help="Held-out corpus for accuracy and reliability")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--max-relative-cost", type=float, default=25.0,
+                        help="Budget for the slowest utterance, in calibration-workload units")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    holdout = load_corpus(args.holdout)
+
+    fuzzy_engine = NLPEngine()
+    if fuzzy_engine.fuzzy_matcher is None:
+        sys.exit("Fuzzy matching is disabled (NLP_FUZZY_MATCHING=false)")
+    exact_engine = NLPEngine()
+    exact_engine.fuzzy_matcher = None
+
+    with_fuzzy = evaluate(fuzzy_engine, corpus)
+    without_fuzzy = evaluate(exact_engine, corpus)
+    held_out = evaluate(fuzzy_engine, holdout)
+    latency = measure_latency(fuzzy_engine, corpus, args.iterations)
+    within_budget = latency["relative_cost"] <= args.max_relative_cost
+
+    results = {
+        "config": {"corpus": os.path.relpath(args.corpus), "holdout": os.path.relpath(args.holdout),
+                   "iterations": args.iterations, "max_relative_cost": args.max_relative_cost},
+        "accuracy": {"fuzzy": with_fuzzy, "exact_only": without_fuzzy, "holdout": held_out},
+        "reliability": reliability(fuzzy_engine, holdout),
+        "latency": latency,
+        "passed": within_budget,
+    }
+
+    print(f"accuracy with fuzzy matching: {with_fuzzy['accuracy']:.1%} ({with_fuzzy['correct']}/{with_fuzzy['total']})")
+    print(f"accuracy exact matching only: {without_fuzzy['accuracy']:.1%} ({without_fuzzy['correct']}/{without_fuzzy['total']})")
+    for failure in with_fuzzy["failures"]:
+        print(f"  miss: {failure['text']!r} -> {failure['got']} {failure['got_target']!r}")
+    print(f"held-out accuracy: {held_out['accuracy']:.1%} ({held_out['correct']}/{held_out['total']})")
+    for failure in held_out["failures"]:
+        print(f"  miss: {failure['text']!r} -> {failure['got']} {failure['got_target']!r}")
+    print("confidence reliability (held-out):")
+    for row in results["reliability"]:
+        print(f"  {row['confidence']}  n={row['matches']:<4} precision={row['precision']:.2f}")
+    stats = latency["fuzzy_match"]
+    print(f"fuzzy match latency: p50 {stats['p50_us']} us, p99 {stats['p99_us']} us")
+    print(f"slowest utterance {latency['slowest_utterance']['text']!r}: median "
+          f"{latency['slowest_utterance']['median_us']} us = {latency['relative_cost']} x calibration "
+          f"({latency['calibration_median_us']} us, budget {args.max_relative_cost:g} x)")
+    if not within_budget:
+        print("FAIL: fuzzy matcher exceeds its latency budget")
+
+    print(f"\nResults written to {write_results('fuzzy_intent', results, args.output)}")
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Accuracy and throughput regression check for NLPEngine
+
+    python -m benchmarks.nlp_regression
+    python -m benchmarks.nlp_regression --update-baseline
+
+Classifies the golden corpus in benchmarks/data/nlp_golden.jsonl (utterances
+with expected intent, entities and optionally triage level), reports
+per-intent precision and recall plus classification throughput, and compares
+both against the checked-in baseline in benchmarks/data/nlp_baseline.json.
+Exits non-zero if overall accuracy or any intent's precision/recall falls
+below the baseline, if a case fails that is not among the baseline's
+known_failures, or if throughput drops by more than --max-slowdown. Fixing a
+known failure raises the scores; refresh the baseline with --update-baseline
+when that happens.
+
+Throughput is compared relative to a fixed calibration workload (regex
+matching over the same utterances) timed in the same process, so the check
+follows code changes rather than the speed of the machine it runs on.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from ai.nlp_engine import NLPEngine
+from automation.workflows import load_workflows, workflow_triggers
+from benchmarks.common import summarize_latencies, write_results
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_CORPUS = os.path.join(DATA_DIR, "nlp_golden.jsonl")
+DEFAULT_BASELINE = os.path.join(DATA_DIR, "nlp_baseline.json")
+
+# Independent of NLPEngine, so changes to the engine never move the calibration
+CALIBRATION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"(?:open|launch|start)\s+(\w+)",
+    r"(?:search|google|look up|find)\s+(?:for\s+)?(.+)",
+    r"what(?:'s|\s+is)\s+(?!the\s+time)(.+)",
+    r"\b(?:seizures?|seizing|convulsing)\b",
+    r"\b(?:not|stopped|can'?t)\s+(?:breathing|breathe)",
+)]
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_engine() -> NLPEngine:
+    # Same configuration as the server, so workflow triggers take part in matching
+    return NLPEngine(workflow_triggers=workflow_triggers(load_workflows()))
+
+
+def case_errors(case: Dict[str, Any], result: Dict[str, Any]) -> List[str]:
+    errors = []
+    if result["intent"] != case["intent"]:
+        errors.append(f"intent {result['intent']} != {case['intent']}")
+    for key, expected in case.get("entities", {}).items():
+        got = result["entities"].get(key)
+        if got != expected:
+            errors.append(f"{key} {got!r} != {expected!r}")
+    if "triage" in case and result["triage"]["level"] != case["triage"]:
+        errors.append(f"triage {result['triage']['level']} != {case['triage']}")
+    return errors
+
+
+async def evaluate(engine: NLPEngine, corpus: List[Dict[str, Any]]) -> Dict[str, Any]:
+    true_positive, predicted, expected = Counter(), Counter(), Counter()
+    failures = []
+    for case in corpus:
+        result = await engine.process_command(case["text"])
+        predicted[result["intent"]] += 1
+        expected[case["intent"]] += 1
+        if result["intent"] == case["intent"]:
+            true_positive[case["intent"]] += 1
+        errors = case_errors(case, result)
+        if errors:
+            failures.append({"text": case["text"], "errors": errors})
+
+    per_intent = {}
+    for intent in sorted(set(predicted) | set(expected)):
+        per_intent[intent] = {
+            "support": expected[intent],
+            "precision": round(true_positive[intent] / predicted[intent], 4) if predicted[intent] else None,
+            "recall": round(true_positive[intent] / expected[intent], 4) if expected[intent] else None,
+        }
+    return {
+        "accuracy": round(1 - len(failures) / len(corpus), 4),
+        "cases": len(corpus),
+        "per_intent": per_intent,
+        "failures": failures,
+    }
+
+
+def calibration_pass(texts: List[str]):
+    """One pass of the fixed calibration workload: the same kind of work as
+    classification (lowercasing, regex search, tokenizing, set lookups)"""
+    for text in texts:
+        lowered = text.lower().strip()
+        for pattern in CALIBRATION_PATTERNS:
+            pattern.search(lowered)
+        words = set(lowered.split())
+        any(word in words for word in ("open", "close", "search", "time"))
+
+
+async def measure_throughput(engine: NLPEngine, corpus: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    texts = [case["text"] for case in corpus]
+    for text in texts:
+        await engine.process_command(text)
+
+    # Engine and calibration passes alternate, so both see the same machine
+    # conditions and their ratio is stable where the absolute rate is not
+    samples = []
+    calibration_time = 0.0
+    passes = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for text in texts:
+            t0 = time.perf_counter()
+            await engine.process_command(text)
+            samples.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        calibration_pass(texts)
+        calibration_time += time.perf_counter() - t0
+        passes += 1
+    per_second = len(samples) / sum(samples)
+    calibration = passes * len(texts) / calibration_time
+    return {
+        "utterances_per_s": round(per_second, 1),
+        "calibration_per_s": round(calibration, 1),
+        "relative_throughput": round(per_second / calibration, 4),
+        "latency": summarize_latencies(samples),
+    }
+
+
+def regressions(current: Dict[str, Any], baseline: Dict[str, Any], max_slowdown: float) -> List[str]:
+    found = [f"newly failing: {text!r}" for text in current["known_failures"]
+             if text not in set(baseline.get("known_failures", []))]
+    if current["accuracy"] < baseline["accuracy"]:
+        found.append(f"accuracy {current['accuracy']:.2%} < baseline {baseline['accuracy']:.2%}")
+    for intent, scores in baseline["per_intent"].items():
+        now = current["per_intent"].get(intent, {})
+        for metric in ("precision", "recall"):
+            if scores[metric] is not None and (now.get(metric) or 0.0) < scores[metric]:
+                found.append(f"{intent} {metric} {now.get(metric)} < baseline {scores[metric]}")
+    if "relative_throughput" in baseline:
+        floor = baseline["relative_throughput"] * (1 - max_slowdown)
+        if current["relative_throughput"] < floor:
+            found.append(f"relative throughput {current['relative_throughput']} < {floor:.4f} "
+                         f"(baseline {baseline['relative_throughput']} - {max_slowdown:.0%})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--seconds", type=float, default=3.0, help="How long to measure throughput")
+    parser.add_argument("--max-slowdown", type=float, default=0.25,
+                        help="Allowed drop in relative throughput below the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Write current scores as the new baseline")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    engine = build_engine()
+    accuracy = asyncio.run(evaluate(engine, corpus))
+    throughput = asyncio.run(measure_throughput(engine, corpus, args.seconds))
+
+    print(f"accuracy: {accuracy['accuracy']:.1%} over {accuracy['cases']} cases")
+    print(f"{'intent':<20}{'support':>8}{'precision':>11}{'recall':>8}")
+    for intent, scores in accuracy["per_intent"].items():
+        precision = "-" if scores["precision"] is None else f"{scores['precision']:.2f}"
+        recall = "-" if scores["recall"] is None else f"{scores['recall']:.2f}"
+        print(f"{intent:<20}{scores['support']:>8}{precision:>11}{recall:>8}")
+    for failure in accuracy["failures"]:
+        print(f"  miss: {failure['text']!r}: {'; '.join(failure['errors'])}")
+    latency = throughput["latency"]
+    print(f"throughput: {throughput['utterances_per_s']} utterances/s "
+          f"(p50 {latency['p50_ms']} ms, p99 {latency['p99_ms']} ms), "
+          f"{throughput['relative_throughput']} x calibration ({throughput['calibration_per_s']}/s)")
+
+    current = {
+        "accuracy": accuracy["accuracy"],
+        "per_intent": {i: {"precision": s["precision"], "recall": s["recall"]} for i, s in accuracy["per_intent"].items()},
+        "relative_throughput": throughput["relative_throughput"],
+        "utterances_per_s": throughput["utterances_per_s"],
+        "known_failures": [failure["text"] for failure in accuracy["failures"]],
+    }
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    found = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            found = regressions(current, json.load(f), args.max_slowdown)
+    else:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+    for regression in found:
+        print(f"REGRESSION: {regression}")
+
+    results = {
+        "config": {"corpus": os.path.relpath(args.corpus), "seconds": args.seconds, "max_slowdown": args.max_slowdown},
+        "accuracy": accuracy,
+        "throughput": throughput,
+        "regressions": found,
+        "passed": not found,
+    }
+    print(f"\nResults written to {write_results('nlp_regression', results, args.output)}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Encode time and payload size of screenshots per format
+
+    python -m benchmarks.screenshot_encode --resolutions 1920x1080 2560x1440 --runs 10
+
+Renders a synthetic desktop (flat UI panels, text, a gradient and a
+photo-like region) and encodes it with ScreenshotEncoder as PNG, JPEG and
+WebP at a few qualities, at full size and downscaled, reporting resize and
+encode time and the bytes that go over the WebSocket. Requires Pillow.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from automation.screenshot import PIL_AVAILABLE, ScreenshotEncoder
+from benchmarks.common import summarize_latencies, write_results
+
+# (format, quality) pairs; PNG is lossless and ignores quality
+CODECS = [("png", None), ("jpeg", 60), ("jpeg", 80), ("jpeg", 90), ("webp", 60), ("webp", 80)]
+
+
+def render_desktop(width: int, height: int):
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(11)
+    image = Image.new("RGB", (width, height), (30, 34, 40))
+    draw = ImageDraw.Draw(image)
+    for y in range(height // 3):
+        shade = 40 + 60 * y // (height // 3)
+        draw.line([(0, y), (width, y)], fill=(shade // 2, shade // 2, shade))
+    for _ in range(12):
+        x, y = rng.randrange(width - 400), rng.randrange(height - 300)
+        w, h = rng.randrange(300, 900), rng.randrange(200, 600)
+        draw.rectangle([x, y, x + w, y + h], fill=(245, 245, 245), outline=(90, 90, 90))
+        draw.rectangle([x, y, x + w, y + 28], fill=(60, 110, 200))
+        for line in range(y + 40, y + h - 16, 18):
+            words = " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randrange(2, 9)))
+                             for _ in range(w // 48))
+            draw.text((x + 10, line), words, fill=(20, 20, 20))
+    photo = Image.effect_noise((width // 4, height // 4), 40).convert("RGB")
+    image.paste(photo.resize((width // 4, height // 4)), (width - width // 4 - 20, height - height // 4 - 20))
+    return image
+
+
+def bench(encoder: ScreenshotEncoder, image, fmt: str, quality: Optional[int], max_width: int,
+          runs: int) -> Dict[str, Any]:
+    encoder.encode(image, fmt, quality, max_width)
+    total, encode, resize = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        data, meta = encoder.encode(image, fmt, quality, max_width)
+        total.append(time.perf_counter() - started)
+        encode.append(meta["encode_ms"] / 1000)
+        resize.append(meta["resize_ms"] / 1000)
+    return {
+        "format": fmt,
+        "quality": quality,
+        "width": meta["width"],
+        "height": meta["height"],
+        "bytes": len(data),
+        "total": summarize_latencies(total),
+        "encode": summarize_latencies(encode),
+        "resize": summarize_latencies(resize),
+    }
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(1920, 1080), (2560, 1440)])
+    parser.add_argument("--max-widths", type=int, nargs="+", default=[0, 1280],
+                        help="Downscale targets; 0 keeps the full resolution")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    if not PIL_AVAILABLE:
+        sys.exit("Pillow is not installed (pip install pillow)")
+
+    encoder = ScreenshotEncoder()
+    results: Dict[str, Any] = {
+        "config": {"runs": args.runs, "png_compress_level": encoder.png_compress_level,
+                   "webp_method": encoder.webp_method},
+        "cases": [],
+    }
+    for width, height in args.resolutions:
+        image = render_desktop(width, height)
+        raw_bytes = width * height * 3
+        for max_width in args.max_widths:
+            cases: List[Dict[str, Any]] = []
+            for fmt, quality in CODECS:
+                case = dict(bench(encoder, image, fmt, quality, max_width, args.runs),
+                            source=f"{width}x{height}", max_width=max_width)
+                case["ratio_vs_raw"] = round(case["bytes"] / raw_bytes, 4)
+                cases.append(case)
+                label = f"{fmt}" + (f" q{quality}" if quality else "")
+                print(f"{width}x{height} -> {case['width']}x{case['height']:<5} {label:<8} "
+                      f"{case['bytes']:>9} B  encode p50 {case['encode']['p50_ms']:>7} ms"
+                      f"  resize p50 {case['resize']['p50_ms']:>6} ms")
+            results["cases"].extend(cases)
+
+    print(f"\nResults written to {write_results('screenshot_encode', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
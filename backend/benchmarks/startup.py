@@ -0,0 +1,145 @@
+"""Cold-start benchmark: import-time profile and start-up budget check
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1500
+
+Measures how long `import main` takes in a fresh interpreter, profiles it with
+`python -X importtime`, checks that optional heavy subsystems are not imported
+eagerly, and measures time until the server answers /health. Exits non-zero when
+the budget is exceeded or a forbidden module was imported at start-up.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+from benchmarks.common import BACKEND_DIR, free_port, summarize_latencies, write_results
+
+# Modules that only optional subsystems need; none of them may load at start-up
+FORBIDDEN_AT_STARTUP = [
+    "speech_recognition",
+    "pyttsx3",
+    "pyautogui",
+    "psutil",
+    "requests",
+]
+
+IMPORT_SCRIPT = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "import main\n"
+    "print(time.perf_counter() - t)\n"
+    "print(','.join(sorted(m for m in sys.modules)))\n"
+)
+
+
+def measure_import(env: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    wall = time.perf_counter() - started
+    modules = set(output[-1].split(","))
+    return {"import_s": float(output[-2]), "process_s": wall, "modules": modules}
+
+
+def import_profile(env: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    """Parse `python -X importtime` output into the slowest top-level imports"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stderr
+
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_part, cumulative_us, name = line[len("import time:"):].split("|")
+        self_us = self_part.strip()
+        depth = len(name) - len(name.lstrip())
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth,
+        })
+
+    shallowest = min((e["depth"] for e in entries), default=0)
+    top_level = [e for e in entries if e["depth"] <= shallowest + 2]
+    top_level.sort(key=lambda e: e["cumulative_ms"], reverse=True)
+    return [{k: v for k, v in e.items() if k != "depth"} for e in top_level[:top]]
+
+
+def time_to_health(env: Dict[str, str], timeout: float = 30.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=0.5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Server did not become healthy in time")
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1500")),
+                        help="Fail when the median time to a healthy server exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to report")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.pop("PRELOAD_SUBSYSTEMS", None)
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    health = [time_to_health(env) for _ in range(args.runs)]
+    profile = import_profile(env, args.top)
+
+    eager = sorted(m for m in FORBIDDEN_AT_STARTUP if any(m in run["modules"] for run in imports))
+    health_median_ms = statistics.median(health) * 1000
+    within_budget = health_median_ms <= args.budget_ms
+
+    results = {
+        "config": {"runs": args.runs, "budget_ms": args.budget_ms},
+        "import_main": summarize_latencies([r["import_s"] for r in imports]),
+        "process_import": summarize_latencies([r["process_s"] for r in imports]),
+        "time_to_health": summarize_latencies(health),
+        "modules_loaded": len(imports[-1]["modules"]),
+        "eager_optional_imports": eager,
+        "slowest_imports": profile,
+        "passed": within_budget and not eager,
+    }
+
+    print(f"import main:      p50 {results['import_main']['p50_ms']:.1f} ms")
+    print(f"time to /health:  p50 {results['time_to_health']['p50_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"modules loaded:   {results['modules_loaded']}")
+    print("slowest imports:")
+    for entry in profile:
+        print(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+    if eager:
+        print(f"FAIL: optional modules imported at start-up: {', '.join(eager)}")
+    if not within_budget:
+        print(f"FAIL: start-up took {health_median_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+
+    print(f"\nResults written to {write_results('startup', results, args.output)}")
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
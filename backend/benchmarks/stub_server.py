@@ -0,0 +1,62 @@
+"""Run the FastAPI app with Gemini and the speech recognizer replaced by local stubs
+
+    python -m benchmarks.stub_server --port 8765 --gemini-latency 0.4
+    python -m benchmarks.stub_server --port 8765 --replay cassettes/upstream.jsonl
+
+With --replay, Gemini and speech responses are served from a recorded cassette
+(see core.upstream) instead of the stubs; replay latency and error injection
+are configured through the UPSTREAM_* environment variables.
+"""
+import argparse
+import os
+from typing import Optional
+
+import uvicorn
+
+from benchmarks.stubs import StubGeminiAI, StubSpeechHandler
+
+
+def build_app(gemini_latency: float, gemini_jitter: float, transcribe_latency: float, transcribe_jitter: float,
+              replay: Optional[str] = None):
+    # The load generator drives far more traffic per client than a real user would,
+    # so admission limits are opened up unless the caller configured them explicitly.
+    os.environ.setdefault("SCHED_GLOBAL_RATE", "100000")
+    os.environ.setdefault("SCHED_GLOBAL_BURST", "100000")
+    os.environ.setdefault("SCHED_CONNECTION_RATE", "100000")
+    os.environ.setdefault("SCHED_CONNECTION_BURST", "100000")
+    os.environ.setdefault("SCHED_QUEUE_SIZE", "100000")
+    os.environ.setdefault("SCHED_LLM_CONCURRENCY", "64")
+    os.environ.setdefault("SCHED_TRANSCRIPTION_CONCURRENCY", "64")
+
+    if replay:
+        os.environ["UPSTREAM_MODE"] = "replay"
+        os.environ["UPSTREAM_CASSETTE"] = replay
+
+    import main
+
+    if replay:
+        return main.app
+    main.subsystems.override("gemini_ai", StubGeminiAI(gemini_latency, gemini_jitter))
+    main.subsystems.override("speech_handler", StubSpeechHandler(transcribe_latency, transcribe_jitter))
+    return main.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--gemini-latency", type=float, default=0.4)
+    parser.add_argument("--gemini-jitter", type=float, default=0.1)
+    parser.add_argument("--transcribe-latency", type=float, default=0.3)
+    parser.add_argument("--transcribe-jitter", type=float, default=0.05)
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve upstream responses from a recorded cassette")
+    args = parser.parse_args()
+
+    app = build_app(args.gemini_latency, args.gemini_jitter, args.transcribe_latency, args.transcribe_jitter,
+                    args.replay)
+    from core.connections import ws_ping_options
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", **ws_ping_options())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai.conversation_memory import estimate_tokens
+
+
+def _sample_latency(mean: float, jitter: float) -> float:
+    return max(0.0, random.gauss(mean, jitter))
+
+
+class StubGeminiAI:
+    """Local stand-in for GeminiAI with a configurable latency model"""
+
+    def __init__(self, latency: float = 0.4, jitter: float = 0.1):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    def is_available(self) -> bool:
+        return True
+
+    def chat(self, user_message: str, context: Optional[str] = None) -> str:
+        return self.chat_with_usage(user_message, context)[0]
+
+    def chat_with_usage(self, user_message: str, context: Optional[str] = None,
+                        record_history: bool = True) -> Tuple[str, Dict[str, Any]]:
+        self.calls += 1
+        latency = _sample_latency(self.latency, self.jitter)
+        time.sleep(latency)
+        tokens = estimate_tokens(user_message) + 600
+        usage = {"prompt_tokens": tokens, "estimated_prompt_tokens": tokens, "history_tokens": 0,
+                 "candidate_tokens": 120, "thoughts_tokens": 0, "total_tokens": tokens + 120,
+                 "grounded": False, "search_grounding": False,
+                 "upstream_ms": round(latency * 1000, 1), "status": "ok"}
+        return f"Stub veterinary answer about: {user_message[:60]}", usage
+
+    def record_turn(self, user_message: str, ai_response: str, grounded: bool = False):
+        pass
+
+    def clear_history(self):
+        pass
+
+    def get_history(self) -> List[Dict[str, str]]:
+        return []
+
+    def get_history_stats(self) -> Dict[str, Any]:
+        return {"verbatim_turns": 0, "verbatim_tokens": 0, "summary_tokens": 0,
+                "summarized_turns": 0, "token_budget": 0}
+
+
+class StubSpeechHandler:
+    """Local stand-in for SpeechHandler that returns canned transcripts"""
+
+    transcripts = [
+        "my dog has been scratching his ears a lot",
+        "what vaccines does a kitten need",
+        "how much chocolate is toxic for a dog",
+        "why is my rabbit not eating hay",
+    ]
+    pool = None
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.05):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    def is_ready(self) -> bool:
+        return True
+
+    async def transcribe_audio(self, audio_data: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(_sample_latency(self.latency, self.jitter))
+        return self.transcripts[len(audio_data) % len(self.transcripts)]
+
+    def speak(self, text: str) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+class CpuBoundTranscriber:
+    """Transcription worker engine that holds the CPU (and the GIL) like a local model
+
+    Burns STUB_TRANSCRIBE_CPU_MS of CPU time per job and checksums the audio so
+    the shared-memory handoff is actually read.
+    """
+
+    def __init__(self):
+        self.cpu_seconds = float(os.getenv("STUB_TRANSCRIBE_CPU_MS", "200")) / 1000
+
+    def transcribe(self, audio_bytes) -> str:
+        started = time.thread_time()
+        checksum = sum(audio_bytes[::4096])
+        while time.thread_time() - started < self.cpu_seconds:
+            checksum = (checksum * 31 + 7) % 1000003
+        return StubSpeechHandler.transcripts[len(audio_bytes) % len(StubSpeechHandler.transcripts)]
+
+
+class EchoTranscriber:
+    """Transcription worker engine that only reports the audio size, for handoff timing"""
+
+    def transcribe(self, audio_bytes) -> str:
+        return str(len(audio_bytes))
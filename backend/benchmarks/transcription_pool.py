@@ -0,0 +1,135 @@
+"""Throughput scaling of the transcription worker pool
+
+    python -m benchmarks.transcription_pool --workers 1 2 4 --jobs 32 --cpu-ms 100
+
+Runs a CPU-bound stand-in engine (benchmarks.stubs.CpuBoundTranscriber, which
+holds the GIL like a local recognizer model) in TranscriptionPool with varying
+worker counts, next to the same engine on threads inside one process. Also
+times the audio handoff for a few upload sizes through shared memory versus
+pickling the bytes through the worker's pipe.
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from audio.transcription_pool import TranscriptionPool
+from benchmarks.common import summarize_latencies, write_results
+
+
+async def wait_ready(pool: TranscriptionPool, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while len(pool.workers) < pool.size:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"only {len(pool.workers)}/{pool.size} workers started")
+        await asyncio.sleep(0.05)
+
+
+async def run_jobs(transcribe, audio: bytes, jobs: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+
+    async def one():
+        started = time.perf_counter()
+        await transcribe(audio)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(jobs)))
+    elapsed = time.perf_counter() - started
+    return {"jobs_per_s": round(jobs / elapsed, 2), "latency": summarize_latencies(latencies)}
+
+
+async def bench_pool(workers: int, audio: bytes, jobs: int) -> Dict[str, Any]:
+    pool = TranscriptionPool(workers, "benchmarks.stubs:CpuBoundTranscriber")
+    pool.health_interval = 0
+    pool.start()
+    try:
+        await wait_ready(pool)
+        await run_jobs(pool.transcribe, audio, workers)
+        return await run_jobs(pool.transcribe, audio, jobs)
+    finally:
+        await pool.close()
+
+
+async def bench_threads(threads: int, audio: bytes, jobs: int) -> Dict[str, Any]:
+    from benchmarks.stubs import CpuBoundTranscriber
+
+    engine = CpuBoundTranscriber()
+    executor = ThreadPoolExecutor(max_workers=threads)
+    loop = asyncio.get_running_loop()
+    try:
+        return await run_jobs(lambda data: loop.run_in_executor(executor, engine.transcribe, data), audio, jobs)
+    finally:
+        executor.shutdown()
+
+
+async def bench_handoff(size: int, shared: bool, rounds: int) -> Dict[str, Any]:
+    pool = TranscriptionPool(1, "benchmarks.stubs:EchoTranscriber")
+    pool.health_interval = 0
+    pool.shm_bytes = size if shared else 0
+    pool.start()
+    audio = os.urandom(size)
+    try:
+        await wait_ready(pool)
+        await pool.transcribe(audio)
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await pool.transcribe(audio)
+            samples.append(time.perf_counter() - started)
+        return summarize_latencies(samples)
+    finally:
+        await pool.close()
+
+
+async def run(args) -> Dict[str, Any]:
+    audio = os.urandom(int(args.audio_seconds * 16000 * 2))
+    results: Dict[str, Any] = {
+        "config": {"jobs": args.jobs, "cpu_ms": args.cpu_ms, "audio_seconds": args.audio_seconds,
+                   "cpu_count": os.cpu_count()},
+        "pool": [],
+        "threads": [],
+        "handoff": [],
+    }
+
+    for workers in args.workers:
+        threads = await bench_threads(workers, audio, args.jobs)
+        pool = await bench_pool(workers, audio, args.jobs)
+        results["threads"].append(dict(threads, workers=workers))
+        results["pool"].append(dict(pool, workers=workers))
+        print(f"{workers:>3} workers: processes {pool['jobs_per_s']:>7} jobs/s (p50 {pool['latency']['p50_ms']} ms)"
+              f"  |  threads {threads['jobs_per_s']:>7} jobs/s (p50 {threads['latency']['p50_ms']} ms)")
+
+    for size in args.handoff_bytes:
+        shared = await bench_handoff(size, True, args.handoff_rounds)
+        piped = await bench_handoff(size, False, args.handoff_rounds)
+        results["handoff"].append({"bytes": size, "shared_memory": shared, "pipe": piped})
+        print(f"handoff {size:>9} B: shared memory p50 {shared['p50_ms']} ms, pipe p50 {piped['p50_ms']} ms")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))) or [1])
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--cpu-ms", type=float, default=100, help="CPU time the stand-in engine spends per job")
+    parser.add_argument("--audio-seconds", type=float, default=5, help="Upload size as seconds of 16 kHz PCM")
+    parser.add_argument("--handoff-bytes", type=int, nargs="+", default=[160_000, 1_600_000, 4_800_000])
+    parser.add_argument("--handoff-rounds", type=int, default=30)
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    # Read by the engine inside each spawned worker
+    os.environ["STUB_TRANSCRIBE_CPU_MS"] = str(args.cpu_ms)
+
+    results = asyncio.run(run(args))
+    print(f"\nResults written to {write_results('transcription_pool', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
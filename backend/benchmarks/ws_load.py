@@ -0,0 +1,202 @@
+"""WebSocket load generator and latency benchmark for the /ws pipeline
+
+Starts the app with stubbed Gemini and speech recognition, drives N concurrent
+simulated clients with mixed traffic and reports throughput plus p50/p95/p99
+latency per message type and per stage:
+
+    python -m benchmarks.ws_load --clients 50 --messages 20 --output run.json
+
+Pass --url to drive an already running server instead.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import websockets
+
+from benchmarks.common import free_port, start_stub_server, stop_process, summarize_latencies, write_results
+
+TEXT_COMMANDS = [
+    "what are the signs of kennel cough in dogs",
+    "how often should I deworm my cat",
+    "tell me about feline leukemia",
+    "is it normal for a puppy to sleep all day",
+    "what should I feed a bearded dragon",
+    "my horse has a swollen leg what could it be",
+]
+
+TERMINAL_TYPES = {"result", "busy", "error"}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def build_message(kind: str, audio_bytes: int) -> Dict[str, Any]:
+    if kind == "text_command":
+        return {"type": "text_command", "text": random.choice(TEXT_COMMANDS)}
+    if kind == "audio_data":
+        payload = os.urandom(audio_bytes + random.randint(0, 3))
+        return {"type": "audio_data", "audio": base64.b64encode(payload).decode("ascii")}
+    return {"type": "status_request"}
+
+
+def is_terminal(kind: str, frame: Dict[str, Any]) -> bool:
+    if frame.get("type") in TERMINAL_TYPES:
+        return True
+    # A status_request is answered by a status frame carrying readiness flags,
+    # as opposed to the "processing" status frames of a command
+    return kind == "status_request" and frame.get("type") == "status" and "nlp_ready" in frame
+
+
+async def run_client(url: str, messages: int, kinds: List[str], weights: List[float], audio_bytes: int,
+                     think_time: float, samples: Dict[str, Any]):
+    async with websockets.connect(url, max_size=None) as ws:
+        json.loads(await ws.recv())
+
+        for _ in range(messages):
+            kind = random.choices(kinds, weights)[0]
+            message = build_message(kind, audio_bytes)
+
+            sent = time.perf_counter()
+            await ws.send(json.dumps(message))
+            marks = {}
+            outcome = "ok"
+
+            while True:
+                frame = json.loads(await ws.recv())
+                now = time.perf_counter()
+                frame_type = frame.get("type")
+                marks.setdefault(frame_type, now)
+                if is_terminal(kind, frame):
+                    if frame_type in ("busy", "error") or frame.get("success") is False:
+                        outcome = frame_type if frame_type != "result" else "failed"
+                    break
+
+            samples["by_type"][kind].append(now - sent)
+            samples["outcomes"][kind][outcome] += 1
+
+            # Stage latencies are the gaps between the frames that close each stage
+            previous = sent
+            for stage, frame_type in (("transcribe", "transcription"), ("classify", "intent"), ("respond", "result")):
+                if frame_type in marks:
+                    samples["by_stage"][stage].append(marks[frame_type] - previous)
+                    previous = marks[frame_type]
+
+            if think_time:
+                await asyncio.sleep(random.expovariate(1.0 / think_time))
+
+
+async def run_load(url: str, clients: int, messages: int, mix: Dict[str, float], audio_bytes: int,
+                   think_time: float, ramp_up: float) -> Dict[str, Any]:
+    samples = {
+        "by_type": defaultdict(list),
+        "by_stage": defaultdict(list),
+        "outcomes": defaultdict(lambda: defaultdict(int)),
+    }
+    kinds = list(mix.keys())
+    weights = [mix[k] for k in kinds]
+
+    async def delayed_client(index: int):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / clients)
+        await run_client(url, messages, kinds, weights, audio_bytes, think_time, samples)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(delayed_client(i) for i in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    client_errors = [repr(r) for r in results if isinstance(r, Exception)]
+    completed = sum(len(v) for v in samples["by_type"].values())
+
+    return {
+        "totals": {
+            "clients": clients,
+            "messages_completed": completed,
+            "duration_s": round(elapsed, 3),
+            "throughput_msg_s": round(completed / elapsed, 2) if elapsed else 0.0,
+            "client_errors": len(client_errors),
+            "client_error_samples": client_errors[:5],
+        },
+        "by_type": {
+            kind: dict(summarize_latencies(values), outcomes=dict(samples["outcomes"][kind]))
+            for kind, values in samples["by_type"].items()
+        },
+        "by_stage": {stage: summarize_latencies(values) for stage, values in samples["by_stage"].items()},
+    }
+
+
+def print_report(results: Dict[str, Any]):
+    totals = results["totals"]
+    print(f"{totals['messages_completed']} messages from {totals['clients']} clients in "
+          f"{totals['duration_s']} s -> {totals['throughput_msg_s']} msg/s "
+          f"({totals['client_errors']} client errors)")
+    for section in ("by_type", "by_stage"):
+        print(f"\n{section.replace('_', ' ')}:")
+        for name, stats in sorted(results[section].items()):
+            if not stats.get("count"):
+                continue
+            print(f"  {name:<16} n={stats['count']:<6} p50={stats['p50_ms']:>9.2f} ms  "
+                  f"p95={stats['p95_ms']:>9.2f} ms  p99={stats['p99_ms']:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Drive an existing server instead of starting the stub server")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=10, help="Messages per client")
+    parser.add_argument("--mix", default="text_command=0.6,audio_data=0.25,status_request=0.15")
+    parser.add_argument("--audio-bytes", type=int, default=32000, help="Size of simulated audio uploads")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between messages (s)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Spread client start over this many seconds")
+    parser.add_argument("--gemini-latency", type=float, default=0.4)
+    parser.add_argument("--gemini-jitter", type=float, default=0.0,
+                        help="Std dev of the stub Gemini latency (s); 0 keeps stage times fixed")
+    parser.add_argument("--transcribe-latency", type=float, default=0.3)
+    parser.add_argument("--transcribe-jitter", type=float, default=0.0,
+                        help="Std dev of the stub transcription latency (s)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replay", metavar="CASSETTE", help="Have the stub server replay a recorded cassette")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = None
+    url = args.url
+    if not url:
+        port = free_port()
+        server = start_stub_server(port, [
+            "--gemini-latency", str(args.gemini_latency),
+            "--gemini-jitter", str(args.gemini_jitter),
+            "--transcribe-latency", str(args.transcribe_latency),
+            "--transcribe-jitter", str(args.transcribe_jitter),
+        ] + (["--replay", args.replay] if args.replay else []))
+        url = f"ws://127.0.0.1:{port}/ws"
+
+    try:
+        results = asyncio.run(run_load(url, args.clients, args.messages, parse_mix(args.mix),
+                                       args.audio_bytes, args.think_time, args.ramp_up))
+    finally:
+        if server:
+            stop_process(server)
+
+    results["config"] = {key: value for key, value in vars(args).items() if key != "output"}
+    results["config"]["url"] = url
+    print_report(results)
+    print(f"\nResults written to {write_results('ws_load', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    def __init__(self, send_text: Callable[[str], Awaitable[None]], on_evict: Optional[Callable[[], Awaitable[None]]]):
+        self.send_text = send_text
+        self.on_evict = on_evict
+        self.topics: Set[str] = set()
+        self.failures = 0
+
+
+class Broadcaster:
+    """Topic-based pub/sub fan-out to connected clients
+
+    A published message is JSON-encoded once and the same text frame is sent to
+    every subscriber concurrently, each send bounded by a timeout so one slow
+    client cannot hold up the rest. Clients whose socket errors are evicted at
+    once; clients that time out repeatedly are evicted after max_failures.
+    Evicted sockets are closed in background tasks, since closing a stuck
+    socket can itself take the full timeout.
+    """
+
+    def __init__(self):
+        self.send_timeout = float(os.getenv("BROADCAST_SEND_TIMEOUT", "2.0"))
+        self.max_failures = int(os.getenv("BROADCAST_MAX_FAILURES", "3"))
+        self.default_topics = [t.strip() for t in os.getenv("BROADCAST_DEFAULT_TOPICS", "alerts,system").split(",") if t.strip()]
+
+        self.subscribers: Dict[Any, _Subscriber] = {}
+        self.topics: Dict[str, Set[Any]] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+        self.published = 0
+        self.delivered = 0
+        self.timed_out = 0
+        self.evicted = 0
+
+    def subscribe(self, connection_id: Any, send_text: Callable[[str], Awaitable[None]],
+                  topics: Optional[Iterable[str]] = None,
+                  on_evict: Optional[Callable[[], Awaitable[None]]] = None):
+        subscriber = self.subscribers.get(connection_id)
+        if subscriber is None:
+            subscriber = _Subscriber(send_text, on_evict)
+            self.subscribers[connection_id] = subscriber
+        for topic in (self.default_topics if topics is None else topics):
+            subscriber.topics.add(topic)
+            self.topics.setdefault(topic, set()).add(connection_id)
+
+    def unsubscribe(self, connection_id: Any, topics: Iterable[str]):
+        subscriber = self.subscribers.get(connection_id)
+        if subscriber is None:
+            return
+        for topic in topics:
+            subscriber.topics.discard(topic)
+            members = self.topics.get(topic)
+            if members is not None:
+                members.discard(connection_id)
+                if not members:
+                    del self.topics[topic]
+
+    def remove(self, connection_id: Any):
+        subscriber = self.subscribers.pop(connection_id, None)
+        if subscriber is not None:
+            self._detach(connection_id, subscriber)
+
+    def _detach(self, connection_id: Any, subscriber: _Subscriber):
+        for topic in subscriber.topics:
+            members = self.topics.get(topic)
+            if members is not None:
+                members.discard(connection_id)
+                if not members:
+                    del self.topics[topic]
+        subscriber.topics.clear()
+
+    async def publish(self, topic: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        payload = json.dumps(dict(message, type="broadcast", topic=topic))
+        recipients = [(cid, self.subscribers[cid]) for cid in self.topics.get(topic, ())]
+
+        # Every send starts now, so one shared deadline bounds each of them
+        sends = {asyncio.ensure_future(sub.send_text(payload)): (cid, sub) for cid, sub in recipients}
+        delivered = timed_out = failed = 0
+        to_evict = []
+        if sends:
+            _, pending = await asyncio.wait(sends, timeout=self.send_timeout)
+            for task in pending:
+                task.cancel()
+            for task, (connection_id, subscriber) in sends.items():
+                if task in pending:
+                    timed_out += 1
+                    subscriber.failures += 1
+                elif task.cancelled() or task.exception() is not None:
+                    failed += 1
+                    subscriber.failures = self.max_failures
+                else:
+                    delivered += 1
+                    subscriber.failures = 0
+                if subscriber.failures >= self.max_failures:
+                    to_evict.append(connection_id)
+
+        for connection_id in to_evict:
+            self._evict(connection_id)
+
+        self.published += 1
+        self.delivered += delivered
+        self.timed_out += timed_out
+        return {
+            "topic": topic,
+            "recipients": len(recipients),
+            "delivered": delivered,
+            "timed_out": timed_out,
+            "failed": failed,
+            "evicted": len(to_evict),
+            "payload_bytes": len(payload),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _evict(self, connection_id: Any):
+        subscriber = self.subscribers.pop(connection_id, None)
+        if subscriber is None:
+            return
+        self._detach(connection_id, subscriber)
+        self.evicted += 1
+        logger.warning(f"Evicted unresponsive broadcast subscriber {connection_id}")
+        if subscriber.on_evict:
+            task = asyncio.ensure_future(self._close(subscriber))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close(self, subscriber: _Subscriber):
+        try:
+            await asyncio.wait_for(subscriber.on_evict(), self.send_timeout)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "topics": {topic: len(members) for topic, members in self.topics.items()},
+            "published": self.published,
+            "delivered": self.delivered,
+            "timed_out": self.timed_out,
+            "evicted": self.evicted,
+            "closing": len(self._closing),
+        }
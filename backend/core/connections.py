@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection:
+    def __init__(self, websocket: Any, task: Optional[asyncio.Task], heartbeat: bool):
+        self.websocket = websocket
+        self.task = task
+        self.heartbeat = heartbeat
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.in_flight = 0
+        self.reaped = False
+
+
+class ConnectionMonitor:
+    """Tracks WebSocket clients and reaps the ones that stop answering
+
+    Dead and half-open sockets are found by protocol-level pings, which every
+    WebSocket client answers without any code of its own: uvicorn sends one
+    every WS_PING_INTERVAL seconds and closes the connection when no pong
+    arrives within WS_PING_TIMEOUT, which ends the handler and releases its
+    state (see ws_ping_options()).
+
+    Clients that connect with ?heartbeat=1 (the frontend does) also get JSON
+    {"type": "ping"} frames, which they answer with a pong; any inbound
+    message counts as a sign of life. Such a client that has been silent for
+    idle_timeout seconds while no request of its own is in flight is closed
+    and its handler task cancelled. Other clients are never sent app-level
+    pings or reaped for silence.
+    """
+
+    def __init__(self):
+        self.ping_interval = float(os.getenv("WS_PING_INTERVAL", "20"))
+        self.idle_timeout = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+        self.close_timeout = float(os.getenv("WS_CLOSE_TIMEOUT", "2"))
+
+        self.connections: Dict[Any, _Connection] = {}
+        self.reaped = 0
+        self.pings_sent = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and self.ping_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def register(self, connection_id: Any, websocket: Any, task: Optional[asyncio.Task] = None,
+                 heartbeat: bool = False):
+        self.connections[connection_id] = _Connection(websocket, task, heartbeat)
+
+    def unregister(self, connection_id: Any):
+        self.connections.pop(connection_id, None)
+
+    def begin(self, connection_id: Any):
+        """Mark a request in flight; the connection is not reaped while it runs"""
+        connection = self.connections.get(connection_id)
+        if connection:
+            connection.in_flight += 1
+
+    def end(self, connection_id: Any):
+        connection = self.connections.get(connection_id)
+        if connection:
+            connection.in_flight -= 1
+            connection.last_seen = time.monotonic()
+
+    def was_reaped(self, connection_id: Any) -> bool:
+        connection = self.connections.get(connection_id)
+        return connection is not None and connection.reaped
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Heartbeat sweep failed: {e}")
+
+    async def sweep(self):
+        now = time.monotonic()
+        idle = [cid for cid, c in self.connections.items()
+                if c.heartbeat and not c.in_flight and not c.reaped and now - c.last_seen > self.idle_timeout]
+        await asyncio.gather(*(self._reap(connection_id, now) for connection_id in idle))
+
+        payload = json.dumps({"type": "ping", "ts": round(time.time(), 3)})
+        sends = [asyncio.ensure_future(c.websocket.send_text(payload))
+                 for c in self.connections.values() if c.heartbeat and not c.reaped]
+        if sends:
+            _, pending = await asyncio.wait(sends, timeout=self.close_timeout)
+            for task in pending:
+                task.cancel()
+            for task in sends:
+                if task not in pending and not task.cancelled():
+                    # Closed sockets are noticed by their own endpoint
+                    task.exception()
+            self.pings_sent += len(sends)
+
+    async def _reap(self, connection_id: Any, now: float):
+        connection = self.connections[connection_id]
+        connection.reaped = True
+        self.reaped += 1
+        logger.info(f"Reaping idle client {connection_id} (silent for {now - connection.last_seen:.0f}s)")
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=1001), self.close_timeout)
+        except Exception:
+            pass
+        # A clean close already ended the handler; only half-open sockets need cancelling
+        if connection.task and connection_id in self.connections:
+            connection.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        ages = sorted(now - c.connected_at for c in self.connections.values())
+        idle = [now - c.last_seen for c in self.connections.values()]
+        return {
+            "active": len(self.connections),
+            "heartbeat_clients": sum(1 for c in self.connections.values() if c.heartbeat),
+            "reaped": self.reaped,
+            "pings_sent": self.pings_sent,
+            "ping_interval": self.ping_interval,
+            "idle_timeout": self.idle_timeout,
+            "age_s_median": round(ages[len(ages) // 2], 1) if ages else 0.0,
+            "age_s_max": round(ages[-1], 1) if ages else 0.0,
+            "idle_s_max": round(max(idle), 1) if idle else 0.0,
+        }
+
+
+def ws_ping_options() -> Dict[str, float]:
+    """uvicorn keyword arguments for protocol-level WebSocket pings"""
+    return {
+        "ws_ping_interval": float(os.getenv("WS_PING_INTERVAL", "20")),
+        "ws_ping_timeout": float(os.getenv("WS_PING_TIMEOUT", "20")),
+    }
@@ -0,0 +1,274 @@
+"""Append-only interaction log with batched background writes
+
+    python -m core.interaction_log logs/interactions-20240101-120000-1.jsonl.gz --event intent
+
+Reads a segment (plain or gzip) as a stream and prints its records.
+"""
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("batch", "interval", "never")
+ACTIVE_SEGMENT = "interactions.jsonl"
+
+
+class InteractionLog:
+    """Audit trail of utterances, intents, transcriptions and answers
+
+    record() only enqueues into a bounded in-memory queue and never blocks; when the
+    queue is full the record is dropped and counted, so logging can never apply
+    backpressure to the WebSocket handlers. A background thread drains the queue in
+    batches, applies the fsync policy, rotates segments by size or age and gzips
+    rotated segments. Records hold full utterances and answers, so the log is off
+    unless INTERACTION_LOG_ENABLED=true.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else os.getenv("INTERACTION_LOG_DIR", "logs")
+        self.enabled = bool(self.directory) and os.getenv("INTERACTION_LOG_ENABLED", "false").lower() == "true"
+        self.batch_size = int(os.getenv("INTERACTION_LOG_BATCH_SIZE", "256"))
+        self.flush_interval = float(os.getenv("INTERACTION_LOG_FLUSH_INTERVAL", "1.0"))
+        self.fsync_policy = os.getenv("INTERACTION_LOG_FSYNC", "interval").lower()
+        self.fsync_interval = float(os.getenv("INTERACTION_LOG_FSYNC_INTERVAL", "5.0"))
+        self.max_bytes = int(os.getenv("INTERACTION_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.max_age = float(os.getenv("INTERACTION_LOG_MAX_AGE", "3600"))
+        self.compress = os.getenv("INTERACTION_LOG_COMPRESS", "true").lower() == "true"
+
+        if self.fsync_policy not in FSYNC_POLICIES:
+            logger.warning(f"Unknown INTERACTION_LOG_FSYNC '{self.fsync_policy}', using 'interval'")
+            self.fsync_policy = "interval"
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(
+            maxsize=int(os.getenv("INTERACTION_LOG_QUEUE_SIZE", "10000"))
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._segment_opened = 0.0
+        self._last_fsync = 0.0
+        self._rotations = 0
+        self.rotation_errors = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="interaction-log-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Interaction log writing to {self.directory} (fsync={self.fsync_policy})")
+
+    def close(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Interaction log queue full at shutdown; pending records lost")
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, event: str, **fields: Any) -> bool:
+        if self._thread is None:
+            return False
+        fields["ts"] = time.time()
+        fields["event"] = event
+        try:
+            self._queue.put_nowait(fields)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "rotations": self._rotations,
+            "rotation_errors": self.rotation_errors,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._rotate_if_due()
+                continue
+
+            batch: List[Dict[str, Any]] = []
+            if first is None:
+                stopping = True
+            else:
+                batch.append(first)
+            while len(batch) < self.batch_size and not stopping:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write_batch(batch)
+            self._rotate_if_due()
+
+        if self._file:
+            try:
+                self._sync()
+                self._file.close()
+            except OSError as e:
+                logger.error(f"Interaction log close failed: {e}")
+            self._file = None
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, ACTIVE_SEGMENT)
+        self._file = open(path, "a", encoding="utf-8")
+        self._segment_opened = time.time()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            if self._file is None:
+                self._open_segment()
+            self._file.write("".join(json.dumps(r, default=str, separators=(",", ":")) + "\n" for r in batch))
+            self._file.flush()
+            if self.fsync_policy == "batch" or (
+                self.fsync_policy == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval
+            ):
+                self._sync()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"Interaction log write failed, {len(batch)} records lost: {e}")
+
+    def _sync(self):
+        if self.fsync_policy != "never":
+            os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _rotate_if_due(self):
+        # An exception here would end the writer thread and silently drop every later record
+        try:
+            self._maybe_rotate()
+        except Exception as e:
+            self.rotation_errors += 1
+            logger.error(f"Interaction log rotation failed: {e}")
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        too_big = self._file.tell() >= self.max_bytes
+        too_old = time.time() - self._segment_opened >= self.max_age
+        if not (too_big or too_old):
+            return
+
+        try:
+            self._sync()
+            self._file.close()
+        except OSError as e:
+            logger.error(f"Interaction log close failed before rotation: {e}")
+        self._file = None
+
+        stamp = datetime.fromtimestamp(self._segment_opened).strftime("%Y%m%d-%H%M%S")
+        rotated = os.path.join(self.directory, f"interactions-{stamp}-{self._rotations + 1}.jsonl")
+        try:
+            os.replace(os.path.join(self.directory, ACTIVE_SEGMENT), rotated)
+        except OSError as e:
+            # Keep writing: the next batch reopens (and appends to) the active segment
+            self.rotation_errors += 1
+            logger.error(f"Interaction log rotation failed: {e}")
+            return
+        self._rotations += 1
+
+        if self.compress:
+            # Compress off the writer thread so rotation never stalls the queue
+            threading.Thread(target=compress_segment, args=(rotated,), daemon=True).start()
+
+
+def compress_segment(path: str) -> str:
+    """Gzip a rotated segment and remove the original"""
+    compressed = path + ".gz"
+    try:
+        with open(path, "rb") as source, gzip.open(compressed + ".tmp", "wb", compresslevel=6) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(compressed + ".tmp", compressed)
+        os.remove(path)
+    except Exception as e:
+        logger.error(f"Failed to compress {path}: {e}")
+        return path
+    return compressed
+
+
+def list_segments(directory: str) -> List[str]:
+    """Rotated segments oldest first, followed by the active segment"""
+    segments: Dict[str, str] = {}
+    # Exact suffixes, so an in-progress .jsonl.gz.tmp is never read as a segment
+    for path in glob.glob(os.path.join(directory, "interactions-*.jsonl")) + \
+            glob.glob(os.path.join(directory, "interactions-*.jsonl.gz")):
+        stem = path[:-3] if path.endswith(".gz") else path
+        # Both copies exist briefly once compression finishes; the .gz is complete
+        if stem not in segments or path.endswith(".gz"):
+            segments[stem] = path
+    rotated = [segments[stem] for stem in sorted(segments)]
+    active = os.path.join(directory, ACTIVE_SEGMENT)
+    return rotated + ([active] if os.path.exists(active) else [])
+
+
+def iter_segment(path: str, event: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream records from a segment without loading it into memory"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a torn final line in the active segment
+                continue
+            if event is None or record.get("event") == event:
+                yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Segment file, or a log directory to read every segment in order")
+    parser.add_argument("--event", help="Only print records of this event type")
+    args = parser.parse_args()
+
+    paths = list_segments(args.path) if os.path.isdir(args.path) else [args.path]
+    try:
+        for path in paths:
+            for record in iter_segment(path, args.event):
+                sys.stdout.write(json.dumps(record) + "\n")
+    except BrokenPipeError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from core.scheduler import SchedulerBusy, priority_for_triage, to_thread_in_slot
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("transcribe", "classify", "route", "generate", "execute", "speak")
+
+# Intents answered by Gemini when it is available
+AI_INTENTS = ("information", "conversation")
+
+# Generous defaults for the stages that wait on upstreams or automation
+DEFAULT_TIMEOUTS = {"transcribe": 60.0, "classify": 5.0, "route": 5.0, "generate": 30.0, "execute": 30.0, "speak": 5.0}
+
+Emit = Callable[[Dict[str, Any]], Awaitable[None]]
+EmitBinary = Callable[[bytes], Awaitable[None]]
+Hook = Callable[[str, "PipelineRun", float, Optional[BaseException]], None]
+
+
+def pack_binary_frame(header: Dict[str, Any], payload: bytes) -> bytes:
+    """Binary frame: 4-byte big-endian header length, JSON header, then the payload"""
+    encoded = json.dumps(header).encode()
+    return struct.pack(">I", len(encoded)) + encoded + payload
+
+
+class StageError(Exception):
+    """A stage failed or ran past its timeout"""
+
+    def __init__(self, stage: str, kind: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+        self.kind = kind
+
+
+class PipelineRun:
+    """One command on its way through the pipeline
+
+    route names the transport ("ws", "rest", "sse") and emit delivers the
+    frames each stage produces (transcription, status, intent, result,
+    speech) to it. Transports that can carry binary frames pass emit_binary;
+    results with an attachment (a screenshot) are sent through it.
+    """
+
+    def __init__(self, connection: Any, route: str, emit: Emit, text: str = "",
+                 audio: Optional[str] = None, speculator: Any = None,
+                 emit_binary: Optional[EmitBinary] = None):
+        self.connection = connection
+        self.route = route
+        self.emit = emit
+        self.emit_binary = emit_binary
+        self.text = text
+        self.audio = audio
+        self.speculator = speculator
+        self.intent_data: Optional[Dict[str, Any]] = None
+        self.target: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self.speculative = False
+        self.speech: Optional[str] = None
+        # Set once the connection's rate limit has been charged for this command
+        self.charged = False
+        self.timings: Dict[str, float] = {}
+
+
+class _Stage:
+    def __init__(self, name: str):
+        prefix = f"PIPELINE_{name.upper()}"
+        self.name = name
+        # 0 leaves the stage unbounded; transcribe and generate are already
+        # bounded by the scheduler's SCHED_*_CONCURRENCY
+        self.concurrency = int(os.getenv(f"{prefix}_CONCURRENCY", "0"))
+        self.timeout = float(os.getenv(f"{prefix}_TIMEOUT", str(DEFAULT_TIMEOUTS[name])))
+        self.semaphore = asyncio.Semaphore(self.concurrency) if self.concurrency > 0 else None
+        self.in_flight = 0
+        self.runs = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latencies = deque(maxlen=512)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "concurrency": self.concurrency or None,
+            "timeout_s": self.timeout,
+            "in_flight": self.in_flight,
+            "runs": self.runs,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+            "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+        }
+
+
+class CommandPipeline:
+    """transcribe -> classify -> route -> generate | execute -> speak
+
+    The one path a command takes, whichever transport it arrived on. Every
+    stage runs under its own concurrency limit and timeout and is timed;
+    hooks registered with add_hook() are called after each stage with the
+    run, the elapsed time and the error, if any. SchedulerBusy from the
+    transcribe and generate stages propagates unchanged so each transport can
+    shed load its own way.
+    """
+
+    def __init__(self, subsystems: Any, scheduler: Any):
+        self.subsystems = subsystems
+        self.scheduler = scheduler
+        self.stages = {name: _Stage(name) for name in STAGES}
+        self.hooks: List[Hook] = []
+        self._overrunning: Set[asyncio.Task] = set()
+
+    def add_hook(self, hook: Hook):
+        self.hooks.append(hook)
+
+    async def run(self, run: PipelineRun) -> PipelineRun:
+        if run.audio is not None:
+            await self._stage("transcribe", run, self._transcribe)
+        await self._stage("classify", run, self._classify)
+        await self._stage("route", run, self._route)
+        if run.target == "generate":
+            await self._stage("generate", run, self._generate)
+        else:
+            await self._stage("execute", run, self._execute)
+        await self._stage("speak", run, self._speak)
+        return run
+
+    async def _stage(self, name: str, run: PipelineRun, body: Callable[[PipelineRun], Awaitable[None]]):
+        stage = self.stages[name]
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        stage.in_flight += 1
+        try:
+            if stage.semaphore:
+                async with stage.semaphore:
+                    await asyncio.wait_for(body(run), stage.timeout)
+            else:
+                await asyncio.wait_for(body(run), stage.timeout)
+        except asyncio.TimeoutError:
+            stage.timeouts += 1
+            error = StageError(name, "timeout", f"{name} timed out after {stage.timeout:g}s")
+            raise error
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stage.in_flight -= 1
+            stage.runs += 1
+            stage.errors += error is not None
+            stage.latencies.append(elapsed)
+            run.timings[name] = round(elapsed * 1000, 2)
+            for hook in self.hooks:
+                try:
+                    hook(name, run, elapsed, error)
+                except Exception as e:
+                    logger.error(f"Pipeline hook failed after {name}: {e}")
+
+    async def _transcribe(self, run: PipelineRun):
+        try:
+            async with self.scheduler.admit("transcription", run.connection):
+                run.charged = True
+                run.text = await self.subsystems.get("speech_handler").transcribe_audio(run.audio)
+        except SchedulerBusy:
+            raise
+        except Exception as e:
+            raise StageError("transcribe", "failed", str(e)) from e
+        await run.emit({"type": "transcription", "text": run.text})
+
+    async def _classify(self, run: PipelineRun):
+        await run.emit({
+            "type": "status",
+            "status": "processing",
+            "message": "Understanding your command..."
+        })
+        run.intent_data = await self.subsystems.get("nlp_engine").process_command(run.text)
+        await run.emit({
+            "type": "intent",
+            "intent": run.intent_data["intent"],
+            "entities": run.intent_data["entities"],
+            "confidence": run.intent_data["confidence"]
+        })
+
+    async def _route(self, run: PipelineRun):
+        if run.intent_data["intent"] in AI_INTENTS and self.subsystems.get("gemini_ai").is_available():
+            run.target = "generate"
+        else:
+            run.target = "execute"
+            if run.speculator:
+                run.speculator.discard()
+
+    async def _generate(self, run: PipelineRun):
+        gemini_ai = self.subsystems.get("gemini_ai")
+        speculative = await run.speculator.resolve(run.text) if run.speculator else None
+        if speculative:
+            ai_response, usage, saved = speculative
+            gemini_ai.record_turn(run.text, ai_response, usage.get("grounded", False))
+            run.speculative = True
+            data = {"ai_generated": True, "usage": usage, "speculative": True,
+                    "latency_saved_ms": round(saved * 1000, 1)}
+        else:
+            call = asyncio.ensure_future(self._chat(gemini_ai, run))
+            try:
+                ai_response, usage, queue_wait = await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # Timed out: stop queueing, but a Gemini call already running keeps
+                # its llm slot until the thread returns, and is never recorded
+                call.cancel()
+                self._overrunning.add(call)
+                call.add_done_callback(self._overrun_finished)
+                raise
+            if usage["status"] == "ok":
+                gemini_ai.record_turn(run.text, ai_response, usage["grounded"])
+            data = {"ai_generated": True, "usage": usage, "queue_wait_ms": round(queue_wait * 1000, 1)}
+        run.usage = usage
+        run.result = {"success": True, "message": ai_response, "data": data}
+        await run.emit(dict(type="result", **run.result))
+
+    async def _chat(self, gemini_ai: Any, run: PipelineRun):
+        priority = priority_for_triage(run.intent_data.get("triage"))
+        async with self.scheduler.admit("llm", run.connection, priority,
+                                        charge_connection=not run.charged) as queue_wait:
+            ai_response, usage = await to_thread_in_slot(gemini_ai.chat_with_usage, run.text, None, False)
+        return ai_response, usage, queue_wait
+
+    def _overrun_finished(self, task: "asyncio.Task"):
+        self._overrunning.discard(task)
+        if not task.cancelled():
+            # Retrieve the exception so abandoned calls do not log warnings
+            task.exception()
+
+    async def _execute(self, run: PipelineRun):
+        result = await self.subsystems.get("workflow_executor").execute(run.intent_data)
+        attachment = result.get("attachment")
+        if attachment and run.emit_binary:
+            kind, header, payload = attachment
+            await run.emit_binary(pack_binary_frame(dict(header, type=kind), payload))
+        run.result = {"success": result["success"], "message": result["message"], "data": result.get("data", {})}
+        await run.emit(dict(type="result", **run.result))
+
+    async def _speak(self, run: PipelineRun):
+        # Generated answers are read out by the client from the result frame;
+        # automation results get an explicit speech frame
+        if run.target == "execute" and run.result["success"]:
+            run.speech = run.result["message"]
+            await run.emit({"type": "speech", "text": run.speech})
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,157 @@
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Top-level packages of this backend; objects are attributed to a subsystem by
+# the module that defines their type
+SUBSYSTEM_PACKAGES = ("ai", "audio", "automation", "core", "main")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler producing collapsed stacks for flame graphs
+
+    Nothing runs until a profile is requested: the sampler thread only exists for
+    the duration of a single profile, so there is no overhead when profiling is off.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005) -> Dict[str, Any]:
+        """Sample all threads for `seconds`; blocking, so run it in a worker thread"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A CPU profile is already running")
+
+        try:
+            me = threading.get_ident()
+            names = {}
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == me:
+                        continue
+                    if thread_id not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                    stacks[";".join(reversed(labels))] += 1
+                samples += 1
+                time.sleep(interval)
+
+            return {"samples": samples, "interval": interval, "stacks": stacks}
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapse(stacks: Counter) -> str:
+        """Render stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots and snapshot diffs
+
+    tracemalloc is only started by the first snapshot and is stopped again by
+    reset(), which returns the process to zero tracing overhead.
+    """
+
+    def __init__(self, max_snapshots: int = 5, frames: int = 10):
+        self.max_snapshots = max_snapshots
+        self.frames = frames
+        self.snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._next_id = 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self.snapshots[snapshot_id] = snapshot
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "id": snapshot_id,
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "retained_snapshots": list(self.snapshots.keys()),
+        }
+
+    def top(self, snapshot_id: int, limit: int = 25, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        stats = self._get(snapshot_id).statistics(group_by)
+        return [
+            {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in stats[:limit]
+        ]
+
+    def diff(self, from_id: int, to_id: int, limit: int = 25, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        stats = self._get(to_id).compare_to(self._get(from_id), group_by)
+        return [
+            {
+                "location": str(stat.traceback),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+        ]
+
+    def reset(self):
+        self.snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        if snapshot_id not in self.snapshots:
+            raise KeyError(f"Unknown snapshot {snapshot_id}; retained: {list(self.snapshots.keys())}")
+        return self.snapshots[snapshot_id]
+
+
+def object_counts(sizes: Optional[Dict[str, Callable[[], int]]] = None, top: int = 10) -> Dict[str, Any]:
+    """Count live objects per backend subsystem plus the sizes of known containers"""
+    per_subsystem: Dict[str, Counter] = {name: Counter() for name in SUBSYSTEM_PACKAGES}
+    total = 0
+
+    for obj in gc.get_objects():
+        total += 1
+        cls = type(obj)
+        package = cls.__module__.split(".", 1)[0]
+        if package in per_subsystem:
+            per_subsystem[package][cls.__qualname__] += 1
+
+    return {
+        "gc_tracked_objects": total,
+        "gc_counts": gc.get_count(),
+        "subsystems": {
+            name: {"objects": sum(counts.values()), "top_types": dict(counts.most_common(top))}
+            for name, counts in per_subsystem.items()
+        },
+        "containers": {name: size() for name, size in (sizes or {}).items()},
+    }
@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_EMERGENCY = 0
+PRIORITY_URGENT = 1
+PRIORITY_NORMAL = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_EMERGENCY: "emergency",
+    PRIORITY_URGENT: "urgent",
+    PRIORITY_NORMAL: "normal",
+}
+
+
+def priority_for_triage(triage: Optional[Dict[str, Any]]) -> int:
+    """Map an NLPEngine triage assessment onto a scheduler priority"""
+    level = (triage or {}).get("level", "routine")
+    if level == "emergency":
+        return PRIORITY_EMERGENCY
+    if level == "urgent":
+        return PRIORITY_URGENT
+    return PRIORITY_NORMAL
+
+
+async def to_thread_in_slot(func: Callable[..., Any], *args: Any,
+                            on_done: Optional[Callable[[asyncio.Future], None]] = None) -> Any:
+    """asyncio.to_thread for use inside an admit() block
+
+    A thread cannot be stopped, so when the caller is cancelled this still waits
+    for it to return before the block (and the stage slot it holds) is left; the
+    slot then reflects the upstream calls actually in flight. on_done is called
+    with the finished future either way.
+    """
+    call = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    if on_done:
+        call.add_done_callback(on_done)
+    try:
+        return await asyncio.shield(call)
+    finally:
+        if not call.done():
+            await asyncio.wait({call})
+
+
+class SchedulerBusy(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def refund(self, tokens: float = 1.0):
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        self._refill()
+        if self.tokens >= tokens or self.rate <= 0:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class _Stage:
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.waiters: List[Any] = []
+        self.admitted = 0
+        self.shed = 0
+        self.waits = {name: deque(maxlen=512) for name in PRIORITY_NAMES.values()}
+        self.max_wait = 0.0
+
+
+class AdmissionScheduler:
+    """Admission control and priority scheduling for the expensive pipeline stages
+
+    Every admission is charged against a per-connection and a global token bucket and
+    then waits in a bounded priority queue for one of the stage's concurrency slots.
+    Emergency requests skip the buckets and the queue bound, go to the head of the
+    queue and may use a small reserve of slots above the normal concurrency limit.
+    Per-connection buckets unused for SCHED_CONNECTION_IDLE_TTL seconds are dropped,
+    so REST clients (keyed by address, never released) do not accumulate.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(
+            float(os.getenv("SCHED_GLOBAL_RATE", "10")),
+            float(os.getenv("SCHED_GLOBAL_BURST", "20"))
+        )
+        self.connection_rate = float(os.getenv("SCHED_CONNECTION_RATE", "1"))
+        self.connection_burst = float(os.getenv("SCHED_CONNECTION_BURST", "5"))
+        self.queue_size = int(os.getenv("SCHED_QUEUE_SIZE", "32"))
+        self.emergency_reserve = int(os.getenv("SCHED_EMERGENCY_RESERVE", "2"))
+        # Never shorter than a full refill, so dropping a bucket cannot grant extra tokens
+        self.connection_idle_ttl = max(float(os.getenv("SCHED_CONNECTION_IDLE_TTL", "600")),
+                                       self.connection_burst / max(self.connection_rate, 1e-9))
+
+        self.stages = {
+            "llm": _Stage("llm", int(os.getenv("SCHED_LLM_CONCURRENCY", "4"))),
+            "transcription": _Stage("transcription", int(os.getenv("SCHED_TRANSCRIPTION_CONCURRENCY", "2"))),
+        }
+        # Least recently used first
+        self.connection_buckets: "OrderedDict[Any, TokenBucket]" = OrderedDict()
+        self._sequence = itertools.count()
+
+    def _connection_bucket(self, connection_id: Any) -> TokenBucket:
+        self._expire_idle_buckets()
+        bucket = self.connection_buckets.get(connection_id)
+        if bucket is None:
+            bucket = TokenBucket(self.connection_rate, self.connection_burst)
+            self.connection_buckets[connection_id] = bucket
+        else:
+            self.connection_buckets.move_to_end(connection_id)
+        return bucket
+
+    def _expire_idle_buckets(self):
+        cutoff = time.monotonic() - self.connection_idle_ttl
+        while self.connection_buckets:
+            connection_id, bucket = next(iter(self.connection_buckets.items()))
+            if bucket.updated > cutoff:
+                return
+            del self.connection_buckets[connection_id]
+
+    def release_connection(self, connection_id: Any):
+        self.connection_buckets.pop(connection_id, None)
+
+    def _charge(self, stage: _Stage, connection_id: Any, charge_connection: bool):
+        connection_bucket = self._connection_bucket(connection_id) if charge_connection else None
+        if connection_bucket and not connection_bucket.try_acquire():
+            stage.shed += 1
+            raise SchedulerBusy("rate_limited", connection_bucket.retry_after())
+        if not self.global_bucket.try_acquire():
+            if connection_bucket:
+                connection_bucket.refund()
+            stage.shed += 1
+            raise SchedulerBusy("overloaded", self.global_bucket.retry_after())
+
+    def _can_start(self, stage: _Stage, priority: int) -> bool:
+        limit = stage.concurrency
+        if priority == PRIORITY_EMERGENCY:
+            limit += self.emergency_reserve
+        return stage.in_flight < limit
+
+    def _dispatch(self, stage: _Stage):
+        while stage.waiters:
+            priority, _, future = stage.waiters[0]
+            if future.done():
+                heapq.heappop(stage.waiters)
+                continue
+            if not self._can_start(stage, priority):
+                return
+            heapq.heappop(stage.waiters)
+            stage.in_flight += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, stage_name: str, connection_id: Any, priority: int = PRIORITY_NORMAL,
+                    charge_connection: bool = True):
+        """Hold a slot in the given stage for the duration of the block
+
+        Yields the time spent queued, in seconds. Raises SchedulerBusy when the request
+        is shed. Pass charge_connection=False for a later stage of a command whose
+        connection was already charged at an earlier one.
+        """
+        stage = self.stages[stage_name]
+
+        if priority != PRIORITY_EMERGENCY:
+            self._charge(stage, connection_id, charge_connection)
+
+        started = time.monotonic()
+        queued_ahead = any(not f.done() and p <= priority for p, _, f in stage.waiters)
+
+        if not queued_ahead and self._can_start(stage, priority):
+            stage.in_flight += 1
+        else:
+            if priority != PRIORITY_EMERGENCY and len(stage.waiters) >= self.queue_size:
+                if charge_connection:
+                    self._connection_bucket(connection_id).refund()
+                self.global_bucket.refund()
+                stage.shed += 1
+                raise SchedulerBusy("queue_full", 1.0)
+
+            future = asyncio.get_running_loop().create_future()
+            entry = (priority, next(self._sequence), future)
+            heapq.heappush(stage.waiters, entry)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    stage.in_flight -= 1
+                    self._dispatch(stage)
+                else:
+                    # Leave the queue now so the bound only counts live waiters
+                    stage.waiters.remove(entry)
+                    heapq.heapify(stage.waiters)
+                raise
+
+        wait = time.monotonic() - started
+        stage.admitted += 1
+        stage.waits[PRIORITY_NAMES[priority]].append(wait)
+        stage.max_wait = max(stage.max_wait, wait)
+        if wait > 1.0:
+            logger.info(f"{stage_name} request waited {wait * 1000:.0f} ms in queue ({PRIORITY_NAMES[priority]})")
+
+        try:
+            yield wait
+        finally:
+            stage.in_flight -= 1
+            self._dispatch(stage)
+
+    def stats(self) -> Dict[str, Any]:
+        stages = {}
+        for name, stage in self.stages.items():
+            waits = {}
+            for priority_name, samples in stage.waits.items():
+                if not samples:
+                    continue
+                ordered = sorted(samples)
+                waits[priority_name] = {
+                    "samples": len(ordered),
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+                    "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                }
+            stages[name] = {
+                "concurrency": stage.concurrency,
+                "in_flight": stage.in_flight,
+                "queued": sum(1 for _, _, f in stage.waiters if not f.done()),
+                "admitted": stage.admitted,
+                "shed": stage.shed,
+                "max_wait_ms": round(stage.max_wait * 1000, 2),
+                "queue_wait": waits,
+            }
+        return {
+            "queue_size": self.queue_size,
+            "tracked_connections": len(self.connection_buckets),
+            "stages": stages,
+        }
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Precompressed variants written next to each file by frontend/scripts/compress.mjs,
+# in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Vite's output names: assets/<name>-<8 char base64url hash>.<ext>
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+CHUNK_SIZE = 256 * 1024
+
+
+class _Variant:
+    __slots__ = ("path", "size", "etag", "data")
+
+    def __init__(self, path: str, size: int, etag: str, data: Optional[bytes]):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.data = data
+
+
+class _Asset:
+    __slots__ = ("content_type", "cache_control", "variants")
+
+    def __init__(self, content_type: str, cache_control: str, variants: Dict[str, _Variant]):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.variants = variants
+
+
+def accepted_encodings(header: str) -> List[str]:
+    """Encodings from an Accept-Encoding header with a non-zero q value"""
+    accepted = []
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+class FrontendFiles:
+    """ASGI app serving the built frontend (frontend/dist)
+
+    The directory is indexed once at start-up: content type, a strong ETag per
+    representation, and the .br/.gz variants written at build time, so a
+    request never compresses or hashes anything. Files with a content hash in
+    their name are cached as immutable; everything else (index.html) is
+    revalidated with If-None-Match and answered with 304 when unchanged.
+    Bodies up to FRONTEND_MEMORY_MAX_BYTES are kept in memory. Larger ones go
+    out through the server's zero-copy extension (http.response.zerocopysend
+    or http.response.pathsend) where it has one, and in chunks read off the
+    event loop otherwise. Unknown paths that ask for HTML get index.html, so
+    client-side routes work. FRONTEND_CROSS_ORIGIN_ISOLATION=true adds COOP/COEP
+    headers; it is off by default because require-corp blocks cross-origin
+    resources that send no CORP header, such as the Google Fonts stylesheet.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.memory_max_bytes = int(os.getenv("FRONTEND_MEMORY_MAX_BYTES", str(2 * 1024 * 1024)))
+        self.extra_headers = [
+            (b"cross-origin-embedder-policy", b"require-corp"),
+            (b"cross-origin-opener-policy", b"same-origin"),
+        ] if os.getenv("FRONTEND_CROSS_ORIGIN_ISOLATION", "false").lower() == "true" else []
+        self.assets: Dict[str, _Asset] = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.by_encoding: Dict[str, int] = {}
+        self.scan()
+
+    def scan(self):
+        if not os.path.isfile(os.path.join(self.directory, "index.html")):
+            raise RuntimeError(f"{self.directory} has no index.html; build the frontend first")
+        assets = {}
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for root, _, files in os.walk(self.directory):
+            present = set(files)
+            for name in files:
+                if name.endswith(suffixes) and os.path.splitext(name)[0] in present:
+                    continue
+                path = os.path.join(root, name)
+                url = "/" + os.path.relpath(path, self.directory).replace(os.sep, "/")
+                assets[url] = self._index(path, name)
+        self.assets = assets
+        memory = sum(v.size for a in assets.values() for v in a.variants.values() if v.data is not None)
+        logger.info(f"Serving frontend from {self.directory}: {len(assets)} files, {memory} bytes in memory")
+
+    def _index(self, path: str, name: str) -> _Asset:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        variants = {"identity": self._variant(path, data, f'"{digest}"')}
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, "rb") as f:
+                    variants[encoding] = self._variant(path + suffix, f.read(), f'"{digest}-{encoding}"')
+
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+        return _Asset(content_type, IMMUTABLE if HASHED_NAME.search(name) else REVALIDATE, variants)
+
+    def _variant(self, path: str, data: bytes, etag: str) -> _Variant:
+        keep = len(data) <= self.memory_max_bytes
+        return _Variant(path, len(data), etag, data if keep else None)
+
+    def _resolve(self, path: str, accept: str) -> Optional[_Asset]:
+        if path.endswith("/"):
+            path += "index.html"
+        asset = self.assets.get(path)
+        if asset is None and "text/html" in accept:
+            asset = self.assets.get("/index.html")
+        return asset
+
+    async def __call__(self, scope: Dict[str, Any], receive, send):
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        if scope["type"] != "http":
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._respond(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+        asset = self._resolve(scope["path"], headers.get("accept", ""))
+        if asset is None:
+            await self._respond(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+            return
+
+        accepted = accepted_encodings(headers.get("accept-encoding", ""))
+        encoding = next((e for e, _ in ENCODINGS if e in accepted and e in asset.variants), "identity")
+        variant = asset.variants[encoding]
+        self.requests += 1
+
+        response_headers = [
+            (b"etag", variant.etag.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"vary", b"Accept-Encoding"),
+        ] + self.extra_headers
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or variant.etag in if_none_match):
+            self.not_modified += 1
+            await self._respond(send, 304, response_headers)
+            return
+
+        response_headers += [
+            (b"content-type", asset.content_type.encode()),
+            (b"content-length", str(variant.size).encode()),
+        ]
+        if encoding != "identity":
+            response_headers.append((b"content-encoding", encoding.encode()))
+        self.by_encoding[encoding] = self.by_encoding.get(encoding, 0) + 1
+
+        if scope["method"] == "HEAD":
+            await self._respond(send, 200, response_headers)
+            return
+        self.bytes_sent += variant.size
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        await self._send_body(scope, send, variant)
+
+    async def _send_body(self, scope: Dict[str, Any], send, variant: _Variant):
+        if variant.data is not None:
+            await send({"type": "http.response.body", "body": variant.data})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(variant.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(), "count": variant.size})
+            return
+        if "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": variant.path})
+            return
+
+        with open(variant.path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+                if not more:
+                    break
+
+    @staticmethod
+    async def _respond(send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes = b""):
+        if body:
+            headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "files": len(self.assets),
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+            "by_encoding": dict(self.by_encoding),
+        }
@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazySubsystem:
+    """A subsystem that is imported and constructed on first use"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.instance: Optional[Any] = None
+        self.load_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None
+
+    def get(self) -> Any:
+        if self.instance is not None:
+            return self.instance
+
+        with self._lock:
+            if self.instance is None:
+                started = time.perf_counter()
+                try:
+                    instance = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"Failed to load subsystem {self.name}: {e}")
+                    raise
+                self.load_ms = (time.perf_counter() - started) * 1000
+                self.error = None
+                self.instance = instance
+                logger.info(f"Loaded subsystem {self.name} in {self.load_ms:.1f} ms")
+        return self.instance
+
+    def override(self, instance: Any):
+        with self._lock:
+            self.instance = instance
+            self.load_ms = 0.0
+            self.error = None
+
+    def status(self) -> Dict[str, Any]:
+        if self.instance is None:
+            return {"state": "failed" if self.error else "not_loaded", "error": self.error}
+
+        ready = True
+        is_ready = getattr(self.instance, "is_ready", None)
+        if callable(is_ready):
+            try:
+                ready = bool(is_ready())
+            except Exception:
+                ready = False
+        return {"state": "ready" if ready else "degraded", "load_ms": round(self.load_ms or 0.0, 2)}
+
+
+class SubsystemRegistry:
+    """Registry of optional subsystems that load on first use
+
+    Keeps heavy optional dependencies (speech recognition, TTS, desktop automation)
+    out of process start-up so headless deployments cold-start quickly.
+    """
+
+    def __init__(self):
+        self._subsystems: Dict[str, LazySubsystem] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._subsystems[name] = LazySubsystem(name, factory)
+
+    def get(self, name: str) -> Any:
+        return self._subsystems[name].get()
+
+    def loaded(self, name: str) -> bool:
+        return self._subsystems[name].loaded
+
+    def ready(self, name: str) -> bool:
+        """Whether the subsystem is loaded and reports itself ready (never triggers a load)"""
+        return self._subsystems[name].status()["state"] == "ready"
+
+    def override(self, name: str, instance: Any):
+        self._subsystems[name].override(instance)
+
+    def preload(self, names: Iterable[str]):
+        for name in names:
+            if name not in self._subsystems:
+                logger.warning(f"Unknown subsystem in preload list: {name}")
+                continue
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: subsystem.status() for name, subsystem in self._subsystems.items()}
@@ -0,0 +1,223 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the upstream latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+class UsageCounters:
+    """Token, latency and outcome counters for one aggregation key"""
+
+    __slots__ = ("requests", "prompt_tokens", "candidate_tokens", "thoughts_tokens", "total_tokens",
+                 "grounded", "errors", "upstream_ms_total", "upstream_ms_max", "latency_buckets",
+                 "cost_usd", "last_seen")
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.candidate_tokens = 0
+        self.thoughts_tokens = 0
+        self.total_tokens = 0
+        self.grounded = 0
+        self.errors = 0
+        self.upstream_ms_total = 0.0
+        self.upstream_ms_max = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.cost_usd = 0.0
+        self.last_seen = 0.0
+
+    def add(self, usage: Dict[str, Any], cost: float, now: float):
+        self.requests += 1
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.candidate_tokens += usage.get("candidate_tokens", 0)
+        self.thoughts_tokens += usage.get("thoughts_tokens", 0)
+        self.total_tokens += usage.get("total_tokens", 0)
+        self.grounded += usage.get("grounded", False)
+        self.errors += usage.get("status", "ok") != "ok"
+        upstream_ms = usage.get("upstream_ms")
+        if upstream_ms is not None:
+            self.upstream_ms_total += upstream_ms
+            self.upstream_ms_max = max(self.upstream_ms_max, upstream_ms)
+            self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, upstream_ms)] += 1
+        self.cost_usd += cost
+        self.last_seen = now
+
+    def _latency_quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding the q-quantile"""
+        observed = sum(self.latency_buckets)
+        if not observed:
+            return None
+        rank = q * observed
+        seen = 0
+        for index, count in enumerate(self.latency_buckets):
+            seen += count
+            if seen >= rank:
+                bound = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.upstream_ms_max
+                return min(bound, self.upstream_ms_max)
+        return self.upstream_ms_max
+
+    def as_dict(self) -> Dict[str, Any]:
+        observed = sum(self.latency_buckets)
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "candidate_tokens": self.candidate_tokens,
+            "thoughts_tokens": self.thoughts_tokens,
+            "total_tokens": self.total_tokens,
+            "grounded": self.grounded,
+            "errors": self.errors,
+            "upstream_ms_mean": round(self.upstream_ms_total / observed, 1) if observed else None,
+            "upstream_ms_p50": self._latency_quantile(0.5),
+            "upstream_ms_p95": self._latency_quantile(0.95),
+            "upstream_ms_max": self.upstream_ms_max if observed else None,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+class _Aggregate:
+    def __init__(self):
+        self.totals = UsageCounters()
+        self.by_route: Dict[str, UsageCounters] = {}
+        self.by_intent: Dict[str, UsageCounters] = {}
+        self.by_grounding: Dict[str, UsageCounters] = {}
+
+    def add(self, route: str, intent: str, grounding: str, usage: Dict[str, Any], cost: float, now: float):
+        self.totals.add(usage, cost, now)
+        for table, key in ((self.by_route, route), (self.by_intent, intent), (self.by_grounding, grounding)):
+            counters = table.get(key)
+            if counters is None:
+                counters = table[key] = UsageCounters()
+            counters.add(usage, cost, now)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "totals": self.totals.as_dict(),
+            "by_route": {k: v.as_dict() for k, v in self.by_route.items()},
+            "by_intent": {k: v.as_dict() for k, v in self.by_intent.items()},
+            "by_grounding": {k: v.as_dict() for k, v in self.by_grounding.items()},
+        }
+
+
+class UsageTelemetry:
+    """In-memory token usage, cost and upstream latency per session and route
+
+    record() is called on the event loop after each Gemini request and only
+    bumps counters, so it adds microseconds per request. Aggregates are kept
+    cumulatively and for the current rollup window; every rollup_interval the
+    window is appended to a JSONL file and reset. Sessions are capped at
+    max_sessions, dropping the least recently active.
+    """
+
+    def __init__(self):
+        self.directory = os.getenv("TELEMETRY_DIR", os.getenv("INTERACTION_LOG_DIR", "logs"))
+        self.rollup_interval = float(os.getenv("TELEMETRY_ROLLUP_INTERVAL", "60"))
+        self.max_sessions = int(os.getenv("TELEMETRY_MAX_SESSIONS", "1000"))
+        # USD per million tokens; thinking tokens are billed as output
+        self.input_price = float(os.getenv("GEMINI_PRICE_INPUT_PER_MTOK", "0.30"))
+        self.output_price = float(os.getenv("GEMINI_PRICE_OUTPUT_PER_MTOK", "2.50"))
+        self.grounded_price = float(os.getenv("GEMINI_PRICE_PER_GROUNDED_REQUEST", "0.0"))
+
+        self.cumulative = _Aggregate()
+        self.window = _Aggregate()
+        self.sessions: "OrderedDict[str, UsageCounters]" = OrderedDict()
+        self.started = time.time()
+        self.window_started = self.started
+        self.rollups = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def cost(self, usage: Dict[str, Any]) -> float:
+        output_tokens = usage.get("candidate_tokens", 0) + usage.get("thoughts_tokens", 0)
+        cost = (usage.get("prompt_tokens", 0) * self.input_price + output_tokens * self.output_price) / 1_000_000
+        if usage.get("grounded"):
+            cost += self.grounded_price
+        return cost
+
+    def record(self, session: Any, route: str, intent: str, usage: Dict[str, Any]):
+        now = time.time()
+        cost = self.cost(usage)
+        grounding = "grounded" if usage.get("grounded") else (
+            "search_enabled" if usage.get("search_grounding") else "search_disabled"
+        )
+        self.cumulative.add(route, intent, grounding, usage, cost, now)
+        self.window.add(route, intent, grounding, usage, cost, now)
+
+        key = str(session)
+        counters = self.sessions.get(key)
+        if counters is None:
+            counters = self.sessions[key] = UsageCounters()
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(key)
+        counters.add(usage, cost, now)
+
+    def snapshot(self, top_sessions: int = 20) -> Dict[str, Any]:
+        top = sorted(self.sessions.items(), key=lambda item: item[1].total_tokens, reverse=True)[:top_sessions]
+        return dict(
+            self.cumulative.as_dict(),
+            since=datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            sessions_tracked=len(self.sessions),
+            top_sessions={key: counters.as_dict() for key, counters in top},
+        )
+
+    def session(self, session: Any) -> Optional[Dict[str, Any]]:
+        counters = self.sessions.get(str(session))
+        return counters.as_dict() if counters else None
+
+    def start(self):
+        if self._task is None and self.rollup_interval > 0 and self.directory:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            await self.rollup()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.rollup_interval)
+            try:
+                await self.rollup()
+            except Exception as e:
+                logger.error(f"Usage telemetry rollup failed: {e}")
+
+    async def rollup(self):
+        """Append the current window to the rollup file and start a new window"""
+        now = time.time()
+        window, self.window = self.window, _Aggregate()
+        if not window.totals.requests:
+            self.window_started = now
+            return
+        line = json.dumps(dict(
+            window.as_dict(),
+            window_start=datetime.fromtimestamp(self.window_started).isoformat(timespec="seconds"),
+            window_end=datetime.fromtimestamp(now).isoformat(timespec="seconds"),
+            active_sessions=sum(1 for c in self.sessions.values() if c.last_seen >= self.window_started),
+        ))
+        self.window_started = now
+        await asyncio.to_thread(self._append, line)
+        self.rollups += 1
+
+    def _append(self, line: str):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "usage-rollup.jsonl"), "a") as f:
+            f.write(line + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.cumulative.totals.requests,
+            "total_tokens": self.cumulative.totals.total_tokens,
+            "cost_usd": round(self.cumulative.totals.cost_usd, 6),
+            "sessions_tracked": len(self.sessions),
+            "rollups": self.rollups,
+        }
@@ -0,0 +1,397 @@
+"""Record/replay of upstream calls (Gemini chat, speech recognition)
+
+    python -m core.upstream cassettes/session.jsonl
+
+Prints a summary of a cassette: interactions per kind, error counts and
+recorded latency percentiles.
+
+UPSTREAM_MODE selects how the server talks to its upstreams:
+
+- live (default): real GeminiAI and SpeechHandler
+- record: real upstreams, with every request/response pair and its latency
+  appended to the UPSTREAM_CASSETTE file
+- replay: no network; responses come from the cassette, delayed according to
+  UPSTREAM_GEMINI_LATENCY / UPSTREAM_SPEECH_LATENCY, with optional error
+  injection (UPSTREAM_ERROR_RATE, UPSTREAM_ERROR_KIND)
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_MODES = ("live", "record", "replay")
+
+FALLBACK_MESSAGE = "I'm having trouble connecting right now. Please try again."
+
+
+def gemini_key(user_message: str, context: Optional[str] = None) -> str:
+    text = " ".join(re.findall(r"[a-z0-9']+", user_message.lower()))
+    return f"{text}|{context}" if context else text
+
+
+def audio_key(audio_bytes: bytes) -> str:
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+
+class Cassette:
+    """JSONL file of recorded upstream interactions, indexed by kind and request key"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.interactions: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+        self.by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def load(self) -> "Cassette":
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    self._index(json.loads(line))
+        logger.info(f"Loaded cassette {self.path}: " +
+                    ", ".join(f"{len(v)} {k}" for k, v in self.by_kind.items()))
+        return self
+
+    def _index(self, interaction: Dict[str, Any]):
+        self.interactions[interaction["kind"]][interaction["key"]].append(interaction)
+        self.by_kind[interaction["kind"]].append(interaction)
+
+    def record(self, kind: str, key: str, request: Dict[str, Any], response: Any,
+               latency_ms: float, error: Optional[str] = None):
+        interaction = {
+            "kind": kind,
+            "key": key,
+            "request": request,
+            "response": response,
+            "error": error,
+            "latency_ms": round(latency_ms, 1),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        line = json.dumps(interaction)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+            self._index(interaction)
+
+    def lookup(self, kind: str, key: str, on_miss: str = "cycle") -> Optional[Dict[str, Any]]:
+        """Next interaction for the key (cycling through repeats); on a miss, cycle through the kind or give up"""
+        with self._lock:
+            matches = self.interactions[kind].get(key)
+            if not matches:
+                if on_miss != "cycle" or not self.by_kind[kind]:
+                    return None
+                matches, key = self.by_kind[kind], "*"
+            index = self._cursor[(kind, key)]
+            self._cursor[(kind, key)] = index + 1
+            return matches[index % len(matches)]
+
+    def latencies(self, kind: str) -> List[float]:
+        return [i["latency_ms"] for i in self.by_kind[kind]]
+
+
+class LatencyModel:
+    """Delay in seconds for a replayed call
+
+    Specs (milliseconds): recorded, none, fixed:400, normal:400,100,
+    lognormal:400,0.5 (median, sigma) and empirical (resample any recorded
+    latency of the same kind). UPSTREAM_LATENCY_SCALE multiplies the result.
+    """
+
+    def __init__(self, spec: str, rng: random.Random, recorded: List[float], scale: float = 1.0):
+        self.spec = spec
+        self.rng = rng
+        self.recorded = recorded
+        self.scale = scale
+        name, _, params = spec.partition(":")
+        self.name = name
+        self.params = [float(p) for p in params.split(",") if p]
+        if name not in ("recorded", "none", "fixed", "normal", "lognormal", "empirical"):
+            raise ValueError(f"Unknown latency model '{spec}'")
+
+    def sample(self, recorded_ms: Optional[float] = None) -> float:
+        if self.name == "none":
+            ms = 0.0
+        elif self.name == "recorded":
+            ms = recorded_ms or 0.0
+        elif self.name == "fixed":
+            ms = self.params[0]
+        elif self.name == "normal":
+            ms = self.rng.gauss(self.params[0], self.params[1])
+        elif self.name == "lognormal":
+            ms = self.params[0] * math.exp(self.rng.gauss(0, self.params[1]))
+        else:
+            ms = self.rng.choice(self.recorded) if self.recorded else 0.0
+        return max(0.0, ms * self.scale / 1000)
+
+
+class ErrorInjector:
+    def __init__(self, rate: float, kind: str, timeout: float, rng: random.Random):
+        self.rate = rate
+        self.kind = kind
+        self.timeout = timeout
+        self.rng = rng
+        self.injected = 0
+
+    def draw(self) -> Optional[str]:
+        if self.rate and self.rng.random() < self.rate:
+            self.injected += 1
+            return self.kind
+        return None
+
+
+class _ReplayConfig:
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.rng = random.Random(int(os.getenv("UPSTREAM_SEED", "0")))
+        scale = float(os.getenv("UPSTREAM_LATENCY_SCALE", "1.0"))
+        self.on_miss = os.getenv("UPSTREAM_REPLAY_MISS", "cycle")
+        self.gemini_latency = LatencyModel(os.getenv("UPSTREAM_GEMINI_LATENCY", "recorded"), self.rng,
+                                           cassette.latencies("gemini"), scale)
+        self.speech_latency = LatencyModel(os.getenv("UPSTREAM_SPEECH_LATENCY", "recorded"), self.rng,
+                                           cassette.latencies("speech"), scale)
+        self.errors = ErrorInjector(
+            float(os.getenv("UPSTREAM_ERROR_RATE", "0")),
+            os.getenv("UPSTREAM_ERROR_KIND", "error"),
+            float(os.getenv("UPSTREAM_TIMEOUT_MS", "10000")) / 1000,
+            self.rng,
+        )
+
+
+class RecordingGeminiAI:
+    """Wraps GeminiAI and appends every chat exchange to the cassette"""
+
+    def __init__(self, inner: Any, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    def chat(self, user_message: str, context: Optional[str] = None) -> str:
+        return self.chat_with_usage(user_message, context)[0]
+
+    def chat_with_usage(self, user_message: str, context: Optional[str] = None,
+                        record_history: bool = True) -> Tuple[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        response, usage = self.inner.chat_with_usage(user_message, context, record_history)
+        latency_ms = usage.get("upstream_ms") or (time.perf_counter() - started) * 1000
+        error = None if usage.get("status", "ok") == "ok" else usage["status"]
+        self.cassette.record("gemini", gemini_key(user_message, context),
+                             {"message": user_message, "context": context},
+                             {"text": response, "usage": usage}, latency_ms, error)
+        return response, usage
+
+
+class RecordingSpeechHandler:
+    """Wraps SpeechHandler and appends every transcription (or its error) to the cassette"""
+
+    def __init__(self, inner: Any, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.keep_audio = os.getenv("UPSTREAM_RECORD_AUDIO", "false").lower() == "true"
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def transcribe_audio(self, audio_data: str) -> str:
+        audio_bytes = base64.b64decode(audio_data)
+        request = {"audio_bytes": len(audio_bytes)}
+        if self.keep_audio:
+            request["audio"] = audio_data
+        started = time.perf_counter()
+        try:
+            text = await self.inner.transcribe_audio(audio_data)
+        except Exception as e:
+            self.cassette.record("speech", audio_key(audio_bytes), request, None,
+                                 (time.perf_counter() - started) * 1000, str(e))
+            raise
+        self.cassette.record("speech", audio_key(audio_bytes), request, {"text": text},
+                             (time.perf_counter() - started) * 1000)
+        return text
+
+
+class ReplayGeminiAI:
+    """Serves Gemini responses from a cassette with simulated latency, errors and streaming"""
+
+    def __init__(self, config: _ReplayConfig):
+        self.config = config
+        self.calls = 0
+        self.misses = 0
+
+    def is_available(self) -> bool:
+        return True
+
+    def chat(self, user_message: str, context: Optional[str] = None) -> str:
+        return self.chat_with_usage(user_message, context)[0]
+
+    def _lookup(self, user_message: str, context: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        self.calls += 1
+        interaction = self.config.cassette.lookup("gemini", gemini_key(user_message, context), self.config.on_miss)
+        if interaction is None:
+            self.misses += 1
+        return interaction, self.config.errors.draw()
+
+    def _failed(self, status: str, elapsed: float) -> Tuple[str, Dict[str, Any]]:
+        usage = {"prompt_tokens": 0, "estimated_prompt_tokens": 0, "history_tokens": 0,
+                 "candidate_tokens": 0, "thoughts_tokens": 0, "total_tokens": 0,
+                 "grounded": False, "search_grounding": False,
+                 "upstream_ms": round(elapsed * 1000, 1), "status": status}
+        return FALLBACK_MESSAGE, usage
+
+    def chat_with_usage(self, user_message: str, context: Optional[str] = None,
+                        record_history: bool = True) -> Tuple[str, Dict[str, Any]]:
+        interaction, injected = self._lookup(user_message, context)
+        if injected == "timeout":
+            time.sleep(self.config.errors.timeout)
+            return self._failed("timeout", self.config.errors.timeout)
+
+        delay = self.config.gemini_latency.sample(interaction["latency_ms"] if interaction else None)
+        time.sleep(delay)
+        if injected or interaction is None or interaction["error"]:
+            return self._failed(injected or (interaction or {}).get("error") or "error", delay)
+
+        usage = dict(interaction["response"]["usage"], upstream_ms=round(delay * 1000, 1))
+        return interaction["response"]["text"], usage
+
+    def record_turn(self, user_message: str, ai_response: str, grounded: bool = False):
+        pass
+
+    def clear_history(self):
+        pass
+
+    def get_history(self) -> List[Dict[str, str]]:
+        return []
+
+    def get_history_stats(self) -> Dict[str, Any]:
+        return {"verbatim_turns": 0, "verbatim_tokens": 0, "summary_tokens": 0,
+                "summarized_turns": 0, "token_budget": 0, "replay_calls": self.calls,
+                "replay_misses": self.misses, "injected_errors": self.config.errors.injected}
+
+
+class ReplaySpeechHandler:
+    """Serves transcriptions from a cassette, keyed by the upload's SHA-256"""
+
+    pool = None
+
+    def __init__(self, config: _ReplayConfig):
+        self.config = config
+        self.calls = 0
+        self.misses = 0
+
+    def is_ready(self) -> bool:
+        return True
+
+    def start_workers(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def transcribe_audio(self, audio_data: str) -> str:
+        self.calls += 1
+        interaction = self.config.cassette.lookup("speech", audio_key(base64.b64decode(audio_data)),
+                                                  self.config.on_miss)
+        injected = self.config.errors.draw()
+        if injected == "timeout":
+            await asyncio.sleep(self.config.errors.timeout)
+            raise Exception("Speech recognition service error: timed out")
+
+        await asyncio.sleep(self.config.speech_latency.sample(interaction["latency_ms"] if interaction else None))
+        if interaction is None:
+            self.misses += 1
+            raise Exception("Transcription error: no recorded transcription for this audio")
+        if injected:
+            raise Exception("Speech recognition service error: injected failure")
+        if interaction["error"]:
+            raise Exception(interaction["error"])
+        return interaction["response"]["text"]
+
+    def speak(self, text: str) -> bool:
+        return True
+
+
+_replay_config: Optional[_ReplayConfig] = None
+_cassette: Optional[Cassette] = None
+
+
+def upstream_mode() -> str:
+    mode = os.getenv("UPSTREAM_MODE", "live").lower()
+    if mode not in UPSTREAM_MODES:
+        logger.warning(f"Unknown UPSTREAM_MODE '{mode}', using 'live'")
+        return "live"
+    return mode
+
+
+def _shared_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        path = os.getenv("UPSTREAM_CASSETTE", os.path.join("cassettes", "upstream.jsonl"))
+        _cassette = Cassette(path)
+        if upstream_mode() == "replay":
+            _cassette.load()
+    return _cassette
+
+
+def _shared_replay_config() -> _ReplayConfig:
+    global _replay_config
+    if _replay_config is None:
+        _replay_config = _ReplayConfig(_shared_cassette())
+    return _replay_config
+
+
+def upstream_gemini(factory: Callable[[], Any]) -> Any:
+    """Build the Gemini client for the configured UPSTREAM_MODE"""
+    mode = upstream_mode()
+    if mode == "replay":
+        return ReplayGeminiAI(_shared_replay_config())
+    gemini_ai = factory()
+    return RecordingGeminiAI(gemini_ai, _shared_cassette()) if mode == "record" else gemini_ai
+
+
+def upstream_speech_handler(factory: Callable[[], Any]) -> Any:
+    """Build the speech handler for the configured UPSTREAM_MODE"""
+    mode = upstream_mode()
+    if mode == "replay":
+        return ReplaySpeechHandler(_shared_replay_config())
+    speech_handler = factory()
+    return RecordingSpeechHandler(speech_handler, _shared_cassette()) if mode == "record" else speech_handler
+
+
+def summarize(cassette: Cassette) -> Dict[str, Any]:
+    summary = {}
+    for kind, interactions in cassette.by_kind.items():
+        latencies = sorted(i["latency_ms"] for i in interactions)
+        summary[kind] = {
+            "interactions": len(interactions),
+            "distinct_requests": len(cassette.interactions[kind]),
+            "errors": sum(1 for i in interactions if i["error"]),
+            "latency_ms_p50": latencies[len(latencies) // 2],
+            "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "latency_ms_max": latencies[-1],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette")
+    args = parser.parse_args()
+    print(json.dumps(summarize(Cassette(args.cassette).load()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
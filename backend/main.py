@@ -1,15 +1,25 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import asyncio
+import hmac
 import json
 from typing import Dict, Any
 import logging
+import os
+from dotenv import load_dotenv
 
-from ai.nlp_engine import NLPEngine
-from ai.gemini_ai import GeminiAI
-from automation.workflow_executor import WorkflowExecutor
-from audio.speech_handler import SpeechHandler
+from ai.speculation import SpeculationStats, SpeculativeDispatcher
+from core.broadcast import Broadcaster
+from core.connections import ConnectionMonitor, ws_ping_options
+from core.interaction_log import InteractionLog
+from core.pipeline import CommandPipeline, PipelineRun, StageError
+from core.profiling import MemoryProfiler, SamplingProfiler, object_counts
+from core.scheduler import AdmissionScheduler, SchedulerBusy, priority_for_triage, to_thread_in_slot
+from core.subsystems import SubsystemRegistry
+from core.telemetry import UsageTelemetry
+
+load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,24 +34,204 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-nlp_engine = NLPEngine()
-gemini_ai = GeminiAI()
-workflow_executor = WorkflowExecutor()
-speech_handler = SpeechHandler()
+def _load_nlp_engine():
+    from ai.nlp_engine import NLPEngine
+    from automation.workflows import load_workflows, workflow_triggers
+    return NLPEngine(workflow_triggers=workflow_triggers(load_workflows()))
+
+def _load_gemini_ai():
+    from ai.gemini_ai import GeminiAI
+    from core.upstream import upstream_gemini
+    return upstream_gemini(GeminiAI)
+
+def _load_workflow_executor():
+    from automation.workflow_executor import WorkflowExecutor
+    return WorkflowExecutor()
+
+def _load_speech_handler():
+    from audio.speech_handler import SpeechHandler
+    from core.upstream import upstream_speech_handler
+    return upstream_speech_handler(SpeechHandler)
+
+subsystems = SubsystemRegistry()
+subsystems.register("nlp_engine", _load_nlp_engine)
+subsystems.register("gemini_ai", _load_gemini_ai)
+subsystems.register("workflow_executor", _load_workflow_executor)
+subsystems.register("speech_handler", _load_speech_handler)
+
+scheduler = AdmissionScheduler()
+interaction_log = InteractionLog()
+cpu_profiler = SamplingProfiler()
+memory_profiler = MemoryProfiler()
+broadcaster = Broadcaster()
+connection_monitor = ConnectionMonitor()
+usage_telemetry = UsageTelemetry()
+pipeline = CommandPipeline(subsystems, scheduler)
 
 active_connections: Dict[str, WebSocket] = {}
 
-@app.get("/")
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "true").lower() == "true"
+speculation_stats = SpeculationStats()
+speculators: Dict[int, SpeculativeDispatcher] = {}
+
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+BROADCAST_TOKEN = os.getenv("BROADCAST_TOKEN", "")
+
+# Built frontend (frontend/dist) to serve from this process; empty when it is deployed separately
+FRONTEND_DIST = os.getenv("FRONTEND_DIST", "")
+frontend_files = None
+
 async def root():
     return {"status": "JARVIS Backend Online", "version": "1.0.0"}
 
+if not FRONTEND_DIST:
+    app.get("/")(root)
+
+@app.on_event("startup")
+async def start_interaction_log():
+    interaction_log.start()
+
+@app.on_event("shutdown")
+async def stop_interaction_log():
+    await asyncio.to_thread(interaction_log.close)
+
+@app.on_event("shutdown")
+async def announce_shutdown():
+    await broadcaster.publish("system", {"event": "shutdown", "message": "JAR-VET is restarting"})
+
+@app.on_event("startup")
+async def start_usage_telemetry():
+    usage_telemetry.start()
+
+@app.on_event("shutdown")
+async def stop_usage_telemetry():
+    await usage_telemetry.close()
+
+@app.on_event("startup")
+async def start_connection_monitor():
+    connection_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_connection_monitor():
+    await connection_monitor.close()
+
+@app.on_event("startup")
+async def start_transcription_workers():
+    # Worker processes load their recognizer models while the server starts serving
+    if int(os.getenv("TRANSCRIPTION_WORKERS", "0")) > 0:
+        subsystems.get("speech_handler").start_workers()
+
+@app.on_event("shutdown")
+async def stop_transcription_workers():
+    if subsystems.loaded("speech_handler"):
+        await subsystems.get("speech_handler").close()
+
+@app.on_event("startup")
+async def preload_subsystems():
+    # Optional warm-up for deployments that prefer paying load costs up front;
+    # runs after the server is accepting connections
+    names = [n.strip() for n in os.getenv("PRELOAD_SUBSYSTEMS", "").split(",") if n.strip()]
+    if names:
+        asyncio.get_running_loop().run_in_executor(None, subsystems.preload, names)
+
 @app.get("/health")
 async def health_check():
-    return {
+    health = {
         "status": "healthy",
-        "nlp_engine": nlp_engine.is_ready(),
-        "speech_handler": speech_handler.is_ready()
+        "nlp_engine": subsystems.ready("nlp_engine"),
+        "speech_handler": subsystems.ready("speech_handler"),
+        "subsystems": subsystems.status(),
+        "scheduler": scheduler.stats(),
+        "interaction_log": interaction_log.stats(),
+        "speculation": speculation_stats.as_dict(),
+        "broadcast": broadcaster.stats(),
+        "connections": connection_monitor.stats(),
+        "usage": usage_telemetry.stats(),
+        "pipeline": pipeline.stats()
+    }
+    if subsystems.loaded("gemini_ai"):
+        health["conversation_history"] = subsystems.get("gemini_ai").get_history_stats()
+    if frontend_files:
+        health["frontend"] = frontend_files.stats()
+    if subsystems.loaded("workflow_executor"):
+        health["screenshots"] = subsystems.get("workflow_executor").screenshots.stats()
+    if subsystems.loaded("speech_handler") and subsystems.get("speech_handler").pool:
+        health["transcription_pool"] = subsystems.get("speech_handler").pool.stats()
+    return health
+
+def require_debug_token(x_debug_token: str = Header(default="")):
+    # Debug endpoints do not exist unless DEBUG_TOKEN is configured
+    if not DEBUG_TOKEN or not hmac.compare_digest(x_debug_token, DEBUG_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+# Sessions are keyed by client address, so usage is only served with the debug token
+@app.get("/telemetry/usage", dependencies=[Depends(require_debug_token)])
+async def get_usage(top: int = 20):
+    return usage_telemetry.snapshot(top)
+
+@app.get("/telemetry/usage/sessions/{session_id}", dependencies=[Depends(require_debug_token)])
+async def get_session_usage(session_id: str):
+    usage = usage_telemetry.session(session_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return usage
+
+@app.get("/debug/profile/cpu", dependencies=[Depends(require_debug_token)])
+async def debug_cpu_profile(seconds: float = 5.0, interval_ms: float = 5.0):
+    seconds = min(max(seconds, 0.1), 60.0)
+    interval = min(max(interval_ms, 1.0), 100.0) / 1000
+    try:
+        profile = await asyncio.to_thread(cpu_profiler.profile, seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        SamplingProfiler.collapse(profile["stacks"]),
+        headers={"X-Profile-Samples": str(profile["samples"])}
+    )
+
+@app.post("/debug/memory/snapshot", dependencies=[Depends(require_debug_token)])
+async def debug_memory_snapshot(top: int = 25):
+    snapshot = memory_profiler.snapshot()
+    snapshot["top"] = memory_profiler.top(snapshot["id"], top)
+    return snapshot
+
+@app.get("/debug/memory/diff", dependencies=[Depends(require_debug_token)])
+async def debug_memory_diff(from_id: int, to_id: int, top: int = 25, group_by: str = "lineno"):
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return {"from": from_id, "to": to_id, "diff": memory_profiler.diff(from_id, to_id, top, group_by)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/debug/memory", dependencies=[Depends(require_debug_token)])
+async def debug_memory_reset():
+    memory_profiler.reset()
+    return {"tracing": False}
+
+@app.get("/debug/objects", dependencies=[Depends(require_debug_token)])
+async def debug_objects(top: int = 10):
+    sizes = {
+        "active_connections": lambda: len(active_connections),
+        "scheduler_connection_buckets": lambda: len(scheduler.connection_buckets),
+        "scheduler_waiters": lambda: sum(len(s.waiters) for s in scheduler.stages.values()),
+        "broadcast_subscribers": lambda: len(broadcaster.subscribers),
+        "monitored_connections": lambda: len(connection_monitor.connections),
     }
+    if subsystems.loaded("gemini_ai"):
+        sizes["conversation_turns"] = lambda: len(subsystems.get("gemini_ai").get_history())
+    return await asyncio.to_thread(object_counts, sizes, top)
+
+def require_broadcast_token(x_broadcast_token: str = Header(default="")):
+    if not BROADCAST_TOKEN or not hmac.compare_digest(x_broadcast_token, BROADCAST_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/broadcast", dependencies=[Depends(require_broadcast_token)])
+async def broadcast_message(payload: Dict[str, Any]):
+    topic = payload.pop("topic", "alerts")
+    if not isinstance(topic, str) or not topic:
+        raise HTTPException(status_code=400, detail="topic must be a non-empty string")
+    return await broadcaster.publish(topic, payload)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -50,6 +240,9 @@ async def websocket_endpoint(websocket: WebSocket):
     active_connections[connection_id] = websocket
     
     logger.info(f"Client connected: {connection_id}")
+    broadcaster.subscribe(connection_id, websocket.send_text, on_evict=websocket.close)
+    connection_monitor.register(connection_id, websocket, asyncio.current_task(),
+                                heartbeat=websocket.query_params.get("heartbeat") == "1")
     
     try:
         await websocket.send_json({
@@ -60,15 +253,29 @@ async def websocket_endpoint(websocket: WebSocket):
         
         while True:
             data = await websocket.receive_json()
-            await handle_message(websocket, data)
+            connection_monitor.begin(connection_id)
+            try:
+                await handle_message(websocket, data)
+            finally:
+                connection_monitor.end(connection_id)
             
     except WebSocketDisconnect:
         logger.info(f"Client disconnected: {connection_id}")
-        del active_connections[connection_id]
+    except asyncio.CancelledError:
+        # The heartbeat monitor cancels handlers of clients that stopped answering
+        if not connection_monitor.was_reaped(connection_id):
+            raise
+        logger.info(f"Client reaped: {connection_id}")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        if connection_id in active_connections:
-            del active_connections[connection_id]
+    finally:
+        active_connections.pop(connection_id, None)
+        connection_monitor.unregister(connection_id)
+        scheduler.release_connection(connection_id)
+        broadcaster.remove(connection_id)
+        speculator = speculators.pop(connection_id, None)
+        if speculator:
+            speculator.discard()
 
 async def handle_message(websocket: WebSocket, data: Dict[str, Any]):
     message_type = data.get("type")
@@ -82,132 +289,244 @@ async def handle_message(websocket: WebSocket, data: Dict[str, Any]):
     elif message_type == "audio_data":
         await process_audio_data(websocket, data.get("audio", ""))
     
+    elif message_type == "interim_transcript":
+        process_interim_transcript(websocket, data.get("text", ""), data.get("stable", False))
+    
     elif message_type == "status_request":
         await send_status(websocket)
     
+    elif message_type == "pong":
+        # Liveness is recorded by the receive loop for every message
+        pass
+    
+    elif message_type == "subscribe":
+        await update_subscriptions(websocket, data.get("topics", []), subscribe=True)
+    
+    elif message_type == "unsubscribe":
+        await update_subscriptions(websocket, data.get("topics", []), subscribe=False)
+    
     else:
         await websocket.send_json({
             "type": "error",
             "message": f"Unknown message type: {message_type}"
         })
 
+def log_pipeline_stage(stage: str, run: PipelineRun, elapsed: float, error):
+    if error is not None:
+        return
+    if stage == "transcribe":
+        interaction_log.record("transcription", connection=run.connection, text=run.text,
+                               audio_bytes=len(run.audio) * 3 // 4)
+    elif stage == "classify":
+        interaction_log.record("utterance", connection=run.connection, text=run.text)
+        interaction_log.record("intent", connection=run.connection, intent=run.intent_data["intent"],
+                               entities=run.intent_data["entities"], confidence=run.intent_data["confidence"],
+                               triage=run.intent_data.get("triage", {}).get("level"))
+    elif stage == "generate":
+        interaction_log.record("answer", connection=run.connection, ai_generated=True, success=True,
+                               message=run.result["message"], prompt_tokens=run.usage["prompt_tokens"])
+    elif stage == "execute":
+        interaction_log.record("answer", connection=run.connection, ai_generated=False,
+                               success=run.result["success"], message=run.result["message"])
+
+def record_pipeline_usage(stage: str, run: PipelineRun, elapsed: float, error):
+    # Speculative answers were already counted when their request completed
+    if stage == "generate" and error is None and not run.speculative:
+        usage_telemetry.record(run.connection, run.route, run.intent_data["intent"], run.usage)
+
+pipeline.add_hook(log_pipeline_stage)
+pipeline.add_hook(record_pipeline_usage)
+
+def busy_frame(busy: SchedulerBusy) -> Dict[str, Any]:
+    return {
+        "type": "busy",
+        "reason": busy.reason,
+        "retry_after": round(busy.retry_after, 2),
+        "message": "JAR-VET is handling a lot of requests right now. Please try again in a moment."
+    }
+
+def stage_error_frame(error: StageError) -> Dict[str, Any]:
+    if error.stage == "transcribe" and error.kind == "failed":
+        message = "Failed to process audio"
+    else:
+        message = f"JAR-VET timed out at the {error.stage} step. Please try again."
+    return {"type": "error", "stage": error.stage, "message": message}
+
+async def run_pipeline(websocket: WebSocket, text: str = "", audio: str = None):
+    connection_id = id(websocket)
+    run = PipelineRun(connection_id, "ws", websocket.send_json, text=text, audio=audio,
+                      speculator=speculators.get(connection_id), emit_binary=websocket.send_bytes)
+    try:
+        await pipeline.run(run)
+    except SchedulerBusy as busy:
+        await send_busy(websocket, busy)
+    except StageError as e:
+        logger.error(f"Pipeline {e.stage} error: {e}")
+        await websocket.send_json(stage_error_frame(e))
+
 async def process_voice_command(websocket: WebSocket, text: str):
     logger.info(f"Processing voice command: {text}")
+    await run_pipeline(websocket, text=text)
+
+def process_interim_transcript(websocket: WebSocket, text: str, stable: bool = False):
+    """Feed an interim transcript to the connection's speculative dispatcher"""
+    if not SPECULATION_ENABLED or not subsystems.get("gemini_ai").is_available():
+        return
     
-    await websocket.send_json({
-        "type": "status",
-        "status": "processing",
-        "message": "Understanding your command..."
-    })
-    
-    intent_data = await nlp_engine.process_command(text)
-    
-    await websocket.send_json({
-        "type": "intent",
-        "intent": intent_data["intent"],
-        "entities": intent_data["entities"],
-        "confidence": intent_data["confidence"]
-    })
-    
-    if intent_data["intent"] in ["information", "conversation"]:
-        if gemini_ai.is_available():
-            ai_response = gemini_ai.chat(text)
-            await websocket.send_json({
-                "type": "result",
-                "success": True,
-                "message": ai_response,
-                "data": {"ai_generated": True}
-            })
-            return
-        else:
-            result = await workflow_executor.execute(intent_data)
-            await websocket.send_json({
-                "type": "result",
-                "success": result["success"],
-                "message": result["message"],
-                "data": result.get("data", {})
-            })
-            return
-    
-    result = await workflow_executor.execute(intent_data)
-    
-    await websocket.send_json({
-        "type": "result",
-        "success": result["success"],
-        "message": result["message"],
-        "data": result.get("data", {})
-    })
+    connection_id = id(websocket)
+    speculator = speculators.get(connection_id)
+    if speculator is None:
+        async def classify(interim: str) -> Dict[str, Any]:
+            return await subsystems.get("nlp_engine").process_command(interim)
+        
+        async def generate(interim: str, intent_data: Dict[str, Any]):
+            priority = priority_for_triage(intent_data.get("triage"))
+            # Not charged to the connection's rate limit: the user did not ask for
+            # this request, and a miss must not get their real one shed
+            async with scheduler.admit("llm", connection_id, priority, charge_connection=False):
+                return await to_thread_in_slot(
+                    subsystems.get("gemini_ai").chat_with_usage, interim, None, False,
+                    on_done=lambda done: record_spend(done, intent_data["intent"])
+                )
+        
+        def record_spend(call: asyncio.Future, intent: str):
+            # Speculative requests cost tokens whether or not they are used; the
+            # upstream call finishes even when the speculation is cancelled
+            if not call.cancelled() and call.exception() is None:
+                usage_telemetry.record(connection_id, "ws_speculative", intent, call.result()[1])
+        
+        speculator = SpeculativeDispatcher(classify, generate, speculation_stats)
+        speculators[connection_id] = speculator
     
-    if result["success"]:
-        speech_text = result["message"]
-        await websocket.send_json({
-            "type": "speech",
-            "text": speech_text
-        })
+    speculator.on_interim(text, stable)
 
 async def process_text_command(websocket: WebSocket, text: str):
     await process_voice_command(websocket, text)
 
 async def process_audio_data(websocket: WebSocket, audio_data: str):
     logger.info("Processing audio data")
+    await run_pipeline(websocket, audio=audio_data)
+
+async def send_busy(websocket: WebSocket, busy: SchedulerBusy):
+    logger.warning(f"Shedding request from {id(websocket)}: {busy.reason}")
+    await websocket.send_json(busy_frame(busy))
+
+async def update_subscriptions(websocket: WebSocket, topics: list, subscribe: bool):
+    topics = [t for t in topics if isinstance(t, str) and t]
+    connection_id = id(websocket)
+    if subscribe:
+        broadcaster.subscribe(connection_id, websocket.send_text, topics, on_evict=websocket.close)
+    else:
+        broadcaster.unsubscribe(connection_id, topics)
     
-    try:
-        text = await speech_handler.transcribe_audio(audio_data)
-        
-        await websocket.send_json({
-            "type": "transcription",
-            "text": text
-        })
-        
-        await process_voice_command(websocket, text)
-        
-    except Exception as e:
-        logger.error(f"Audio processing error: {e}")
-        await websocket.send_json({
-            "type": "error",
-            "message": "Failed to process audio"
-        })
+    subscriber = broadcaster.subscribers.get(connection_id)
+    await websocket.send_json({
+        "type": "subscriptions",
+        "topics": sorted(subscriber.topics) if subscriber else []
+    })
 
 async def send_status(websocket: WebSocket):
     status = {
         "type": "status",
-        "nlp_ready": nlp_engine.is_ready(),
-        "speech_ready": speech_handler.is_ready(),
-        "active_tasks": workflow_executor.get_active_tasks()
+        "nlp_ready": subsystems.get("nlp_engine").is_ready(),
+        "speech_ready": subsystems.get("speech_handler").is_ready(),
+        "active_tasks": subsystems.get("workflow_executor").get_active_tasks()
     }
     await websocket.send_json(status)
 
+async def _discard(frame: Dict[str, Any]):
+    pass
+
 @app.post("/command")
-async def execute_command(command: Dict[str, str]):
+async def execute_command(command: Dict[str, str], request: Request):
     text = command.get("text", "")
+    audio = command.get("audio")
     
-    if not text:
+    if not text and not audio:
         return JSONResponse(
             status_code=400,
             content={"error": "No command text provided"}
         )
     
-    intent_data = await nlp_engine.process_command(text)
-    
-    if intent_data["intent"] in ["information", "conversation"]:
-        if gemini_ai.is_available():
-            ai_response = gemini_ai.chat(text)
-            return {
-                "intent": intent_data,
-                "result": {
-                    "success": True,
-                    "message": ai_response,
-                    "data": {"ai_generated": True}
-                }
-            }
-    
-    result = await workflow_executor.execute(intent_data)
+    client = request.client.host if request.client else "rest"
+    run = PipelineRun(client, "rest", _discard, text=text, audio=audio)
+    try:
+        await pipeline.run(run)
+    except SchedulerBusy as busy:
+        return JSONResponse(
+            status_code=429 if busy.reason == "rate_limited" else 503,
+            headers={"Retry-After": str(max(1, round(busy.retry_after)))},
+            content={"error": "busy", "reason": busy.reason}
+        )
+    except StageError as e:
+        logger.error(f"Pipeline {e.stage} error: {e}")
+        return JSONResponse(
+            status_code=504 if e.kind == "timeout" else 422,
+            content={"error": e.kind, "stage": e.stage, "message": stage_error_frame(e)["message"]}
+        )
     
     return {
-        "intent": intent_data,
-        "result": result
+        "intent": run.intent_data,
+        "result": run.result,
+        "speech": run.speech
     }
 
+@app.get("/command/stream")
+async def stream_command_query(text: str, request: Request):
+    return stream_command(request, text)
+
+@app.post("/command/stream")
+async def stream_command_body(command: Dict[str, str], request: Request):
+    return stream_command(request, command.get("text", ""), command.get("audio"))
+
+def stream_command(request: Request, text: str, audio: str = None):
+    """Run a command through the pipeline, sending each frame as a Server-Sent Event"""
+    if not text and not audio:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "No command text provided"}
+        )
+    
+    client = request.client.host if request.client else "sse"
+    frames: asyncio.Queue = asyncio.Queue()
+    
+    async def produce():
+        run = PipelineRun(client, "sse", frames.put, text=text, audio=audio)
+        try:
+            await pipeline.run(run)
+        except SchedulerBusy as busy:
+            await frames.put(busy_frame(busy))
+        except StageError as e:
+            logger.error(f"Pipeline {e.stage} error: {e}")
+            await frames.put(stage_error_frame(e))
+        except Exception as e:
+            logger.error(f"Pipeline error: {e}")
+            await frames.put({"type": "error", "message": "Failed to process command"})
+        finally:
+            frames.put_nowait(None)
+    
+    async def events():
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                frame = await frames.get()
+                if frame is None:
+                    break
+                yield f"event: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            # The client went away mid-command
+            task.cancel()
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+if FRONTEND_DIST:
+    from core.static import FrontendFiles
+    # Mounted last so every API route above takes precedence
+    frontend_files = FrontendFiles(FRONTEND_DIST)
+    app.mount("/", frontend_files, name="frontend")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, **ws_ping_options())
@@ -0,0 +1,49 @@
+// Writes .br and .gz next to every compressible file in dist/ so the backend
+// can serve them without compressing per request. Run after `vite build`.
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'fs';
+import { extname, join, relative } from 'path';
+import { brotliCompressSync, constants, gzipSync } from 'zlib';
+
+const dist = process.argv[2] || 'dist';
+const COMPRESSIBLE = new Set(['.html', '.js', '.mjs', '.css', '.svg', '.json', '.txt', '.xml', '.wasm', '.map']);
+const MIN_BYTES = 512;
+
+function* walk(dir) {
+    for (const name of readdirSync(dir)) {
+        const path = join(dir, name);
+        if (statSync(path).isDirectory()) {
+            yield* walk(path);
+        } else {
+            yield path;
+        }
+    }
+}
+
+let original = 0;
+let brotli = 0;
+let gzip = 0;
+
+for (const path of walk(dist)) {
+    if (!COMPRESSIBLE.has(extname(path))) continue;
+    const data = readFileSync(path);
+    if (data.length < MIN_BYTES) continue;
+
+    const br = brotliCompressSync(data, {
+        params: {
+            [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+            [constants.BROTLI_PARAM_SIZE_HINT]: data.length
+        }
+    });
+    const gz = gzipSync(data, { level: 9 });
+
+    // A variant that isn't smaller than the original is never worth serving
+    if (br.length < data.length) writeFileSync(`${path}.br`, br);
+    if (gz.length < data.length) writeFileSync(`${path}.gz`, gz);
+
+    original += data.length;
+    brotli += Math.min(br.length, data.length);
+    gzip += Math.min(gz.length, data.length);
+    console.log(`${relative(dist, path).padEnd(48)} ${String(data.length).padStart(9)} B  br ${String(br.length).padStart(8)}  gz ${String(gz.length).padStart(8)}`);
+}
+
+console.log(`\ntotal ${original} B  br ${brotli} B (${(100 * brotli / (original || 1)).toFixed(1)}%)  gz ${gzip} B (${(100 * gzip / (original || 1)).toFixed(1)}%)`);
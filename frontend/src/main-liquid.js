@@ -292,6 +292,28 @@ class LiquidJarvisUI {
             this.setState('idle');
         });
 
+        this.wsClient.on('busy', (data) => {
+            console.warn('Backend busy:', data);
+            this.updateBottomBar(data.message);
+            this.setState('idle');
+        });
+
+        this.wsClient.on('screenshot', (data) => {
+            const url = URL.createObjectURL(data.blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = `screenshot-${data.captured_at || Date.now()}.${data.format === 'jpeg' ? 'jpg' : data.format}`;
+            link.click();
+            setTimeout(() => URL.revokeObjectURL(url), 1000);
+        });
+
+        this.wsClient.on('broadcast', (data) => {
+            console.log('Broadcast:', data);
+            if (data.message) {
+                this.updateBottomBar(data.message);
+            }
+        });
+
         this.wsClient.connect().catch(err => {
             console.error('Failed to connect to backend:', err);
         });
@@ -348,6 +370,9 @@ class LiquidJarvisUI {
                 console.log('Final transcript:', text);
                 this.currentQuery = text;
                 this.triggerSearch(text);
+            } else {
+                // Lets the backend start answering before the transcript is final
+                this.wsClient.sendInterimTranscript(text);
             }
         };
 
@@ -4,7 +4,10 @@ export class WebSocketClient {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
         
         if (!url) {
-            if (isProduction) {
+            if (import.meta.env.VITE_WS_SAME_ORIGIN === 'true') {
+                // Built with `npm run build:single` and served by the backend itself
+                this.url = `${protocol}//${window.location.host}/ws`;
+            } else if (isProduction) {
                 this.url = `${protocol}//${window.location.hostname.replace('jar-vet', 'jar-vet-backend')}/ws`;
             } else {
                 this.url = 'ws://localhost:8000/ws';
@@ -12,6 +15,8 @@ export class WebSocketClient {
         } else {
             this.url = url;
         }
+        // Opt in to app-level heartbeats (answered in handleMessage)
+        this.url += (this.url.includes('?') ? '&' : '?') + 'heartbeat=1';
         
         console.log('WebSocket URL:', this.url);
         
@@ -25,6 +30,7 @@ export class WebSocketClient {
         return new Promise((resolve, reject) => {
             try {
                 this.ws = new WebSocket(this.url);
+                this.ws.binaryType = 'arraybuffer';
 
                 this.ws.onopen = () => {
                     console.log('Connected to JARVIS backend');
@@ -34,6 +40,10 @@ export class WebSocketClient {
                 };
 
                 this.ws.onmessage = (event) => {
+                    if (event.data instanceof ArrayBuffer) {
+                        this.handleBinary(event.data);
+                        return;
+                    }
                     try {
                         const data = JSON.parse(event.data);
                         this.handleMessage(data);
@@ -69,6 +79,18 @@ export class WebSocketClient {
         }, this.reconnectInterval);
     }
 
+    handleBinary(buffer) {
+        // 4-byte big-endian header length, JSON header, then the payload (e.g. a screenshot)
+        try {
+            const headerLength = new DataView(buffer).getUint32(0);
+            const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+            const blob = new Blob([new Uint8Array(buffer, 4 + headerLength)], { type: header.mime });
+            this.emit(header.type, { ...header, blob });
+        } catch (e) {
+            console.error('Failed to parse binary message:', e);
+        }
+    }
+
     handleMessage(data) {
         const type = data.type;
         
@@ -101,6 +123,22 @@ export class WebSocketClient {
                 this.emit('error', data);
                 break;
             
+            case 'busy':
+                this.emit('busy', data);
+                break;
+            
+            case 'ping':
+                this.send({ type: 'pong' });
+                break;
+            
+            case 'broadcast':
+                this.emit('broadcast', data);
+                break;
+            
+            case 'subscriptions':
+                this.emit('subscriptions', data);
+                break;
+            
             default:
                 console.log('Unknown message type:', type, data);
         }
@@ -128,6 +166,13 @@ export class WebSocketClient {
         });
     }
 
+    sendInterimTranscript(text) {
+        this.send({
+            type: 'interim_transcript',
+            text: text
+        });
+    }
+
     sendAudioData(audioData) {
         this.send({
             type: 'audio_data',
@@ -135,6 +180,20 @@ export class WebSocketClient {
         });
     }
 
+    subscribe(topics) {
+        this.send({
+            type: 'subscribe',
+            topics: topics
+        });
+    }
+
+    unsubscribe(topics) {
+        this.send({
+            type: 'unsubscribe',
+            topics: topics
+        });
+    }
+
     requestStatus() {
         this.send({
             type: 'status_request'